@@ -3,7 +3,8 @@ import pandas_ta as ta
 
 # Import dari file-file lain dalam proyek
 from strategies.base_strategy import BaseStrategy
-import utils # Diperlukan untuk beberapa fungsi pembantu jika ada
+import indicators
+import market_structure
 
 class SmcStrategy(BaseStrategy):
     # Properti wajib dari BaseStrategy
@@ -21,58 +22,13 @@ class SmcStrategy(BaseStrategy):
 
     def _find_fvgs(self, df: pd.DataFrame, limit=5):
         """Mendeteksi Fair Value Gaps (FVG) terbaru dalam DataFrame."""
-        fvgs = []
-        # Iterasi dari candle kedua hingga sebelum candle terakhir
-        for i in range(1, len(df) - 1):
-            # Bullish FVG: Low candle (i-1) lebih tinggi dari High candle (i+1)
-            if df['low'].iloc[i-1] > df['high'].iloc[i+1]:
-                fvgs.append({
-                    'type': 'bullish',
-                    'top': df['low'].iloc[i-1],
-                    'bottom': df['high'].iloc[i+1],
-                    'index': i
-                })
-            # Bearish FVG: High candle (i-1) lebih rendah dari Low candle (i+1)
-            elif df['high'].iloc[i-1] < df['low'].iloc[i+1]:
-                fvgs.append({
-                    'type': 'bearish',
-                    'top': df['low'].iloc[i+1],
-                    'bottom': df['high'].iloc[i-1],
-                    'index': i
-                })
-        # Urutkan berdasarkan candle terbaru dan ambil beberapa saja
-        return sorted(fvgs, key=lambda x: x['index'], reverse=True)[:limit]
+        return market_structure.zones(market_structure.fair_value_gaps(df), limit)
     
     def _find_order_blocks(self, df: pd.DataFrame, limit=3):
-        """Mendeteksi Order Blocks (OB) sederhana."""
-        obs = []
-        # Rata-rata range candle sebagai acuan 'pergerakan impulsif'
-        avg_range = (df['high'] - df['low']).mean()
+        """Mendeteksi Order Blocks (OB) sederhana: candle impulsif yang berlawanan warna dengan candle sebelumnya."""
+        return market_structure.zones(market_structure.order_blocks(df, self.OB_IMPULSE_FACTOR), limit)
 
-        for i in range(1, len(df)):
-            current_range = df['high'].iloc[i] - df['low'].iloc[i]
-            
-            # Cek jika pergerakan candle saat ini 'impulsif'
-            if current_range > avg_range * self.OB_IMPULSE_FACTOR:
-                # Bullish OB: candle sebelumnya bearish (merah), candle sekarang bullish (hijau)
-                if df['close'].iloc[i-1] < df['open'].iloc[i-1] and df['close'].iloc[i] > df['open'].iloc[i]:
-                    obs.append({
-                        'type': 'bullish',
-                        'top': df['high'].iloc[i-1],
-                        'bottom': df['low'].iloc[i-1],
-                        'index': i-1
-                    })
-                # Bearish OB: candle sebelumnya bullish (hijau), candle sekarang bearish (merah)
-                elif df['close'].iloc[i-1] > df['open'].iloc[i-1] and df['close'].iloc[i] < df['open'].iloc[i]:
-                    obs.append({
-                        'type': 'bearish',
-                        'top': df['high'].iloc[i-1],
-                        'bottom': df['low'].iloc[i-1],
-                        'index': i-1
-                    })
-        return sorted(obs, key=lambda x: x['index'], reverse=True)[:limit]
-
-    def check_signal(self, symbol: str, df: pd.DataFrame) -> dict | None:
+    def check_signal(self, symbol: str, df: pd.DataFrame, data_context=None) -> dict | None:
         """
         Metode utama yang memeriksa sinyal berdasarkan data yang diberikan.
         """
@@ -80,7 +36,7 @@ class SmcStrategy(BaseStrategy):
             return None
         
         # Hitung ATR untuk manajemen risiko
-        df.ta.atr(length=self.ATR_LENGTH, append=True)
+        indicators.append(df, 'atr', length=self.ATR_LENGTH)
         
         last = df.iloc[-1]
         atr_value = last[f'ATRr_{self.ATR_LENGTH}']
@@ -126,15 +82,7 @@ class SmcStrategy(BaseStrategy):
 
         # Jika tidak ada sinyal yang ditemukan
         return None
-    
-    
-    import pandas as pd
-import pandas_ta as ta
-import numpy as np
 
-# Import dari file-file lain dalam proyek
-from strategies.base_strategy import BaseStrategy
-import utils
 
 class SmcStrategy(BaseStrategy):
     name = "smc_v2_smart"
@@ -158,91 +106,40 @@ class SmcStrategy(BaseStrategy):
 
     # --- FUNGSI HELPER UNTUK DETEKSI POLA ---
 
+    def data_requirements(self) -> list[tuple[str, int]]:
+        return [(self.HTF_TIMEFRAME, self.HTF_EMA_LENGTH + 5)]
+
     def _find_swing_points(self, df: pd.DataFrame):
-        """Mendeteksi Swing Highs dan Swing Lows untuk Break of Structure (BoS)."""
-        highs = []
-        lows = []
-        n = self.SWING_LOOKBACK
-        for i in range(n, len(df) - n):
-            # Swing High: high[i] adalah yang tertinggi di antara 2n+1 candle
-            if df['high'].iloc[i] == df['high'].iloc[i-n:i+n+1].max():
-                highs.append({'index': i, 'price': df['high'].iloc[i]})
-            # Swing Low: low[i] adalah yang terendah di antara 2n+1 candle
-            if df['low'].iloc[i] == df['low'].iloc[i-n:i+n+1].min():
-                lows.append({'index': i, 'price': df['low'].iloc[i]})
-        return sorted(highs, key=lambda x: x['index'], reverse=True), sorted(lows, key=lambda x: x['index'], reverse=True)
+        """Mendeteksi Swing Highs dan Swing Lows (array boolean per candle) untuk Break of Structure (BoS)."""
+        return market_structure.swing_points(df, self.SWING_LOOKBACK)
 
     def _find_order_blocks(self, df: pd.DataFrame, swing_highs, swing_lows, limit=3):
         """Mendeteksi Order Blocks (OB) yang divalidasi dengan Break of Structure (BoS)."""
-        obs = []
-        avg_range = (df['high'] - df['low']).mean()
-        for i in range(self.SWING_LOOKBACK, len(df)):
-            current_range = df['high'].iloc[i] - df['low'].iloc[i]
-            if current_range > avg_range * self.OB_IMPULSE_FACTOR:
-                # Cek Bullish OB (candle sebelumnya bearish, sekarang bullish)
-                if df['close'].iloc[i-1] < df['open'].iloc[i-1] and df['close'].iloc[i] > df['open'].iloc[i]:
-                    # Cari swing high terdekat SEBELUM OB terbentuk
-                    relevant_highs = [sh for sh in swing_highs if sh['index'] < i]
-                    if relevant_highs and df['high'].iloc[i] > relevant_highs[0]['price']:
-                        obs.append({'type': 'bullish', 'top': df['high'].iloc[i-1], 'bottom': df['low'].iloc[i-1], 'index': i-1})
-                # Cek Bearish OB (candle sebelumnya bullish, sekarang bearish)
-                elif df['close'].iloc[i-1] > df['open'].iloc[i-1] and df['close'].iloc[i] < df['open'].iloc[i]:
-                    # Cari swing low terdekat SEBELUM OB terbentuk
-                    relevant_lows = [sl for sl in swing_lows if sl['index'] < i]
-                    if relevant_lows and df['low'].iloc[i] < relevant_lows[0]['price']:
-                        obs.append({'type': 'bearish', 'top': df['high'].iloc[i-1], 'bottom': df['low'].iloc[i-1], 'index': i-1})
-        return sorted(obs, key=lambda x: x['index'], reverse=True)[:limit]
+        # BoS: candle impulsif menembus swing terdekat SEBELUM OB terbentuk
+        bos_bullish, bos_bearish = market_structure.break_of_structure(df, swing_highs, swing_lows)
+        obs = market_structure.order_blocks(df, self.OB_IMPULSE_FACTOR, start=self.SWING_LOOKBACK,
+                                            bos_bullish=bos_bullish, bos_bearish=bos_bearish)
+        return market_structure.zones(obs, limit)
 
     def _find_fvgs(self, df: pd.DataFrame, limit=5):
         """Mendeteksi Fair Value Gaps (FVG) terbaru dalam DataFrame."""
-        fvgs = []
-        # Iterasi dari candle kedua hingga sebelum candle terakhir
-        for i in range(1, len(df) - 1):
-            # Bullish FVG: Low candle (i-1) lebih tinggi dari High candle (i+1)
-            if df['low'].iloc[i-1] > df['high'].iloc[i+1]:
-                fvgs.append({
-                    'type': 'bullish',
-                    'top': df['low'].iloc[i-1],
-                    'bottom': df['high'].iloc[i+1],
-                    'index': i
-                })
-            # Bearish FVG: High candle (i-1) lebih rendah dari Low candle (i+1)
-            elif df['high'].iloc[i-1] < df['low'].iloc[i+1]:
-                fvgs.append({
-                    'type': 'bearish',
-                    'top': df['low'].iloc[i+1],
-                    'bottom': df['high'].iloc[i-1],
-                    'index': i
-                })
-        # Urutkan berdasarkan candle terbaru dan ambil beberapa saja
-        return sorted(fvgs, key=lambda x: x['index'], reverse=True)[:limit]
-
-    def _is_zone_invalidated(self, df: pd.DataFrame, zone: dict):
-        """Memeriksa apakah zona FVG atau OB sudah tidak valid (tertembus)."""
-        candles_after_zone = df.iloc[zone['index'] + 2:]
-        if zone['type'] == 'bullish':
-            # Jika ada candle setelahnya yang low-nya menembus dasar zona, maka tidak valid
-            return any(candles_after_zone['low'] < zone['bottom'])
-        elif zone['type'] == 'bearish':
-            # Jika ada candle setelahnya yang high-nya menembus puncak zona, maka tidak valid
-            return any(candles_after_zone['high'] > zone['top'])
-        return False
+        return market_structure.zones(market_structure.fair_value_gaps(df), limit)
 
-    def check_signal(self, symbol: str, df: pd.DataFrame) -> dict | None:
+    def check_signal(self, symbol: str, df: pd.DataFrame, data_context=None) -> dict | None:
         """Metode utama yang memeriksa sinyal berdasarkan semua aturan yang disempurnakan."""
         if df.empty or len(df) < self.LOOKBACK_CANDLES: return None
         
         # === LANGKAH 1: FILTER TREN MAKRO (HTF) ===
-        df_htf = utils.fetch_klines(symbol, self.HTF_TIMEFRAME, limit=self.HTF_EMA_LENGTH + 5)
+        df_htf = self.get_klines(symbol, self.HTF_TIMEFRAME, self.HTF_EMA_LENGTH + 5, data_context)
         if len(df_htf) < self.HTF_EMA_LENGTH: return None
-        df_htf.ta.ema(length=self.HTF_EMA_LENGTH, append=True)
+        indicators.append(df_htf, 'ema', length=self.HTF_EMA_LENGTH)
         last_htf = df_htf.iloc[-1]
         htf_ema = last_htf[f'EMA_{self.HTF_EMA_LENGTH}']
         if pd.isna(htf_ema): return None
         htf_trend = 'BULLISH' if last_htf['close'] > htf_ema else 'BEARISH'
 
         # === LANGKAH 2: PERSIAPAN DATA DAN INDIKATOR LTF ===
-        df.ta.atr(length=self.ATR_LENGTH, append=True)
+        indicators.append(df, 'atr', length=self.ATR_LENGTH)
         last = df.iloc[-1]
         atr_value = last[f'ATRr_{self.ATR_LENGTH}']
         if pd.isna(atr_value) or atr_value == 0: return None
@@ -252,6 +149,8 @@ class SmcStrategy(BaseStrategy):
         swing_highs, swing_lows = self._find_swing_points(df)
         recent_fvgs = self._find_fvgs(df)
         recent_obs = self._find_order_blocks(df, swing_highs, swing_lows)
+        # Low terendah / high tertinggi setelah tiap candle, untuk cek zona tertembus tanpa memindai ulang
+        levels = market_structure.invalidation_levels(df)
 
         # === LANGKAH 3: PENCARIAN SINYAL SESUAI ARAH TREN ===
         if htf_trend == 'BULLISH':
@@ -260,7 +159,7 @@ class SmcStrategy(BaseStrategy):
             for zone in zones_to_check:
                 if zone['type'] == 'bullish':
                     # Periksa apakah zona masih valid
-                    if self._is_zone_invalidated(df, zone): continue
+                    if market_structure.zone_invalidated(zone, levels): continue
                     
                     # Periksa kondisi entry: harga masuk zona dan candle reaksi berwarna hijau
                     is_mitigated = last['low'] <= zone['top'] and last['close'] > zone['bottom']
@@ -277,7 +176,7 @@ class SmcStrategy(BaseStrategy):
             zones_to_check = sorted(recent_fvgs + recent_obs, key=lambda x: x['index'], reverse=True)
             for zone in zones_to_check:
                 if zone['type'] == 'bearish':
-                    if self._is_zone_invalidated(df, zone): continue
+                    if market_structure.zone_invalidated(zone, levels): continue
                     
                     is_mitigated = last['high'] >= zone['bottom'] and last['close'] < zone['top']
                     is_confirmation_candle = last['close'] < last['open']
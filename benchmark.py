@@ -0,0 +1,420 @@
+# benchmark.py
+
+import argparse
+import asyncio
+import bisect
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+import zlib
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import numpy as np
+
+# Import dari file-file lain dalam proyek
+import config
+import utils
+import candle_store
+import market_data
+import indicators
+import features
+from data_context import PrefetchedDataContext
+from strategies import AVAILABLE_STRATEGIES
+
+logger = logging.getLogger(__name__)
+
+# ==============================================================================
+# BENCHMARK DENGAN FIXTURE MARKET
+# ==============================================================================
+# Mengukur regresi performa tanpa jaringan: klien Binance (REST sinkron dan
+# market data async) diganti stand-in lokal yang melayani klines dari fixture.
+#   - fixture rekaman : <BENCHMARK_DIR>/fixtures/<interval>/<SYMBOL>.npy (record array
+#                       candle_store.CANDLE_DTYPE), dibuat dengan `python benchmark.py record`
+#   - fixture sintetis: random walk deterministik (seed dari symbol+interval) jika tidak ada rekaman
+# Waktu fixture digeser agar candle terakhir adalah candle yang sedang berjalan saat ini,
+# sehingga backtest (yang memakai waktu sekarang) dan fetch_klines berperilaku seperti live.
+#
+# Kasus yang diukur untuk setiap ukuran data (default 500, 1500, 50000 candle):
+#   fetch[N]                     parsing klines (fetch_klines, atau fetch_klines_history jika N > 1500)
+#   check_signal.<strategi>[N]   satu panggilan check_signal pada frame N candle
+#   backtest.<strategi>[N]       run_backtest satu simbol (data sudah dimuat)
+#   multi_backtest.<strategi>[N] run_backtests beberapa simbol (termasuk memuat data)
+#   scan_cycle                   satu siklus auto scan (prefetch + check_signal semua strategi)
+# Hasil (median detik, throughput, puncak memori) ditambahkan ke history JSON dan
+# dibandingkan dengan run sebelumnya.
+
+DEFAULT_SIZES = (500, 1500, 50_000)
+FIXTURE_SYMBOLS = ('BTCUSDT', 'ETHUSDT', 'SOLUSDT', 'BNBUSDT', 'XRPUSDT')
+
+def fixture_dir() -> str:
+    return os.path.join(config.BENCHMARK_DIR, 'fixtures')
+
+def _fixture_path(symbol: str, interval: str) -> str:
+    return os.path.join(fixture_dir(), interval, f"{symbol}.npy")
+
+def synthetic_records(symbol: str, interval: str, count: int) -> np.ndarray:
+    """Candle sintetis deterministik (random walk log-normal), open_time mulai dari 0."""
+    rng = np.random.default_rng(zlib.crc32(f"{symbol}:{interval}".encode()))
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.004, count)))
+    open_ = np.r_[close[0], close[:-1]] * (1 + rng.normal(0, 0.001, count))
+    records = np.empty(count, dtype=candle_store.CANDLE_DTYPE)
+    interval_ms = utils.interval_to_ms(interval)
+    records['open_time'] = np.arange(count, dtype=np.int64) * interval_ms
+    records['close_time'] = records['open_time'] + interval_ms - 1
+    records['open'], records['close'] = open_, close
+    records['high'] = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.003, count)))
+    records['low'] = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.003, count)))
+    records['volume'] = rng.lognormal(10, 0.5, count)
+    return records
+
+class FixtureBinance:
+    """
+    Stand-in `binance.client.Client` (hanya endpoint yang dipakai bot) di atas fixture.
+    Baris respons dirender sekali dalam format mentah Binance (harga berupa string), jadi
+    biaya yang terukur adalah biaya parsing & pemrosesan bot, bukan biaya stand-in.
+    """
+
+    def __init__(self, span_ms: int, now_ms: int | None = None):
+        self.span_ms = span_ms
+        self.now_ms = now_ms or int(time.time() * 1000)
+        self._fixtures = {}
+        self.sources = {}
+
+    def _load(self, symbol: str, interval: str):
+        key = (symbol, interval)
+        if key not in self._fixtures:
+            interval_ms = utils.interval_to_ms(interval)
+            path = _fixture_path(symbol, interval)
+            if os.path.exists(path):
+                records, self.sources[key] = np.load(path), 'recorded'
+            else:
+                records, self.sources[key] = synthetic_records(symbol, interval, self.span_ms // interval_ms + 2), 'synthetic'
+            # Geser waktu: candle terakhir = candle yang sedang berjalan sekarang
+            shift = (self.now_ms // interval_ms) * interval_ms - int(records['open_time'][-1])
+            open_times = records['open_time'] + shift
+            rows = [
+                [int(r['open_time']) + shift, f"{r['open']:.6f}", f"{r['high']:.6f}", f"{r['low']:.6f}",
+                 f"{r['close']:.6f}", f"{r['volume']:.3f}", int(r['close_time']) + shift,
+                 "0", 0, "0", "0", "0"]
+                for r in records
+            ]
+            self._fixtures[key] = (open_times.tolist(), rows)
+        return self._fixtures[key]
+
+    def futures_klines(self, symbol: str, interval: str, limit: int = 500, startTime=None, endTime=None, **params) -> list:
+        open_times, rows = self._load(symbol, interval)
+        limit = int(limit)
+        hi = bisect.bisect_right(open_times, endTime) if endTime is not None else len(rows)
+        if startTime is not None:
+            lo = bisect.bisect_left(open_times, startTime)
+            return rows[lo:min(lo + limit, hi)]
+        return rows[max(hi - limit, 0):hi]
+
+    def futures_ticker(self) -> list:
+        tickers = []
+        for symbol in FIXTURE_SYMBOLS:
+            rows = self.futures_klines(symbol, '15m', limit=96)
+            tickers.append({'symbol': symbol, 'quoteVolume': str(sum(float(r[5]) for r in rows)),
+                            'highPrice': str(max(float(r[2]) for r in rows)), 'lowPrice': str(min(float(r[3]) for r in rows)),
+                            'lastPrice': rows[-1][4]})
+        return tickers
+
+class FixtureMarketData(market_data.AsyncMarketData):
+    """Stand-in klien market data async: endpoint klines dilayani dari `FixtureBinance`."""
+
+    def __init__(self, fake: FixtureBinance):
+        super().__init__()
+        self.fake = fake
+
+    async def get(self, path: str, params: dict | None = None, weight: int = 1):
+        if path != '/fapi/v1/klines':
+            raise NotImplementedError(f"Endpoint {path} tidak didukung stand-in benchmark.")
+        params = dict(params or {})
+        return self.fake.futures_klines(params.pop('symbol'), params.pop('interval'), **params)
+
+    async def close(self):
+        pass
+
+_UNSET = object()
+
+@contextmanager
+def installed(fake: FixtureBinance):
+    """Memasang stand-in ke utils & market_data (candle store, stream, dan batas weight dinonaktifkan)."""
+    # Klien Binance asli dibuat lazy: jangan memicu inisialisasi (ping) hanya untuk menyimpannya
+    saved_binance = vars(utils).get('binance', _UNSET)
+    saved = (utils.rest_limiter, list(utils._kline_sources), config.CANDLE_STORE_ENABLED, market_data.client)
+    utils.binance, utils.rest_limiter = fake, utils.WeightLimiter(10**12)
+    utils._kline_sources.clear()
+    config.CANDLE_STORE_ENABLED = False
+    market_data.client = FixtureMarketData(fake)
+    try:
+        yield fake
+    finally:
+        utils.rest_limiter, sources, config.CANDLE_STORE_ENABLED, market_data.client = saved
+        utils._kline_sources[:] = sources
+        if saved_binance is _UNSET:
+            del utils.binance
+        else:
+            utils.binance = saved_binance
+
+# ==============================================================================
+# PENGUKURAN
+# ==============================================================================
+
+def measure(func, setup=None, repeat: int = 3, units: float = 1) -> dict:
+    """
+    Menjalankan `func` `repeat` kali (`setup` sebelum setiap run, tidak diukur), lalu sekali
+    lagi dengan tracemalloc untuk puncak alokasi. `units` = jumlah unit kerja per run (throughput).
+    """
+    times = []
+    for _ in range(repeat):
+        if setup: setup()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    if setup: setup()
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    median = statistics.median(times)
+    return {'seconds': median, 'best': min(times), 'throughput': units / median if median > 0 else None,
+            'peak_mb': peak / 1e6}
+
+def _strategy_frames(strategy_instance, symbol: str, size: int) -> dict:
+    """Frame timeframe utama (`size` candle) dan frame dari data_requirements, seperti satu siklus scan."""
+    primary_timeframe = getattr(strategy_instance, 'TIMEFRAME', '15m')
+    frames = {(symbol, primary_timeframe): _fetch(symbol, primary_timeframe, size)}
+    for interval, limit in strategy_instance.data_requirements():
+        frames[(symbol, interval)] = _fetch(symbol, interval, limit)
+    return frames
+
+def _fetch(symbol: str, interval: str, size: int):
+    if size <= utils.KLINES_PAGE_SIZE:
+        return utils.fetch_klines(symbol, interval, limit=size)
+    interval_ms = utils.interval_to_ms(interval)
+    end_ms = int(time.time() * 1000)
+    return utils.fetch_klines_history(symbol, interval, end_ms - (size - 1) * interval_ms, end_ms)
+
+def _check_signal(strategy_instance, symbol: str, data_context, size: int):
+    df = data_context.get_klines(symbol, getattr(strategy_instance, 'TIMEFRAME', '15m'), size)
+    return strategy_instance.check_signal(symbol, df, data_context)
+
+def run_suite(sizes, strategy_names, symbols, repeat: int = 3, executor_mode: str = 'inline') -> dict:
+    """Menjalankan semua kasus benchmark. Hasil: {nama_kasus: hasil `measure` + 'candles'}."""
+    strategies = [AVAILABLE_STRATEGIES[name] for name in strategy_names]
+    span_ms = max(sizes) * max(utils.interval_to_ms(getattr(s, 'TIMEFRAME', '15m')) for s in strategies)
+    # Cadangan histori untuk warmup frame HTF (data_requirements) pada ukuran terbesar
+    span_ms += max((utils.interval_to_ms(i) * limit for s in strategies for i, limit in s.data_requirements()), default=0)
+    results = {}
+
+    def add(name, result, candles=None):
+        result['candles'] = candles
+        results[name] = result
+        rate = f"{result['throughput']:,.0f}/s" if result['throughput'] else '-'
+        logger.info(f"{name:<45} {result['seconds'] * 1000:>10.1f} ms  {rate:>14}  {result['peak_mb']:>8.1f} MB")
+
+    with installed(FixtureBinance(span_ms)) as fake:
+        # Fixture dirender di awal agar tidak ikut terukur pada kasus pertama
+        intervals = {'15m'} | {getattr(s, 'TIMEFRAME', '15m') for s in strategies} | {i for s in strategies for i, _ in s.data_requirements()}
+        for sym in symbols:
+            for interval in intervals:
+                fake._load(sym, interval)
+        symbol = symbols[0]
+        for size in sizes:
+            add(f"fetch[{size}]", measure(lambda: _fetch(symbol, '15m', size), repeat=repeat, units=size), size)
+
+            for strategy_instance in strategies:
+                name = strategy_instance.name
+                primary_timeframe = getattr(strategy_instance, 'TIMEFRAME', '15m')
+                ctx = PrefetchedDataContext(_strategy_frames(strategy_instance, symbol, size))
+                add(f"check_signal.{name}[{size}]", measure(
+                    lambda: _check_signal(strategy_instance, symbol, ctx, size),
+                    setup=indicators.clear, repeat=repeat), size)
+
+                days = size * utils.interval_to_ms(primary_timeframe) / 86_400_000
+                data = features.load_backtest_data(strategy_instance, symbol, days)
+                candles = len(data['df_full'])
+                add(f"backtest.{name}[{size}]", measure(
+                    lambda: features.run_backtest(strategy_instance, symbol, days, preloaded=data),
+                    setup=indicators.clear, repeat=repeat, units=candles), candles)
+
+                add(f"multi_backtest.{name}[{size}]", measure(
+                    lambda: features.run_backtests(strategy_instance, symbols, days, executor_mode),
+                    setup=indicators.clear, repeat=max(1, repeat // 2), units=candles * len(symbols)), candles * len(symbols))
+
+        async def scan_cycle():
+            plan = features.plan_scan_cycle(strategies, symbols)
+            ctx = await features.prefetch_scan_frames(plan)
+            for strategy_instance in strategies:
+                for sym in symbols:
+                    features.check_strategy_signal(strategy_instance, sym, ctx)
+
+        add("scan_cycle", measure(lambda: asyncio.run(scan_cycle()), setup=indicators.clear,
+                                  repeat=repeat, units=len(strategies) * len(symbols)))
+        sources = sorted(set(fake.sources.values()))
+
+    features.shutdown_process_pool()
+    return {'results': results, 'fixtures': sources}
+
+# ==============================================================================
+# HISTORY & PERBANDINGAN
+# ==============================================================================
+
+def history_path() -> str:
+    return os.path.join(config.BENCHMARK_DIR, 'history.json')
+
+def load_history(path: str) -> list:
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def _delta(new: float | None, old: float | None) -> str:
+    if not new or not old:
+        return '-'
+    return f"{(new / old - 1) * 100:+.1f}%"
+
+def format_comparison(run: dict, previous: dict | None) -> str:
+    """Tabel hasil run dengan selisih waktu & memori terhadap run sebelumnya."""
+    old = (previous or {}).get('results', {})
+    lines = [f"{'kasus':<45} {'ms':>10} {'Δwaktu':>8} {'throughput/s':>14} {'MB':>8} {'Δmem':>8}"]
+    for name, r in run['results'].items():
+        o = old.get(name, {})
+        rate = f"{r['throughput']:,.0f}" if r['throughput'] else '-'
+        lines.append(f"{name:<45} {r['seconds'] * 1000:>10.1f} {_delta(r['seconds'], o.get('seconds')):>8} "
+                     f"{rate:>14} {r['peak_mb']:>8.1f} {_delta(r['peak_mb'], o.get('peak_mb')):>8}")
+    if previous:
+        lines.append(f"\nDibandingkan dengan run {previous['time']} (commit {previous.get('commit') or '?'}).")
+    return "\n".join(lines)
+
+# ==============================================================================
+# PROFIL WAKTU IMPORT (COLD START)
+# ==============================================================================
+# `python benchmark.py imports` menjalankan `python -X importtime -c "import bot"` di
+# proses baru dan meringkas hasilnya: total waktu import, package teratas (jumlah waktu
+# self semua modulnya), dan modul dengan waktu kumulatif terbesar. Dipakai untuk menjaga
+# cold start bot tetap singkat (klien & strategi dimuat lazy, lihat utils.client).
+
+def import_profile(module: str = 'bot') -> dict:
+    """Profil import `module` di interpreter baru. Durasi dalam detik."""
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                          capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"Import {module} gagal:\n{proc.stderr[-2000:]}")
+    modules = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules.append({'module': name.strip(), 'depth': (len(name) - len(name.lstrip()) - 1) // 2,
+                        'self': int(self_us) / 1e6, 'cumulative': int(cumulative_us) / 1e6})
+    packages = {}
+    for m in modules:
+        root = m['module'].split('.')[0]
+        packages[root] = packages.get(root, 0.0) + m['self']
+    return {
+        'module': module, 'wall': wall,
+        'total': sum(m['cumulative'] for m in modules if m['depth'] == 0),
+        'packages': sorted(packages.items(), key=lambda item: item[1], reverse=True),
+        'modules': sorted(modules, key=lambda m: m['cumulative'], reverse=True),
+    }
+
+def format_import_profile(profile: dict, top: int = 15) -> str:
+    lines = [f"Import {profile['module']}: {profile['total'] * 1000:.0f} ms "
+             f"(proses python total {profile['wall'] * 1000:.0f} ms)", "", f"{'package':<32} {'self ms':>9}"]
+    lines += [f"{name[:32]:<32} {seconds * 1000:>9.1f}" for name, seconds in profile['packages'][:top]]
+    lines += ["", f"{'modul':<40} {'kumulatif ms':>13}"]
+    lines += [f"{m['module'][:40]:<40} {m['cumulative'] * 1000:>13.1f}" for m in profile['modules'][:top]]
+    return "\n".join(lines)
+
+# ==============================================================================
+# CLI
+# ==============================================================================
+
+def record_fixtures(symbols: list[str], intervals: list[str], candles: int):
+    """Merekam klines asli dari Binance ke fixture (butuh akses API)."""
+    end_ms = int(time.time() * 1000)
+    for interval in intervals:
+        os.makedirs(os.path.join(fixture_dir(), interval), exist_ok=True)
+        for symbol in symbols:
+            df = utils.fetch_klines_history(symbol, interval, end_ms - candles * utils.interval_to_ms(interval), end_ms)
+            if df.empty:
+                logger.error(f"Gagal merekam {symbol} {interval}."); continue
+            np.save(_fixture_path(symbol, interval), utils._frame_to_records(df, interval))
+            logger.info(f"Fixture {symbol} {interval}: {len(df)} candle disimpan.")
+
+def main(argv=None):
+    """
+    Contoh:
+        python benchmark.py run --sizes 500,1500 --strategies momentum_trend_rider_v1 --label "sebelum refactor"
+        python benchmark.py record --symbols BTCUSDT,ETHUSDT --intervals 15m,1h --candles 50000
+        python benchmark.py imports --module bot
+    """
+    parser = argparse.ArgumentParser(description="Benchmark strategi, backtest, dan parsing klines dengan fixture market.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    run = sub.add_parser('run', help="Menjalankan benchmark dan menambahkan hasil ke history JSON.")
+    run.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)), help="Ukuran data (candle), dipisah koma.")
+    run.add_argument('--strategies', help="Nama strategi dipisah koma. Default: semua strategi.")
+    run.add_argument('--symbols', default=','.join(FIXTURE_SYMBOLS[:3]), help="Simbol untuk multi backtest & scan.")
+    run.add_argument('--repeat', type=int, default=3)
+    run.add_argument('--executor', choices=['thread', 'process', 'inline'], default='inline')
+    run.add_argument('--label', help="Catatan untuk run ini (misal nama perubahan).")
+    run.add_argument('--history', default=None, help="File history JSON. Default: BENCHMARK_DIR/history.json.")
+    run.add_argument('--no-save', action='store_true', help="Jangan simpan hasil ke history.")
+    rec = sub.add_parser('record', help="Merekam klines asli sebagai fixture.")
+    rec.add_argument('--symbols', default=','.join(FIXTURE_SYMBOLS))
+    rec.add_argument('--intervals', default='15m,1h')
+    rec.add_argument('--candles', type=int, default=max(DEFAULT_SIZES))
+    imp = sub.add_parser('imports', help="Profil waktu import (cold start) sebuah modul.")
+    imp.add_argument('--module', default='bot')
+    imp.add_argument('--top', type=int, default=15)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+    split = lambda text: [s.strip() for s in text.split(',') if s.strip()]
+    if args.command == 'imports':
+        print(format_import_profile(import_profile(args.module), args.top)); return
+    if args.command == 'record':
+        record_fixtures([s.upper() for s in split(args.symbols)], split(args.intervals), args.candles); return
+
+    # Log per backtest / per request tidak relevan untuk benchmark
+    for name in ('features', 'utils', 'data_context', 'strategies'):
+        logging.getLogger(name).setLevel(logging.WARNING)
+    strategy_names = split(args.strategies) if args.strategies else sorted(AVAILABLE_STRATEGIES)
+    suite = run_suite([int(s) for s in split(args.sizes)], strategy_names, [s.upper() for s in split(args.symbols)],
+                      repeat=args.repeat, executor_mode=args.executor)
+    run_entry = {
+        'time': datetime.now(timezone.utc).isoformat(timespec='seconds'), 'commit': _git_commit(), 'label': args.label,
+        'python': platform.python_version(), 'cpus': os.cpu_count(), 'executor': args.executor,
+        'fixtures': suite['fixtures'], 'results': suite['results'],
+    }
+    path = args.history or history_path()
+    history = load_history(path)
+    previous = history[-1] if history else None
+    print(format_comparison(run_entry, previous))
+    if not args.no_save:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(history + [run_entry], f, indent=2)
+        print(f"Hasil disimpan ke {path}")
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,25 @@
 # bot.py
 
+import asyncio
 import logging
+import time
+START_TIME = time.perf_counter() # Awal pengukuran cold start (sebelum import berat)
 from telegram.ext import Application, CommandHandler, CallbackQueryHandler
+from telegram.request import HTTPXRequest
 
 # Import dari file-file lain dalam proyek
 import config
+import utils
 import handlers
-from strategies import AVAILABLE_STRATEGIES # Penting: Import ini memicu pemuatan strategi
+import features
+import market_data
+import streaming
+import universe
+import state_store
+import trade_monitor
+import indicators
+import perf
+from strategies import AVAILABLE_STRATEGIES # Strategi dimuat saat pertama dipakai / oleh warm_up
 
 # ==============================================================================
 # SETUP LOGGING DASAR
@@ -18,6 +31,107 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# ==============================================================================
+# PENCATATAN LATENSI TELEGRAM
+# ==============================================================================
+class TracedRequest(HTTPXRequest):
+    """HTTPXRequest yang mencatat durasi setiap panggilan Bot API (tahap 'telegram' di perf.py)."""
+
+    async def do_request(self, url: str, method: str, *args, **kwargs):
+        with perf.span('telegram', method=url.rsplit('/', 1)[-1]):
+            return await super().do_request(url, method, *args, **kwargs)
+
+# ==============================================================================
+# HOOK SIKLUS HIDUP APLIKASI
+# ==============================================================================
+metrics_runner = None
+
+def warm_up() -> None:
+    """Inisialisasi klien eksternal & memuat semua strategi di thread latar, agar request pertama tidak menunggu."""
+    start = time.perf_counter()
+    utils.warm_up_clients()
+    AVAILABLE_STRATEGIES.load_all()
+    logger.info(f"Warm-up klien & strategi selesai dalam {time.perf_counter() - start:.2f} detik.")
+
+async def post_init(app: Application) -> None:
+    """Menjalankan layanan latar bot setelah aplikasi siap."""
+    global metrics_runner
+    startup = time.perf_counter() - START_TIME
+    perf.record('startup', startup)
+    logger.info(f"Bot siap dalam {startup:.2f} detik sejak start proses.")
+    app.create_task(asyncio.to_thread(warm_up))
+    # Monitor SL/TP dibuat sebelum restore_jobs agar posisi terbuka yang dipulihkan ikut dipantau
+    if config.FORWARDTEST_MONITOR_ENABLED:
+        trade_monitor.monitor = trade_monitor.TradeMonitor(features.build_monitor_exit_handler(app), config.FORWARDTEST_MONITOR_MAX_AGE)
+        await trade_monitor.monitor.start()
+    restore_jobs(app)
+    # Endpoint metrik Prometheus (opsional)
+    if config.PERF_METRICS_PORT > 0:
+        try:
+            metrics_runner = await perf.start_metrics_server(config.PERF_METRICS_HOST, config.PERF_METRICS_PORT)
+        except OSError as e:
+            logger.error(f"Gagal menjalankan endpoint metrik di port {config.PERF_METRICS_PORT}: {e}")
+    universe.service.start() # Refresh universe simbol berkala
+    if config.STREAMING_ENABLED:
+        app.create_task(start_streaming(app))
+
+def stream_intervals() -> tuple[list[str], set[str]]:
+    """(Interval yang di-stream, timeframe utama strategi). Memuat strategi, jadi jalankan di thread."""
+    return streaming.default_intervals(), {getattr(s, 'TIMEFRAME', '15m') for s in AVAILABLE_STRATEGIES.values()}
+
+async def start_streaming(app: Application) -> None:
+    """Memulai stream WebSocket setelah interval strategi diketahui (tanpa memblokir event loop)."""
+    intervals, scan_intervals = await asyncio.to_thread(stream_intervals)
+    streaming.hub = streaming.MarketStream(intervals, config.STREAM_BUFFER_SIZE)
+    streaming.hub.add_close_listener(indicators.on_candle_close)
+    streaming.hub.add_close_listener(build_close_scan_trigger(app, scan_intervals))
+    await streaming.hub.start(universe.service.symbols, config.UNIVERSE_REFRESH_SECONDS)
+
+def restore_jobs(app: Application) -> None:
+    """Menjadwalkan ulang job auto scan & forward test (dan memantau posisi terbuka) untuk state yang dipulihkan dari state store."""
+    if app.bot_data.get('autoscan_chats'):
+        handlers.schedule_autoscan_job(app.job_queue)
+    forwardtest = app.bot_data.get('forwardtest_data', {})
+    active = [chat_id for chat_id, ft_data in forwardtest.items() if ft_data.get('active')]
+    for chat_id in active:
+        handlers.schedule_forwardtest_job(app.job_queue, chat_id)
+        if trade_monitor.monitor is not None:
+            for trade in forwardtest[chat_id]['book'].open_trades():
+                trade_monitor.monitor.watch(chat_id, trade)
+    if active:
+        logger.info(f"Forward test dilanjutkan untuk {len(active)} chat.")
+
+def build_close_scan_trigger(app: Application, scan_intervals: set[str]):
+    """
+    Listener candle close: menjadwalkan auto scan sekali per candle `scan_intervals`
+    (timeframe utama strategi) yang ditutup (bukan sekali per simbol), jika ada chat
+    yang mengaktifkan auto scan.
+    """
+    last_scheduled = {}
+
+    def on_close(symbol: str, interval: str, record) -> None:
+        open_time = int(record['open_time'])
+        if interval not in scan_intervals or last_scheduled.get(interval, -1) >= open_time:
+            return
+        if not app.bot_data.get('autoscan_chats'):
+            return
+        last_scheduled[interval] = open_time
+        app.job_queue.run_once(features.continuous_scan_job, when=config.STREAM_SCAN_DELAY)
+    return on_close
+
+async def post_shutdown(app: Application) -> None:
+    """Menghentikan semua layanan latar saat bot berhenti."""
+    if streaming.hub is not None:
+        await streaming.hub.stop()
+    if trade_monitor.monitor is not None:
+        await trade_monitor.monitor.stop()
+    if metrics_runner is not None:
+        await metrics_runner.cleanup()
+    await asyncio.to_thread(universe.service.stop)
+    await market_data.client.close() # Sesi HTTP klien market data async
+    await asyncio.to_thread(state_store.store.close) # Menulis sisa perubahan state ke disk
+    features.shutdown_process_pool()
+
 # ==============================================================================
 # FUNGSI UTAMA (MAIN)
 # ==============================================================================
@@ -28,21 +142,30 @@ def main() -> None:
     
     # 1. Membuat Aplikasi Bot
     logger.info("Membangun aplikasi bot...")
-    app = Application.builder().token(config.TELEGRAM_TOKEN).build()
+    # Request Bot API lewat TracedRequest agar latensi kirim pesan tercatat (/perf)
+    app = (
+        Application.builder().token(config.TELEGRAM_TOKEN)
+        .request(TracedRequest(connection_pool_size=256))
+        .post_init(post_init).post_shutdown(post_shutdown).build()
+    )
     
-    # 2. Inisialisasi 'database' sementara bot (bot_data)
-    #    Digunakan untuk menyimpan cache, daftar chat autoscan, dll.
-    app.bot_data.setdefault('top_symbols_cache', {})
+    # 2. Inisialisasi 'database' bot (bot_data)
+    #    Digunakan untuk menyimpan daftar chat autoscan, anti-spam, dan forward test.
+    #    Dipulihkan dari state store (SQLite) jika aktif; job-nya dijadwalkan ulang di post_init.
+    if config.STATE_STORE_ENABLED:
+        app.bot_data.update(state_store.store.open())
     app.bot_data.setdefault('last_signal_time', {})
     app.bot_data.setdefault('autoscan_chats', set())
-    app.bot_data.setdefault('forwardtest_data', {'active': False, 'open_trades': [], 'closed_trades': []})
+    app.bot_data.setdefault('forwardtest_data', {})  # {chat_id: data forward test chat tersebut}
 
     # 3. Mendaftarkan Semua Handler
     logger.info("Mendaftarkan handlers...")
     
     # Handler untuk Tombol Inline (CallbackQuery)
     # Ini menangani SEMUA penekanan tombol di seluruh bot.
-    app.add_handler(CallbackQueryHandler(handlers.button_callback_handler))
+    # block=False: aksi panjang (misal scan) berjalan sebagai task sendiri sehingga
+    # update dari pengguna lain tetap diproses selama aksi berlangsung.
+    app.add_handler(CallbackQueryHandler(handlers.button_callback_handler, block=False))
 
     # Handler untuk Perintah Manual
     # Ini berfungsi sebagai alternatif jika pengguna lebih suka mengetik.
@@ -51,12 +174,14 @@ def main() -> None:
     app.add_handler(CommandHandler("analyze", handlers.analyze_handler))
     app.add_handler(CommandHandler("backtest", handlers.backtest_handler))
     app.add_handler(CommandHandler("multibacktest", handlers.multibacktest_handler))
+    app.add_handler(CommandHandler("optimize", handlers.optimize_handler))
     app.add_handler(CommandHandler("forwardtest", handlers.forwardtest_handler))
+    app.add_handler(CommandHandler("perf", handlers.perf_handler))
     app.add_handler(CommandHandler("order", handlers.order_handler))
     
     # 4. Memberi tahu di log bahwa bot siap dijalankan
     logger.info("="*50)
-    logger.info(f"MEMUAT {len(AVAILABLE_STRATEGIES)} STRATEGI: {list(AVAILABLE_STRATEGIES.keys())}")
+    logger.info(f"TERDAFTAR {len(AVAILABLE_STRATEGIES)} STRATEGI: {list(AVAILABLE_STRATEGIES.keys())}")
     logger.info("BOT TRADING (MULTI-STRATEGI) TELAH DIMULAI")
     logger.info("="*50)
     
@@ -0,0 +1,87 @@
+# candle_store.py
+
+import os
+import logging
+import threading
+import numpy as np
+
+# Import konfigurasi dari file config.py
+import config
+
+logger = logging.getLogger(__name__)
+
+# ==============================================================================
+# FORMAT DATA
+# ==============================================================================
+# Satu file biner per (symbol, interval): <CANDLE_STORE_DIR>/<interval>/<SYMBOL>.bin
+# Isinya adalah deretan record dengan dtype tetap di bawah (tanpa header), terurut
+# berdasarkan open_time dan hanya berisi candle yang SUDAH ditutup. Karena ukuran
+# record tetap, file bisa di-append langsung dan dibaca lewat np.memmap tanpa parsing.
+CANDLE_DTYPE = np.dtype([
+    ('open_time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'),
+    ('close', '<f8'), ('volume', '<f8'), ('close_time', '<i8'),
+])
+
+class CandleStore:
+    """Penyimpanan candle OHLCV di disk, di-key dengan (symbol, interval)."""
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def _path(self, symbol: str, interval: str) -> str:
+        return os.path.join(self.root_dir, interval, f"{symbol.upper()}.bin")
+
+    def lock(self, symbol: str, interval: str) -> threading.Lock:
+        """Lock per (symbol, interval) agar sinkronisasi yang sama tidak berjalan dobel."""
+        key = (symbol.upper(), interval)
+        with self._locks_guard:
+            if key not in self._locks:
+                self._locks[key] = threading.Lock()
+            return self._locks[key]
+
+    def read(self, symbol: str, interval: str) -> np.ndarray:
+        """Membaca semua candle tersimpan (memory-mapped, read-only). Array kosong jika belum ada."""
+        path = self._path(symbol, interval)
+        if not os.path.exists(path) or os.path.getsize(path) < CANDLE_DTYPE.itemsize:
+            return np.empty(0, dtype=CANDLE_DTYPE)
+        count = os.path.getsize(path) // CANDLE_DTYPE.itemsize
+        return np.memmap(path, dtype=CANDLE_DTYPE, mode='r', shape=(count,))
+
+    def append(self, symbol: str, interval: str, records: np.ndarray) -> int:
+        """Menambahkan candle yang lebih baru dari data tersimpan. Mengembalikan jumlah candle baru."""
+        stored = self.read(symbol, interval)
+        if len(stored):
+            records = records[records['open_time'] > stored['open_time'][-1]]
+        if not len(records):
+            return 0
+        path = self._path(symbol, interval)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'ab') as f:
+            f.write(np.ascontiguousarray(records, dtype=CANDLE_DTYPE).tobytes())
+        return len(records)
+
+    def replace(self, symbol: str, interval: str, records: np.ndarray) -> np.ndarray:
+        """Menulis ulang seluruh isi file secara atomik (tmp file + rename)."""
+        records = np.ascontiguousarray(records, dtype=CANDLE_DTYPE)
+        path = self._path(symbol, interval)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(records.tobytes())
+        os.replace(tmp_path, path)
+        return records
+
+    def merge(self, symbol: str, interval: str, records: np.ndarray) -> np.ndarray:
+        """
+        Menggabungkan candle (boleh tumpang tindih/lebih lama) dengan data tersimpan,
+        lalu menulis ulang file. Mengembalikan hasil gabungan yang terurut.
+        """
+        combined = np.concatenate([np.asarray(self.read(symbol, interval)), records.astype(CANDLE_DTYPE)])
+        # Data terbaru menang jika open_time sama
+        _, last_idx = np.unique(combined['open_time'][::-1], return_index=True)
+        return self.replace(symbol, interval, combined[::-1][last_idx])
+
+# Instance global yang dipakai oleh utils.fetch_klines
+store = CandleStore(config.CANDLE_STORE_DIR)
@@ -0,0 +1,131 @@
+# candles.py
+
+import logging
+import numpy as np
+import pandas as pd
+
+# Import dari file-file lain dalam proyek
+import candle_store
+
+logger = logging.getLogger(__name__)
+
+# ==============================================================================
+# CONTAINER CANDLE KOLUMNAR
+# ==============================================================================
+# Candles menyimpan OHLCV dalam dua blok array kontigu:
+#   prices : float64 [5, n] -> baris open, high, low, close, volume
+#   times  : int64   [2, n] -> baris open_time, close_time (epoch ms)
+# Setiap kolom (`c.close`, `c['high']`) adalah view tanpa salinan, dan potongan
+# (`c[-200:]`) juga hanya view. `to_pandas()` membungkus blok harga sebagai satu
+# block DataFrame tanpa menyalin, dengan format yang sama seperti `utils.fetch_klines`.
+#
+# Pemakai tidak boleh mengubah isi array (sama seperti frame yang ditandai di
+# indicators.py): frame hasil `to_pandas()` berbagi memori dengan container.
+
+PRICE_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+TIME_COLUMNS = ('open_time', 'close_time')
+FRAME_COLUMNS = ('open_time',) + PRICE_COLUMNS
+
+class Candles:
+    """Deretan candle OHLCV kolumnar (lihat keterangan modul)."""
+
+    __slots__ = ('prices', 'times')
+
+    def __init__(self, prices: np.ndarray, times: np.ndarray):
+        self.prices = prices
+        self.times = times
+
+    # --------------------------------------------------------------------------
+    # KONSTRUKTOR
+    # --------------------------------------------------------------------------
+
+    @classmethod
+    def empty(cls) -> 'Candles':
+        return cls(np.empty((len(PRICE_COLUMNS), 0)), np.empty((len(TIME_COLUMNS), 0), dtype=np.int64))
+
+    @classmethod
+    def from_klines(cls, data: list) -> 'Candles':
+        """
+        Dari respons mentah futures_klines (list of list; harga berupa string).
+        String diparse langsung oleh numpy ke float64/int64 dalam satu langkah per blok,
+        tanpa DataFrame object perantara.
+        """
+        if not data:
+            return cls.empty()
+        prices = np.array([row[1:6] for row in data], dtype=np.float64).T.copy()
+        times = np.array([(row[0], row[6]) for row in data], dtype=np.int64).T.copy()
+        return cls(prices, times)
+
+    @classmethod
+    def from_records(cls, records: np.ndarray) -> 'Candles':
+        """Dari record array `candle_store.CANDLE_DTYPE` (candle store, buffer stream)."""
+        if not len(records):
+            return cls.empty()
+        prices = np.empty((len(PRICE_COLUMNS), len(records)))
+        for row, name in enumerate(PRICE_COLUMNS):
+            prices[row] = records[name]
+        times = np.empty((len(TIME_COLUMNS), len(records)), dtype=np.int64)
+        for row, name in enumerate(TIME_COLUMNS):
+            times[row] = records[name]
+        return cls(prices, times)
+
+    # --------------------------------------------------------------------------
+    # AKSES KOLOM & POTONGAN
+    # --------------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return self.prices.shape[1]
+
+    def __getitem__(self, key):
+        """`c['close']` -> view kolom; `c[a:b]` -> Candles (view)."""
+        if isinstance(key, str):
+            return self.column(key)
+        if not isinstance(key, slice):
+            raise TypeError("Candles hanya mendukung indeks nama kolom atau slice.")
+        return Candles(self.prices[:, key], self.times[:, key])
+
+    def column(self, name: str) -> np.ndarray:
+        if name in PRICE_COLUMNS:
+            return self.prices[PRICE_COLUMNS.index(name)]
+        if name in TIME_COLUMNS:
+            return self.times[TIME_COLUMNS.index(name)]
+        raise KeyError(name)
+
+    open = property(lambda self: self.prices[0])
+    high = property(lambda self: self.prices[1])
+    low = property(lambda self: self.prices[2])
+    close = property(lambda self: self.prices[3])
+    volume = property(lambda self: self.prices[4])
+    open_time = property(lambda self: self.times[0])
+    close_time = property(lambda self: self.times[1])
+
+    @property
+    def nbytes(self) -> int:
+        return self.prices.nbytes + self.times.nbytes
+
+    def __repr__(self) -> str:
+        return f"Candles(n={len(self)})"
+
+    # --------------------------------------------------------------------------
+    # KONVERSI
+    # --------------------------------------------------------------------------
+
+    def to_records(self) -> np.ndarray:
+        """Record array `candle_store.CANDLE_DTYPE` (salinan)."""
+        records = np.empty(len(self), dtype=candle_store.CANDLE_DTYPE)
+        for name in PRICE_COLUMNS + TIME_COLUMNS:
+            records[name] = self.column(name)
+        return records
+
+    def to_pandas(self) -> pd.DataFrame:
+        """
+        DataFrame [open_time, open, high, low, close, volume] seperti `utils.fetch_klines`.
+        Kolom harga berbagi memori dengan container (tanpa salinan); DataFrame kosong jika tidak ada candle.
+        """
+        if not len(self):
+            return pd.DataFrame()
+        # Transpose dari [5, n] C-contiguous = layout block internal pandas, jadi tidak disalin.
+        # Slice dengan step membuat baris tidak kontigu; dalam kasus itu pandas menyalin.
+        df = pd.DataFrame(self.prices.T, columns=list(PRICE_COLUMNS), copy=False)
+        df.insert(0, 'open_time', self.open_time.astype('datetime64[ms]').astype('datetime64[ns]'))
+        return df
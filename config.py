@@ -22,8 +22,106 @@ TOP_N_SYMBOLS        = int(os.getenv('TOP_N_SYMBOLS', 50))
 VOLATILITY_THRESHOLD = float(os.getenv('VOLATILITY_THRESHOLD', 0.05))
 BACKTEST_WORKERS     = int(os.getenv('BACKTEST_WORKERS', 10))
 
+# Universe top simbol (universe.py): diperbarui thread latar setiap UNIVERSE_REFRESH_SECONDS.
+# Filter "nama:nilai" dipisah koma, dijalankan berurutan: min_volume (USDT 24 jam),
+# min_volatility / max_volatility ((high - low) / low 24 jam), max_abs_funding,
+# min_open_interest (USDT). Peringkat menurun: volume, volatility, funding, abs_funding, open_interest.
+UNIVERSE_FILTERS          = os.getenv('UNIVERSE_FILTERS', f'min_volatility:{VOLATILITY_THRESHOLD}')
+UNIVERSE_RANK_BY          = os.getenv('UNIVERSE_RANK_BY', 'volume')
+UNIVERSE_REFRESH_SECONDS  = int(os.getenv('UNIVERSE_REFRESH_SECONDS', 900))
+
+# Mode engine backtest:
+#   'vectorized' -> indikator dihitung SEKALI pada seluruh data, sinyal untuk
+#                   semua candle dihasilkan dalam satu langkah lewat `generate_signals`
+#                   (cepat jika strategi punya implementasi native).
+#   'slice'      -> mode lama, `check_signal` dipanggil per candle pada potongan data.
+BACKTEST_ENGINE      = os.getenv('BACKTEST_ENGINE', 'vectorized')
+
+# Timeframe kecil (misal '1m') untuk menyelesaikan candle backtest yang menyentuh SL
+# dan TP sekaligus. Kosong = nonaktif, candle seperti itu dihitung LOSS (konservatif).
+BACKTEST_INTRABAR_INTERVAL = os.getenv('BACKTEST_INTRABAR_INTERVAL', '')
+
+# Cara menjalankan backtest banyak simbol (multi backtest, peringkat koin):
+#   'thread'  -> ThreadPoolExecutor(BACKTEST_WORKERS) (mode lama, satu core karena GIL)
+#   'process' -> data dimuat sekali lalu dibagikan via shared memory ke BACKTEST_PROCESSES proses
+#   'inline'  -> berurutan di proses yang sama (mudah untuk debugging)
+BACKTEST_EXECUTOR    = os.getenv('BACKTEST_EXECUTOR', 'thread')
+BACKTEST_PROCESSES   = int(os.getenv('BACKTEST_PROCESSES', os.cpu_count() or 1))
+
+# Optimizer parameter (/optimize & optimizer.py): jumlah top simbol default jika simbol
+# tidak disebutkan, dan batas jumlah kombinasi parameter per perintah Telegram.
+OPTIMIZER_DEFAULT_SYMBOLS  = int(os.getenv('OPTIMIZER_DEFAULT_SYMBOLS', 5))
+OPTIMIZER_MAX_COMBINATIONS = int(os.getenv('OPTIMIZER_MAX_COMBINATIONS', 200))
+
+# Jumlah maksimum hasil indikator (kolom pandas_ta) di cache LRU bersama (indicators.py).
+# 0 = cache nonaktif.
+INDICATOR_CACHE_SIZE = int(os.getenv('INDICATOR_CACHE_SIZE', 2048))
+
+# Pencatatan latensi per tahap (perf.py, perintah /perf): jumlah sampel terakhir per
+# (tahap, label) untuk p50/p95/p99. Port > 0 mengaktifkan endpoint teks Prometheus
+# http://PERF_METRICS_HOST:PERF_METRICS_PORT/metrics.
+PERF_ENABLED      = os.getenv('PERF_ENABLED', 'true').lower() == 'true'
+PERF_SAMPLE_SIZE  = int(os.getenv('PERF_SAMPLE_SIZE', 512))
+PERF_METRICS_HOST = os.getenv('PERF_METRICS_HOST', '127.0.0.1')
+PERF_METRICS_PORT = int(os.getenv('PERF_METRICS_PORT', 0))
+
+# Folder fixture klines & history hasil benchmark.py
+BENCHMARK_DIR = os.getenv('BENCHMARK_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'benchmarks'))
+
 # Parameter strategi telah dipindahkan ke masing-masing file strategi.
 
+# ==============================================================================
+# BATAS REQUEST BINANCE
+# ==============================================================================
+# Batas weight REST per menit yang boleh dipakai bot (limit Binance Futures: 2400).
+BINANCE_WEIGHT_PER_MINUTE = int(os.getenv('BINANCE_WEIGHT_PER_MINUTE', 1800))
+# Jumlah request paralel saat mengambil histori panjang (paginasi).
+HISTORY_FETCH_WORKERS     = int(os.getenv('HISTORY_FETCH_WORKERS', 4))
+# Jumlah koneksi HTTP maksimum klien market data async (market_data.py).
+MARKET_DATA_MAX_CONNECTIONS = int(os.getenv('MARKET_DATA_MAX_CONNECTIONS', 20))
+
+# ==============================================================================
+# PENYIMPANAN CANDLE LOKAL (CANDLE STORE)
+# ==============================================================================
+# Jika aktif, utils.fetch_klines menyimpan candle yang sudah ditutup ke disk dan
+# hanya mengambil candle yang lebih baru dari data tersimpan.
+CANDLE_STORE_ENABLED = os.getenv('CANDLE_STORE_ENABLED', 'true').lower() == 'true'
+CANDLE_STORE_DIR     = os.getenv('CANDLE_STORE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'candles'))
+# Mode offline: data HANYA dibaca dari disk (backtest reproducible tanpa API).
+CANDLE_STORE_OFFLINE = os.getenv('CANDLE_STORE_OFFLINE', 'false').lower() == 'true'
+
+# ==============================================================================
+# PENYIMPANAN STATE BOT
+# ==============================================================================
+# Chat auto scan, anti-spam sinyal, dan trade forward test disimpan di SQLite (state_store.py)
+# agar tidak hilang saat bot restart. Perubahan ditulis per batch setiap STATE_FLUSH_SECONDS.
+STATE_STORE_ENABLED = os.getenv('STATE_STORE_ENABLED', 'true').lower() == 'true'
+STATE_DB_PATH       = os.getenv('STATE_DB_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'state.db'))
+STATE_FLUSH_SECONDS = float(os.getenv('STATE_FLUSH_SECONDS', 1.0))
+
+# ==============================================================================
+# STREAMING WEBSOCKET (OPSIONAL)
+# ==============================================================================
+# Jika aktif, bot berlangganan stream kline & mark price Binance Futures untuk
+# universe top simbol. fetch_klines membaca buffer in-memory (tanpa REST) dan
+# auto scan dijalankan tepat saat candle ditutup.
+STREAMING_ENABLED      = os.getenv('STREAMING_ENABLED', 'false').lower() == 'true'
+STREAM_BASE_URL        = os.getenv('STREAM_BASE_URL', 'wss://fstream.binance.com')
+# Interval yang di-stream, dipisah koma (misal "15m,1h"). Kosong = semua timeframe strategi.
+STREAM_INTERVALS       = os.getenv('STREAM_INTERVALS', '')
+# Jumlah candle per buffer (symbol, interval); request klines lebih panjang tetap lewat REST.
+STREAM_BUFFER_SIZE     = int(os.getenv('STREAM_BUFFER_SIZE', 1000))
+# Toleransi keterlambatan event penutupan candle sebelum buffer dianggap tidak aktual.
+STREAM_MAX_LAG_SECONDS = int(os.getenv('STREAM_MAX_LAG_SECONDS', 5))
+# Jeda (detik) setelah candle ditutup sebelum auto scan dijalankan, agar semua simbol sudah masuk.
+STREAM_SCAN_DELAY      = float(os.getenv('STREAM_SCAN_DELAY', 2))
+
+# Monitor SL/TP forward test (trade_monitor.py): posisi terbuka ditutup tepat saat mark price
+# (stream 1 detik, hanya simbol dengan posisi terbuka) menyentuh SL/TP. Simbol tanpa update
+# selama FORWARDTEST_MONITOR_MAX_AGE detik tetap dicek polling job forward test.
+FORWARDTEST_MONITOR_ENABLED = os.getenv('FORWARDTEST_MONITOR_ENABLED', 'true').lower() == 'true'
+FORWARDTEST_MONITOR_MAX_AGE = float(os.getenv('FORWARDTEST_MONITOR_MAX_AGE', 10))
+
 # ==============================================================================
 # KONFIGURASI PROXY (OPSIONAL)
 # ==============================================================================
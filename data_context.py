@@ -0,0 +1,124 @@
+# data_context.py
+
+import logging
+from abc import ABC, abstractmethod
+import numpy as np
+import pandas as pd
+
+# Import dari file-file lain dalam proyek
+import utils
+
+logger = logging.getLogger(__name__)
+
+# ==============================================================================
+# KONTEKS DATA UNTUK STRATEGI
+# ==============================================================================
+# Strategi multi-timeframe membutuhkan candle HTF (misal 1h) di dalam check_signal.
+# Alih-alih memanggil utils.fetch_klines langsung, strategi meminta data lewat
+# objek konteks. Saat live, konteks mengambil data terbaru dari Binance. Saat
+# backtest, konteks melayani data dari frame yang sudah dimuat sekali, dipotong
+# sesuai waktu candle yang sedang disimulasikan (tanpa look-ahead).
+
+class DataContext(ABC):
+    """Antarmuka dasar konteks data."""
+    is_historical = False
+
+    @abstractmethod
+    def get_klines(self, symbol: str, interval: str, limit: int) -> pd.DataFrame:
+        pass
+
+class LiveDataContext(DataContext):
+    """Konteks live: data selalu diambil dari utils.fetch_klines."""
+
+    def get_klines(self, symbol: str, interval: str, limit: int) -> pd.DataFrame:
+        return utils.fetch_klines(symbol, interval, limit=limit)
+
+class PrefetchedDataContext(DataContext):
+    """
+    Konteks live dengan frame yang sudah diambil di awal satu siklus scan. Setiap
+    (symbol, interval) cukup diambil sekali lalu dibagikan ke semua strategi.
+    Frame yang tidak ada di rencana diambil live.
+    """
+
+    def __init__(self, frames: dict, fallback: DataContext | None = None):
+        """
+        Args:
+            frames (dict): {(symbol, interval): DataFrame klines terbaru}.
+            fallback (DataContext | None): Konteks untuk frame di luar `frames` (default: LIVE).
+        """
+        self.frames = frames
+        self.fallback = fallback
+
+    def get_klines(self, symbol: str, interval: str, limit: int) -> pd.DataFrame:
+        df = self.frames.get((symbol, interval))
+        if df is None:
+            return (self.fallback or LIVE).get_klines(symbol, interval, limit)
+        # Salinan, karena strategi menambahkan kolom indikator ke DataFrame yang diterimanya
+        return df.iloc[-limit:].reset_index(drop=True).copy()
+
+class HistoricalDataContext(DataContext):
+    """
+    Konteks backtest (point-in-time). Hanya candle HTF yang SUDAH ditutup pada
+    waktu simulasi (`as_of`) yang terlihat oleh strategi.
+    """
+    is_historical = True
+
+    def __init__(self, frames: dict, base_interval: str, as_of: int | None = None):
+        """
+        Args:
+            frames (dict): {(symbol, interval): DataFrame klines} yang sudah dimuat.
+            base_interval (str): Timeframe utama backtest (untuk menghitung waktu tutup candle LTF).
+            as_of (int | None): Waktu simulasi dalam milidetik (UTC).
+        """
+        self.frames = frames
+        self.base_interval = base_interval
+        self.as_of = as_of
+        # Waktu tutup (eksklusif) setiap candle per frame, dipakai untuk binary search
+        self._close_times = {
+            key: _to_ms(df['open_time']) + utils.interval_to_ms(key[1]) for key, df in frames.items()
+        }
+
+    @classmethod
+    def load(cls, symbol: str, requirements: list[tuple[str, int]], start_ms: int, end_ms: int, base_interval: str) -> 'HistoricalDataContext':
+        """Memuat semua frame HTF yang dibutuhkan strategi untuk rentang backtest, cukup sekali."""
+        frames = {}
+        for interval, limit in requirements:
+            # Tambahkan histori sebanyak `limit` candle sebelum awal backtest sebagai warmup
+            warmup_ms = limit * utils.interval_to_ms(interval)
+            df = utils.fetch_klines_history(symbol, interval, start_ms=start_ms - warmup_ms, end_ms=end_ms)
+            if df.empty:
+                logger.warning(f"Data {interval} untuk {symbol} tidak tersedia untuk konteks backtest.")
+            frames[(symbol, interval)] = df.reset_index(drop=True)
+        return cls(frames, base_interval)
+
+    def at(self, as_of: int) -> 'HistoricalDataContext':
+        """Konteks yang sama untuk waktu simulasi lain (frame tidak disalin)."""
+        ctx = HistoricalDataContext.__new__(HistoricalDataContext)
+        ctx.frames, ctx.base_interval, ctx._close_times, ctx.as_of = self.frames, self.base_interval, self._close_times, as_of
+        return ctx
+
+    def as_of_times(self, df: pd.DataFrame) -> np.ndarray:
+        """Waktu simulasi (ms) untuk setiap candle LTF di `df`, yaitu saat candle tersebut ditutup."""
+        return _to_ms(df['open_time']) + utils.interval_to_ms(self.base_interval)
+
+    def visible_counts(self, symbol: str, interval: str, as_of: np.ndarray) -> np.ndarray:
+        """Jumlah candle (symbol, interval) yang sudah ditutup pada setiap waktu di `as_of`."""
+        close_times = self._close_times.get((symbol, interval))
+        if close_times is None:
+            return np.zeros(len(as_of), dtype=np.int64)
+        return np.searchsorted(close_times, as_of, side='right')
+
+    def get_klines(self, symbol: str, interval: str, limit: int) -> pd.DataFrame:
+        df = self.frames.get((symbol, interval))
+        if df is None or df.empty or self.as_of is None:
+            logger.warning(f"Konteks backtest tidak memiliki data {symbol} {interval}.")
+            return pd.DataFrame()
+        end = int(self.visible_counts(symbol, interval, np.array([self.as_of]))[0])
+        return df.iloc[max(end - limit, 0):end].reset_index(drop=True)
+
+def _to_ms(open_time: pd.Series) -> np.ndarray:
+    """Konversi kolom open_time (datetime64) menjadi milidetik int64."""
+    return open_time.to_numpy().astype('datetime64[ms]').astype(np.int64)
+
+# Konteks default untuk pemanggilan live (scan, auto scan, forward test)
+LIVE = LiveDataContext()
@@ -0,0 +1,121 @@
+# exit_resolver.py
+
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# ==============================================================================
+# RESOLUSI EXIT TRADE (VECTORIZED)
+# ==============================================================================
+# Untuk setiap trade dicari index candle PERTAMA (mulai dari candle entry) yang
+# menyentuh SL dan yang menyentuh TP. Semua trade diproses sekaligus per blok
+# `block` candle: trade yang sudah menemukan exit dikeluarkan dari himpunan aktif,
+# sisanya lanjut ke blok berikutnya. Kebanyakan trade selesai dalam beberapa
+# puluh candle, jadi biasanya hanya perlu satu atau dua iterasi.
+
+# Status hasil resolusi
+STATUS_OPEN, STATUS_WIN, STATUS_LOSS = 0, 1, 2
+STATUS_NAMES = {STATUS_OPEN: 'OPEN', STATUS_WIN: 'WIN', STATUS_LOSS: 'LOSS'}
+
+def first_hits(high: np.ndarray, low: np.ndarray, entry_idx: np.ndarray, sl: np.ndarray, tp: np.ndarray,
+               is_long: np.ndarray, block: int = 64) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Index candle pertama yang menyentuh SL dan TP untuk setiap trade.
+
+    Args:
+        high, low (np.ndarray): Harga high/low seluruh candle.
+        entry_idx (np.ndarray): Index candle entry per trade (candle ini ikut diperiksa).
+        sl, tp (np.ndarray): Level SL/TP per trade. NaN = tidak pernah tersentuh.
+        is_long (np.ndarray): True untuk LONG, False untuk SHORT.
+        block (int): Jumlah candle yang diperiksa per iterasi.
+
+    Returns:
+        tuple: (sl_idx, tp_idx), -1 jika tidak tersentuh. Hanya yang PALING AWAL yang
+               dijamin benar; yang lain bisa -1 jika tersentuh setelah exit.
+    """
+    n = len(high)
+    entry_idx = np.asarray(entry_idx, dtype=np.int64)
+    sl, tp, is_long = np.asarray(sl, dtype=float), np.asarray(tp, dtype=float), np.asarray(is_long, dtype=bool)
+    sl_idx = np.full(len(entry_idx), -1, dtype=np.int64)
+    tp_idx = np.full(len(entry_idx), -1, dtype=np.int64)
+    # Padding NaN agar window di ujung data tidak keluar batas (perbandingan dengan NaN selalu False)
+    high_p = np.concatenate([np.asarray(high, dtype=float), np.full(block, np.nan)])
+    low_p = np.concatenate([np.asarray(low, dtype=float), np.full(block, np.nan)])
+
+    active = np.flatnonzero(entry_idx < n)
+    offset = 0
+    while active.size:
+        starts = entry_idx[active] + offset
+        alive = starts < n
+        active, starts = active[alive], starts[alive]
+        if not active.size:
+            break
+        window = starts[:, None] + np.arange(block)
+        h, l = high_p[window], low_p[window]
+        long_ = is_long[active][:, None]
+        a_sl, a_tp = sl[active][:, None], tp[active][:, None]
+        sl_mask = np.where(long_, l <= a_sl, h >= a_sl)
+        tp_mask = np.where(long_, h >= a_tp, l <= a_tp)
+
+        sl_any, tp_any = sl_mask.any(axis=1), tp_mask.any(axis=1)
+        sl_idx[active[sl_any]] = starts[sl_any] + sl_mask[sl_any].argmax(axis=1)
+        tp_idx[active[tp_any]] = starts[tp_any] + tp_mask[tp_any].argmax(axis=1)
+        active = active[~(sl_any | tp_any)]
+        offset += block
+    return sl_idx, tp_idx
+
+def resolve_exits(high: np.ndarray, low: np.ndarray, entry_idx: np.ndarray, sl: np.ndarray, tp: np.ndarray,
+                  is_long: np.ndarray, block: int = 64) -> dict:
+    """
+    Menentukan hasil semua trade. Jika SL dan TP tersentuh di candle yang sama, trade
+    dihitung LOSS (konservatif, sama seperti simulasi lama) dan ditandai `ambiguous`.
+
+    Returns:
+        dict berisi array per trade:
+            'status'    : STATUS_OPEN / STATUS_WIN / STATUS_LOSS
+            'exit_idx'  : index candle exit (-1 jika masih OPEN)
+            'ambiguous' : True jika SL & TP tersentuh di candle exit yang sama
+    """
+    sl_idx, tp_idx = first_hits(high, low, entry_idx, sl, tp, is_long, block)
+    big = np.iinfo(np.int64).max
+    sl_key = np.where(sl_idx >= 0, sl_idx, big)
+    tp_key = np.where(tp_idx >= 0, tp_idx, big)
+
+    status = np.full(len(sl_idx), STATUS_OPEN, dtype=np.int8)
+    status[sl_key <= tp_key] = STATUS_LOSS
+    status[tp_key < sl_key] = STATUS_WIN
+    status[(sl_key == big) & (tp_key == big)] = STATUS_OPEN
+    exit_idx = np.where(status == STATUS_OPEN, -1, np.minimum(sl_key, tp_key))
+    ambiguous = (sl_key == tp_key) & (sl_key != big)
+    return {'status': status, 'exit_idx': exit_idx, 'ambiguous': ambiguous}
+
+def resolve_intrabar(status: np.ndarray, ambiguous: np.ndarray, bar_open_ms: np.ndarray, sl: np.ndarray,
+                     tp: np.ndarray, is_long: np.ndarray, fetch_ltf) -> np.ndarray:
+    """
+    Menyelesaikan trade ambigu dengan candle timeframe lebih kecil di dalam candle exit.
+
+    Args:
+        status (np.ndarray): Hasil `resolve_exits`, tidak diubah (salinan dikembalikan).
+        ambiguous (np.ndarray): Mask trade yang perlu diselesaikan.
+        bar_open_ms (np.ndarray): open_time (ms) candle exit per trade.
+        fetch_ltf (callable): `fetch_ltf(bar_open_ms) -> (high, low)` array candle LTF di dalam
+                              candle tersebut, terurut waktu. Boleh mengembalikan array kosong.
+
+    Returns:
+        np.ndarray: Status baru. Jika candle LTF pun menyentuh keduanya (atau data tidak
+                    ada), trade tetap LOSS.
+    """
+    status = status.copy()
+    for k in np.flatnonzero(ambiguous):
+        try:
+            high, low = fetch_ltf(int(bar_open_ms[k]))
+        except Exception as e:
+            logger.error(f"Gagal mengambil candle intrabar untuk resolusi exit: {e}")
+            continue
+        if not len(high):
+            continue
+        sub_sl, sub_tp = first_hits(high, low, np.array([0]), sl[k:k+1], tp[k:k+1], is_long[k:k+1])
+        if sub_tp[0] >= 0 and (sub_sl[0] < 0 or sub_tp[0] < sub_sl[0]):
+            status[k] = STATUS_WIN
+    return status
@@ -1,15 +1,29 @@
 # features.py
 
 import logging
+import time
 import pandas as pd
+import numpy as np
 from datetime import datetime, timedelta, timezone
 import asyncio
 import concurrent.futures
+import multiprocessing
+from multiprocessing import shared_memory
 from telegram.ext import ContextTypes
 
 # Import dari file-file lain dalam proyek
 import config
 import utils
+import candle_store
+import market_data
+import exit_resolver
+import streaming
+import indicators
+import perf
+import state_store
+import trade_monitor
+from positions import exit_result
+from data_context import HistoricalDataContext, PrefetchedDataContext
 from strategies import AVAILABLE_STRATEGIES # Mengimpor kamus strategi yang sudah dimuat
 
 logger = logging.getLogger(__name__)
@@ -18,55 +32,183 @@ logger = logging.getLogger(__name__)
 # FUNGSI-FUNGSI BACKTESTING (GENERIK & STRATEGY-AGNOSTIC)
 # ==============================================================================
 
-def run_backtest(strategy_instance, symbol: str, days: int) -> dict | None:
+# Jumlah candle histori minimum sebelum sinyal pertama dievaluasi
+BACKTEST_WARMUP_CANDLES = 200
+
+def _collect_signals_slice(strategy_instance, symbol: str, df_full: pd.DataFrame, data_context=None) -> list[tuple[int, dict]]:
+    """
+    Engine 'slice' (lama): memanggil `check_signal` pada potongan data untuk setiap candle.
+    Mengembalikan list (index candle entry, dict sinyal).
+    """
+    signals = []
+    as_of = data_context.as_of_times(df_full) if data_context is not None else None
+    # Loop dimulai dari candle ke-200 untuk memastikan ada data histori yang cukup
+    for i in range(BACKTEST_WARMUP_CANDLES, len(df_full)):
+        df_slice = df_full.iloc[0:i].copy()
+        # Data HTF dipotong sesuai waktu tutup candle terakhir di slice (tanpa look-ahead)
+        ctx = data_context.at(int(as_of[i - 1])) if data_context is not None else None
+        signal = strategy_instance.check_signal(symbol, df_slice, ctx)
+        if signal:
+            signals.append((i, signal))
+    return signals
+
+def _collect_signals_vectorized(strategy_instance, symbol: str, df_full: pd.DataFrame, data_context=None) -> list[tuple[int, dict]]:
+    """
+    Engine 'vectorized': indikator dihitung sekali pada seluruh data lewat
+    `generate_signals`, lalu kolom sinyal per candle dikonversi ke format yang
+    sama dengan engine 'slice'. Strategi tanpa implementasi native otomatis
+    memakai adapter `BaseStrategy.generate_signals` (setara engine 'slice').
+
+    Sinyal pada candle ke-j setara dengan `check_signal` atas `df_full.iloc[0:j+1]`,
+    sehingga posisi dibuka pada candle j+1 (sama seperti engine 'slice').
+    """
+    signals_df = strategy_instance.generate_signals(
+        symbol, df_full.copy(), start=BACKTEST_WARMUP_CANDLES - 1, data_context=data_context
+    )
+    signal_col = signals_df['signal'].to_numpy()
+    entries = signals_df['entry'].to_numpy()
+    stop_losses = signals_df['stop_loss'].to_numpy()
+    take_profits = signals_df['take_profit'].to_numpy()
+
+    signals = []
+    for j in np.flatnonzero(pd.notna(signal_col)):
+        if j < BACKTEST_WARMUP_CANDLES - 1 or j >= len(df_full) - 1:
+            continue
+        signals.append((int(j) + 1, {
+            'signal': signal_col[j], 'entry': entries[j],
+            'stop_loss': stop_losses[j], 'take_profit': take_profits[j]
+        }))
+    return signals
+
+def _intrabar_fetcher(symbol: str, interval: str, bar_opens: np.ndarray, bar_ms: int):
+    """
+    Membuat fungsi `fetch_ltf(bar_open_ms) -> (high, low)` untuk exit_resolver.resolve_intrabar.
+    Memilih cara dengan request paling sedikit: satu rentang histori (lewat candle store)
+    yang mencakup semua candle ambigu, atau satu request kecil per candle.
+    """
+    ltf_ms = utils.interval_to_ms(interval)
+    start_ms, end_ms = int(bar_opens.min()), int(bar_opens.max()) + bar_ms - 1
+    span_requests = -(-(end_ms - start_ms + 1) // (utils.KLINES_PAGE_SIZE * ltf_ms))
+    if config.CANDLE_STORE_OFFLINE or span_requests <= len(set(bar_opens.tolist())):
+        df = utils.fetch_klines_history(symbol, interval, start_ms=start_ms, end_ms=end_ms)
+        if df.empty:
+            return lambda bar_open: (np.empty(0), np.empty(0))
+        opens = df['open_time'].to_numpy().astype('datetime64[ms]').astype(np.int64)
+        highs, lows = df['high'].to_numpy(), df['low'].to_numpy()
+
+        def fetch_ltf(bar_open):
+            lo, hi = np.searchsorted(opens, [bar_open, bar_open + bar_ms])
+            return highs[lo:hi], lows[lo:hi]
+        return fetch_ltf
+
+    def fetch_ltf(bar_open):
+        records = utils._fetch_klines_range(symbol, interval, bar_open, bar_open + bar_ms - 1)
+        return records['high'], records['low']
+    return fetch_ltf
+
+def load_backtest_data(strategy_instance, symbol: str, days: int, end_ms: int | None = None,
+                       requirements: list[tuple[str, int]] | None = None) -> dict:
+    """
+    Memuat semua data yang dibutuhkan backtest satu simbol: histori timeframe utama
+    dan frame HTF dari `data_requirements()` (untuk konteks point-in-time).
+    `requirements` menggantikan `data_requirements()` jika diisi (misal gabungan
+    kebutuhan beberapa set parameter di optimizer).
+
+    Returns:
+        dict: {'df_full': DataFrame timeframe utama, 'frames': {(symbol, interval): DataFrame HTF}}
+    """
+    primary_timeframe = getattr(strategy_instance, 'TIMEFRAME', '15m')
+    # Ambil seluruh histori sesuai durasi hari (paginasi, tidak lagi dibatasi 1500 candle)
+    end_ms = end_ms or int(datetime.now(timezone.utc).timestamp() * 1000)
+    start_ms = end_ms - days * 86_400_000
+    df_full = utils.fetch_klines_history(symbol, primary_timeframe, start_ms=start_ms, end_ms=end_ms)
+    frames = {}
+    if len(df_full) >= BACKTEST_WARMUP_CANDLES:
+        frames = HistoricalDataContext.load(
+            symbol, requirements if requirements is not None else strategy_instance.data_requirements(),
+            start_ms=start_ms, end_ms=end_ms, base_interval=primary_timeframe
+        ).frames
+    return {'df_full': df_full, 'frames': frames}
+
+def run_backtest(strategy_instance, symbol: str, days: int, engine: str | None = None,
+                 intrabar_interval: str | None = None, preloaded: dict | None = None) -> dict | None:
     """
     Menjalankan backtest untuk SATU simbol dengan strategi TERTENTU.
     Fungsi ini sekarang memiliki return value yang konsisten dan detail.
+
+    Args:
+        engine (str | None): 'vectorized' atau 'slice'. Default dari `config.BACKTEST_ENGINE`.
+        intrabar_interval (str | None): Timeframe kecil (misal '1m') untuk menyelesaikan candle
+                                        yang menyentuh SL & TP sekaligus. '' = nonaktif (dihitung LOSS).
+                                        Default dari `config.BACKTEST_INTRABAR_INTERVAL`.
+        preloaded (dict | None): Hasil `load_backtest_data` jika data sudah dimuat (misal di
+                                 proses worker). None = data diambil di sini.
     """
-    logger.info(f"Memulai backtest strategi '{strategy_instance.name}' untuk {symbol} selama {days} hari.")
+    engine = engine or config.BACKTEST_ENGINE
+    logger.info(f"Memulai backtest strategi '{strategy_instance.name}' untuk {symbol} selama {days} hari (engine: {engine}).")
     
     primary_timeframe = getattr(strategy_instance, 'TIMEFRAME', '15m')
-    # Hitung jumlah candle yang dibutuhkan berdasarkan durasi hari
-    limit = min(days * 24 * (60 // int(primary_timeframe[:-1])), 1500)
-    df_full = utils.fetch_klines(symbol, primary_timeframe, limit=limit)
+    interval_ms = utils.interval_to_ms(primary_timeframe)
+    labels = {'strategy': strategy_instance.name, 'symbol': symbol}
+    data = preloaded
+    if not data:
+        with perf.span('backtest_load', **labels):
+            data = load_backtest_data(strategy_instance, symbol, days)
+    df_full = data['df_full']
     
-    if len(df_full) < 200:
+    if len(df_full) < BACKTEST_WARMUP_CANDLES:
         logger.warning(f"Data tidak cukup untuk backtest {symbol} (kurang dari 200 candle).")
         return None
 
+    # Data HTF dimuat sekali untuk seluruh periode dan dilayani point-in-time ke strategi
+    data_context = HistoricalDataContext(data['frames'], base_interval=primary_timeframe)
+
+    with perf.span('backtest_signals', **labels):
+        if engine == 'vectorized':
+            signals = _collect_signals_vectorized(strategy_instance, symbol, df_full, data_context)
+        else:
+            signals = _collect_signals_slice(strategy_instance, symbol, df_full, data_context)
+
+    # Anti-spam: Mencegah sinyal beruntun dalam interval pendek
+    accepted, last_entry_time = [], None
+    for i, signal in signals:
+        current_time = df_full['open_time'].iloc[i]
+        if last_entry_time is not None and (current_time - last_entry_time < timedelta(milliseconds=interval_ms*4)):
+            continue
+        accepted.append((i, signal))
+        last_entry_time = current_time
+
+    # Simulasi hasil SEMUA trade sekaligus (first-hit SL/TP vectorized)
+    exits_start = time.perf_counter()
     trades = []
-    # Loop dimulai dari candle ke-200 untuk memastikan ada data histori yang cukup
-    for i in range(200, len(df_full)):
-        df_slice = df_full.iloc[0:i].copy()
-        signal = strategy_instance.check_signal(symbol, df_slice)
-        
-        if signal:
-            current_time = df_full['open_time'].iloc[i]
-            # Anti-spam: Mencegah sinyal beruntun dalam interval pendek
-            if trades and (current_time - trades[-1]['entry_time'] < timedelta(minutes=int(primary_timeframe[:-1])*4)):
-                continue
-
-            entry_price, sl, tp = signal['entry'], signal['stop_loss'], signal['take_profit']
-            trade_result = {'symbol': symbol, 'status': 'OPEN', 'entry_time': current_time, 'entry_price': entry_price, 'sl': sl, 'tp': tp, 'signal': signal['signal']}
-            
-            # Simulasi hasil trade dengan melihat data masa depan
-            df_future = df_full.iloc[i:]
-            for candle in df_future.itertuples():
-                if signal['signal'] == 'LONG':
-                    if candle.low <= sl:
-                        trade_result.update({'status': 'LOSS', 'exit_time': candle.open_time, 'exit_price': sl}); break
-                    elif candle.high >= tp:
-                        trade_result.update({'status': 'WIN', 'exit_time': candle.open_time, 'exit_price': tp}); break
-                else: # SHORT
-                    if candle.high >= sl:
-                        trade_result.update({'status': 'LOSS', 'exit_time': candle.open_time, 'exit_price': sl}); break
-                    elif candle.low <= tp:
-                        trade_result.update({'status': 'WIN', 'exit_time': candle.open_time, 'exit_price': tp}); break
-            else:
+    if accepted:
+        entry_idx = np.array([i for i, _ in accepted])
+        sl = np.array([sig['stop_loss'] for _, sig in accepted], dtype=float)
+        tp = np.array([sig['take_profit'] for _, sig in accepted], dtype=float)
+        is_long = np.array([sig['signal'] == 'LONG' for _, sig in accepted])
+        resolution = exit_resolver.resolve_exits(df_full['high'].to_numpy(), df_full['low'].to_numpy(), entry_idx, sl, tp, is_long)
+        status, exit_idx = resolution['status'], resolution['exit_idx']
+
+        intrabar_interval = intrabar_interval if intrabar_interval is not None else config.BACKTEST_INTRABAR_INTERVAL
+        if intrabar_interval and resolution['ambiguous'].any():
+            # Candle yang menyentuh SL & TP sekaligus diselesaikan dengan candle timeframe lebih kecil
+            open_ms = df_full['open_time'].to_numpy().astype('datetime64[ms]').astype(np.int64)
+            bar_open_ms = open_ms[np.maximum(exit_idx, 0)]
+            fetch_ltf = _intrabar_fetcher(symbol, intrabar_interval, bar_open_ms[resolution['ambiguous']], interval_ms)
+            status = exit_resolver.resolve_intrabar(status, resolution['ambiguous'], bar_open_ms, sl, tp, is_long, fetch_ltf)
+            logger.info(f"Backtest {symbol}: {int(resolution['ambiguous'].sum())} candle ambigu diselesaikan dengan data {intrabar_interval}.")
+
+        open_times, closes = df_full['open_time'], df_full['close'].to_numpy()
+        for k, (i, signal) in enumerate(accepted):
+            trade_result = {'symbol': symbol, 'status': exit_resolver.STATUS_NAMES[int(status[k])], 'entry_time': open_times.iloc[i],
+                            'entry_price': signal['entry'], 'sl': sl[k], 'tp': tp[k], 'signal': signal['signal']}
+            if status[k] == exit_resolver.STATUS_OPEN:
                 # Jika trade tidak ditutup sampai akhir data, tandai sebagai OPEN
-                trade_result.update({'status': 'OPEN', 'exit_time': df_full.iloc[-1]['open_time'], 'exit_price': df_full.iloc[-1]['close']})
-            
+                trade_result.update({'exit_time': open_times.iloc[-1], 'exit_price': closes[-1]})
+            else:
+                trade_result.update({'exit_time': open_times.iloc[exit_idx[k]], 'exit_price': tp[k] if status[k] == exit_resolver.STATUS_WIN else sl[k]})
             trades.append(trade_result)
+    perf.record('backtest_exits', time.perf_counter() - exits_start, **labels)
     
     # --- PERUBAHAN DIMULAI DI SINI ---
 
@@ -118,21 +260,143 @@ def run_backtest(strategy_instance, symbol: str, days: int) -> dict | None:
         'short_losses': short_losses
     }
 
-def run_multi_backtest(strategy_instance, days: int) -> dict:
-    """Menjalankan backtest untuk BANYAK simbol dengan strategi TERTENTU."""
-    # Pass context dummy karena tidak ada interaksi telegram di sini
-    symbols = utils.get_top_symbols({'bot_data':{}}) 
-    logger.info(f"Memulai multi-backtest strategi '{strategy_instance.name}' untuk {len(symbols)} simbol...")
-    
-    all_results = []
+# ==============================================================================
+# EKSEKUSI BACKTEST BANYAK SIMBOL (THREAD / PROCESS / INLINE)
+# ==============================================================================
+# Mode 'thread' cocok untuk bagian yang menunggu jaringan, tetapi kalkulasi pandas
+# menahan GIL sehingga hanya memakai satu core. Mode 'process' memuat data di proses
+# utama (thread, I/O), menaruh semua candle di satu blok shared memory, lalu worker
+# proses hanya menerima nama strategi, parameter, dan lokasi array di blok tersebut.
+
+_process_pool = None
+
+def get_process_pool() -> concurrent.futures.ProcessPoolExecutor:
+    """Process pool dibuat sekali dan dipakai ulang (start method 'spawn' aman untuk proses multi-thread)."""
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = concurrent.futures.ProcessPoolExecutor(
+            max_workers=config.BACKTEST_PROCESSES, mp_context=multiprocessing.get_context('spawn')
+        )
+    return _process_pool
+
+def shutdown_process_pool():
+    """Menghentikan process pool backtest (dipanggil saat bot berhenti)."""
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
+def load_backtest_datasets(strategy_instance, symbols: list[str], days: int, end_ms: int | None = None,
+                           requirements: list[tuple[str, int]] | None = None) -> dict:
+    """load_backtest_data untuk banyak simbol secara paralel (thread, I/O). Hasil: {symbol: data}."""
+    end_ms = end_ms or int(datetime.now(timezone.utc).timestamp() * 1000)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=config.BACKTEST_WORKERS) as executor:
+        return dict(zip(symbols, executor.map(
+            lambda sym: load_backtest_data(strategy_instance, sym, days, end_ms, requirements), symbols
+        )))
+
+def pack_backtest_data(datasets: dict, primary_timeframe: str) -> tuple[shared_memory.SharedMemory, dict]:
+    """
+    Menyusun semua frame dari `datasets` berurutan di satu blok shared memory.
+    Mengembalikan (blok, {symbol: {(symbol, interval): (offset byte, jumlah candle)}}).
+    Pemanggil wajib memanggil `close()` dan `unlink()` pada blok setelah selesai.
+    """
+    arrays, layouts = [], {}
+    offset = 0
+    for sym, data in datasets.items():
+        layouts[sym] = {}
+        entries = [((sym, primary_timeframe), data['df_full'])] + list(data['frames'].items())
+        for key, df in entries:
+            records = utils._frame_to_records(df, key[1])
+            arrays.append((offset, records))
+            layouts[sym][key] = (offset, len(records))
+            offset += records.nbytes
+
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for start, records in arrays:
+        shm.buf[start:start + records.nbytes] = records.tobytes()
+    return shm, layouts
+
+def unpack_backtest_data(shm_name: str, layout: dict, symbol: str, primary_timeframe: str) -> dict:
+    """Membaca kembali data satu simbol dari shared memory (di proses worker) ke format `load_backtest_data`."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        frames = {
+            key: utils._records_to_frame(np.ndarray((length,), dtype=candle_store.CANDLE_DTYPE, buffer=shm.buf, offset=offset))
+            for key, (offset, length) in layout.items()
+        }
+    finally:
+        shm.close()
+    return {'df_full': frames.pop((symbol, primary_timeframe)), 'frames': frames}
+
+def _backtest_worker(task: dict) -> dict | None:
+    """Dijalankan di proses worker: membaca candle dari shared memory lalu menjalankan run_backtest."""
+    strategy_instance = AVAILABLE_STRATEGIES[task['strategy']].with_params(**task['params'])
+    primary_timeframe = getattr(strategy_instance, 'TIMEFRAME', '15m')
+    preloaded = unpack_backtest_data(task['shm_name'], task['layout'], task['symbol'], primary_timeframe)
+    return run_backtest(strategy_instance, task['symbol'], task['days'], preloaded=preloaded)
+
+def _run_backtests_process(strategy_instance, symbols: list[str], days: int) -> list[dict]:
+    primary_timeframe = getattr(strategy_instance, 'TIMEFRAME', '15m')
+    datasets = load_backtest_datasets(strategy_instance, symbols, days)
+    shm, layouts = pack_backtest_data(datasets, primary_timeframe)
+    try:
+        pool = get_process_pool()
+        base_task = {'shm_name': shm.name, 'strategy': strategy_instance.name, 'params': strategy_instance.get_params(), 'days': days}
+        futures = {pool.submit(_backtest_worker, {**base_task, 'symbol': sym, 'layout': layouts[sym]}): sym for sym in symbols}
+        results = []
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                result = future.result()
+                if result: results.append(result)
+            except concurrent.futures.process.BrokenProcessPool:
+                shutdown_process_pool()
+                raise
+            except Exception as e:
+                logger.error(f"Error dalam worker backtest untuk simbol {futures[future]}: {e}")
+        return results
+    finally:
+        shm.close()
+        shm.unlink()
+
+def run_backtests(strategy_instance, symbols: list[str], days: int, executor_mode: str | None = None) -> list[dict]:
+    """
+    Menjalankan run_backtest untuk banyak simbol dan mengembalikan hasil yang tidak None.
+
+    Args:
+        executor_mode (str | None): 'thread', 'process', atau 'inline' (berurutan di proses ini).
+                                    Default dari `config.BACKTEST_EXECUTOR`.
+    """
+    executor_mode = executor_mode or config.BACKTEST_EXECUTOR
+    if executor_mode == 'process':
+        return _run_backtests_process(strategy_instance, symbols, days)
+
+    results = []
+    if executor_mode == 'inline':
+        for sym in symbols:
+            try:
+                result = run_backtest(strategy_instance, sym, days)
+                if result: results.append(result)
+            except Exception as e:
+                logger.error(f"Error backtest untuk simbol {sym}: {e}")
+        return results
+
     with concurrent.futures.ThreadPoolExecutor(max_workers=config.BACKTEST_WORKERS) as executor:
         futures = {executor.submit(run_backtest, strategy_instance, sym, days): sym for sym in symbols}
         for future in concurrent.futures.as_completed(futures):
             try:
                 result = future.result()
-                if result: all_results.append(result)
+                if result: results.append(result)
             except Exception as e:
-                logger.error(f"Error dalam future multi-backtest untuk simbol {futures[future]}: {e}")
+                logger.error(f"Error dalam future backtest untuk simbol {futures[future]}: {e}")
+    return results
+
+def run_multi_backtest(strategy_instance, days: int) -> dict:
+    """Menjalankan backtest untuk BANYAK simbol dengan strategi TERTENTU."""
+    symbols = utils.get_top_symbols()
+    logger.info(f"Memulai multi-backtest strategi '{strategy_instance.name}' untuk {len(symbols)} simbol...")
+    
+    all_results = run_backtests(strategy_instance, symbols, days)
 
     valid_results = [r for r in all_results if r and r.get('total_trades', 0) > 0]
     if not valid_results: 
@@ -175,6 +439,34 @@ def run_multi_backtest(strategy_instance, days: int) -> dict:
 # FUNGSI BACKGROUND JOBS (AUTO SCAN & FORWARD TEST)
 # ==============================================================================
 
+# Jumlah candle timeframe utama yang diberikan ke check_signal saat scan live
+SCAN_PRIMARY_LIMIT = 200
+
+def plan_scan_cycle(strategies: list, symbols: list[str]) -> dict:
+    """
+    Rencana pengambilan data untuk satu siklus scan: {(symbol, interval): limit}.
+    Mencakup timeframe utama setiap strategi dan timeframe lain dari `data_requirements()`.
+    Jika beberapa strategi butuh frame yang sama, limit terbesar yang dipakai.
+    """
+    needs = {}
+    for strategy_instance in strategies:
+        primary_timeframe = getattr(strategy_instance, 'TIMEFRAME', '15m')
+        for interval, limit in [(primary_timeframe, SCAN_PRIMARY_LIMIT)] + strategy_instance.data_requirements():
+            needs[interval] = max(needs.get(interval, 0), limit)
+    return {(symbol, interval): limit for symbol in symbols for interval, limit in needs.items()}
+
+async def prefetch_scan_frames(plan: dict) -> PrefetchedDataContext:
+    """Mengambil semua frame dalam rencana secara konkuren (klien async), sekali per (symbol, interval)."""
+    frames = await market_data.client.fetch_klines_many([(s, i, limit) for (s, i), limit in plan.items()])
+    return PrefetchedDataContext({(s, i): df for (s, i, _), df in frames.items()})
+
+def check_strategy_signal(strategy_instance, symbol: str, data_context) -> dict | None:
+    """Menjalankan check_signal satu strategi pada frame timeframe utamanya dari konteks data."""
+    primary_timeframe = getattr(strategy_instance, 'TIMEFRAME', '15m')
+    df = data_context.get_klines(symbol, primary_timeframe, SCAN_PRIMARY_LIMIT)
+    with perf.span('check_signal', strategy=strategy_instance.name, symbol=symbol):
+        return strategy_instance.check_signal(symbol, df, data_context)
+
 async def continuous_scan_job(context: ContextTypes.DEFAULT_TYPE):
     """
     Job Auto Scan.
@@ -184,30 +476,36 @@ async def continuous_scan_job(context: ContextTypes.DEFAULT_TYPE):
     
     # --- LANGKAH 1: TEMUKAN SEMUA SINYAL LIVE DARI SEMUA STRATEGI ---
     logger.info("Auto Scan: Mencari sinyal live...")
-    symbols_to_scan = utils.get_top_symbols(context)
+    symbols_to_scan = await asyncio.to_thread(utils.get_top_symbols, context)
     if not symbols_to_scan: 
         logger.info("Auto Scan Job: Gagal mendapatkan daftar simbol.")
         return
 
+    # Setiap (symbol, timeframe) diambil sekali, lalu dibagikan ke semua strategi
+    strategies = list(AVAILABLE_STRATEGIES.values())
+    plan = plan_scan_cycle(strategies, symbols_to_scan)
+    data_context = await prefetch_scan_frames(plan)
+    logger.info(f"Auto Scan: {len(plan)} frame diambil untuk {len(strategies) * len(symbols_to_scan)} pemeriksaan sinyal.")
+
     all_live_signals = []
+    loop = asyncio.get_running_loop()
     with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-        futures = []
-        for strategy_name, strategy_instance in AVAILABLE_STRATEGIES.items():
-            primary_timeframe = getattr(strategy_instance, 'TIMEFRAME', '15m')
-            for symbol in symbols_to_scan:
-                future = executor.submit(
-                    lambda s=symbol, si=strategy_instance, tf=primary_timeframe: (si, si.check_signal(s, utils.fetch_klines(s, tf, 200)))
-                )
-                futures.append(future)
+        tasks = [
+            loop.run_in_executor(executor, check_strategy_signal, strategy_instance, symbol, data_context)
+            for strategy_instance in strategies for symbol in symbols_to_scan
+        ]
+        for strategy_instance, result in zip(
+            [si for si in strategies for _ in symbols_to_scan],
+            await asyncio.gather(*tasks, return_exceptions=True),
+        ):
+            if isinstance(result, Exception):
+                logger.error(f"Error saat mencari sinyal live di Auto Scan: {result}")
+            elif result:
+                result['strategy_instance'] = strategy_instance
+                all_live_signals.append(result)
 
-        for future in concurrent.futures.as_completed(futures):
-            try:
-                strategy_instance, result = future.result()
-                if result:
-                    result['strategy_instance'] = strategy_instance
-                    all_live_signals.append(result)
-            except Exception as e:
-                logger.error(f"Error saat mencari sinyal live di Auto Scan: {e}")
+    cache_stats = indicators.stats()
+    logger.info(f"Auto Scan: cache indikator {cache_stats['hits']} hit / {cache_stats['misses']} miss ({cache_stats['hit_rate']:.0f}%).")
 
     if not all_live_signals:
         logger.info("Auto Scan Job: Tidak ada sinyal live yang ditemukan dari semua strategi."); return
@@ -260,64 +558,102 @@ async def continuous_scan_job(context: ContextTypes.DEFAULT_TYPE):
         
         # Perbarui waktu sinyal terakhir untuk anti-spam
         last_signals[signal_key] = now
+        state_store.store.set_signal_time(signal_key, now)
 
     logger.info(f"Auto Scan Job: {len(all_live_signals)} notifikasi sinyal telah dikirim.")
 
+async def get_price_snapshot(symbols) -> dict:
+    """
+    Harga terkini untuk sekumpulan simbol: mark price dari stream WebSocket jika aktif,
+    sisanya dari SATU request ticker untuk semua pair (bukan satu request per simbol).
+    """
+    prices = {}
+    if streaming.hub is not None:
+        prices = {s: p for s in symbols if (p := streaming.hub.mark_price(s)) is not None}
+    missing = set(symbols) - set(prices)
+    if missing:
+        all_prices = await market_data.client.ticker_price()
+        prices.update({s: all_prices[s] for s in missing if s in all_prices})
+    return prices
+
+async def close_forward_trade(bot, chat_id: int, book, trade: dict, result: str, price: float):
+    """Menutup posisi forward test (jika masih terbuka), menyimpannya, dan mengirim notifikasi ke chat."""
+    if not book.is_open(trade):
+        return
+    book.close(trade, result, price, datetime.now(timezone.utc))
+    state_store.store.save_trade(chat_id, trade)
+    if trade_monitor.monitor is not None:
+        trade_monitor.monitor.unwatch(chat_id, trade)
+    emoji = "✅" if result == "WIN" else "❌"
+    await bot.send_message(chat_id=chat_id, text=f"{emoji} *Forward Test Posisi Ditutup ({result})* untuk {trade['symbol']} @ `{price:.4f}`", parse_mode='Markdown')
+
+def build_monitor_exit_handler(application):
+    """Callback `on_exit` untuk trade_monitor.TradeMonitor: exit dari stream mark price langsung diproses."""
+    async def on_exit(chat_id: int, trade: dict, result: str, price: float):
+        ft_data = application.bot_data.get('forwardtest_data', {}).get(chat_id)
+        if ft_data:
+            await close_forward_trade(application.bot, chat_id, ft_data['book'], trade, result, price)
+    return on_exit
+
 async def forwardtest_job(context: ContextTypes.DEFAULT_TYPE):
-    """Job untuk paper trading, sekarang juga menggunakan semua strategi."""
-    ft_data = context.bot_data.get('forwardtest_data', {})
-    if not ft_data.get('active'): return
-    
-    chat_id = ft_data['chat_id']
-    open_trades = ft_data.get('open_trades', [])
+    """Job untuk paper trading per chat, menggunakan semua strategi."""
+    chat_id = context.job.data['chat_id']
+    ft_data = context.bot_data.get('forwardtest_data', {}).get(chat_id)
+    if not ft_data or not ft_data.get('active'): return
     
-    # 1. Cek posisi yang sudah terbuka
-    still_open = []
+    book = ft_data['book']
+    monitor = trade_monitor.monitor
     now_utc = datetime.now(timezone.utc)
-    for trade in open_trades:
-        try:
-            price = float(utils.binance.futures_ticker(symbol=trade['symbol'])['lastPrice'])
-            closed, result = False, ''
-            if trade['signal'] == 'LONG' and (price >= trade['tp'] or price <= trade['sl']):
-                closed, result = True, 'WIN' if price >= trade['tp'] else 'LOSS'
-            elif trade['signal'] == 'SHORT' and (price <= trade['tp'] or price >= trade['sl']):
-                closed, result = True, 'WIN' if price <= trade['tp'] else 'LOSS'
-            
-            if closed:
-                trade.update({'status': result, 'close_time': now_utc, 'close_price': price})
-                ft_data.setdefault('closed_trades', []).append(trade)
-                emoji = "✅" if result == "WIN" else "❌"
-                await context.bot.send_message(chat_id=chat_id, text=f"{emoji} *Forward Test Posisi Ditutup ({result})* untuk {trade['symbol']}", parse_mode='Markdown')
-            else:
-                still_open.append(trade)
-        except Exception as e:
-            logger.error(f"Forward test check error untuk {trade['symbol']}: {e}")
-            still_open.append(trade)
-    ft_data['open_trades'] = still_open
-
-    # 2. Cari sinyal baru dari SEMUA strategi
-    symbols_to_scan = utils.get_top_symbols(context)
-    for strategy_name, strategy_instance in AVAILABLE_STRATEGIES.items():
-        for symbol in symbols_to_scan:
-            # Jangan buka posisi baru jika sudah ada posisi untuk simbol yang sama
-            if any(t['symbol'] == symbol for t in ft_data['open_trades']):
-                continue
-            
-            primary_timeframe = getattr(strategy_instance, 'TIMEFRAME', '15m')
-            df = utils.fetch_klines(symbol, primary_timeframe, 200)
-            if df.empty: continue
-            
-            h = strategy_instance.check_signal(symbol, df)
-            if h:
-                new_trade = {**h, 'entry_time': now_utc, 'status': 'OPEN'}
-                ft_data['open_trades'].append(new_trade)
-                signal_emoji = "🟢" if h['signal'] == 'LONG' else "🔴"
-                reason = f"[{strategy_name.upper()}] {h['reason']}"
-                msg = (f"📈 *Forward Test Posisi Baru Dibuka*\n\n"
-                       f"*{h['symbol']}* {signal_emoji} *{h['signal']}*\n"
-                       f"📄 *Alasan*: _{reason}_\n"
-                       f"➡️ *Entry*: `{h['entry']:.4f}` | SL: `{h['stop_loss']:.4f}`")
-                await context.bot.send_message(chat_id=chat_id, text=msg, parse_mode='Markdown')
+    
+    # 1. Cek posisi terbuka dengan satu snapshot harga. Simbol yang sedang aktif dipantau
+    #    trade_monitor (stream mark price) sudah ditutup tepat saat menyentuh SL/TP, jadi dilewati.
+    pending = [t for t in book.open_trades() if monitor is None or not monitor.is_live(t['symbol'])]
+    try:
+        prices = await get_price_snapshot({t['symbol'] for t in pending}) if pending else {}
+    except Exception as e:
+        logger.error(f"Forward test gagal mengambil snapshot harga: {e}")
+        prices = {}
+    for trade in pending:
+        price = prices.get(trade['symbol'])
+        result = exit_result(trade, price) if price is not None else None
+        if result:
+            await close_forward_trade(context.bot, chat_id, book, trade, result, price)
+
+    # 2. Cari sinyal baru dari SEMUA strategi, konkuren di worker (tidak memblokir event loop)
+    symbols_to_scan = await asyncio.to_thread(utils.get_top_symbols, context)
+    # Jangan buka posisi baru jika sudah ada posisi untuk simbol yang sama
+    symbols_to_scan = [s for s in symbols_to_scan if not book.has_symbol(s)]
+    strategies = list(AVAILABLE_STRATEGIES.items())
+    data_context = await prefetch_scan_frames(plan_scan_cycle([si for _, si in strategies], symbols_to_scan))
+
+    loop = asyncio.get_running_loop()
+    jobs = [(name, si, symbol) for name, si in strategies for symbol in symbols_to_scan]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
+        results = await asyncio.gather(
+            *(loop.run_in_executor(executor, check_strategy_signal, si, symbol, data_context) for _, si, symbol in jobs),
+            return_exceptions=True,
+        )
+
+    # Urutan pemrosesan sama seperti sebelumnya: strategi pertama yang memberi sinyal untuk suatu simbol yang dipakai
+    for (strategy_name, _, symbol), h in zip(jobs, results):
+        if isinstance(h, Exception):
+            logger.error(f"Forward test error saat memeriksa {symbol} ({strategy_name}): {h}")
+            continue
+        if not h or book.has_symbol(symbol):
+            continue
+        new_trade = {**h, 'sl': h['stop_loss'], 'tp': h['take_profit'], 'entry_time': now_utc, 'status': 'OPEN',
+                     'strategy': strategy_name}
+        book.open(new_trade)
+        state_store.store.save_trade(chat_id, new_trade)
+        if monitor is not None:
+            monitor.watch(chat_id, new_trade)
+        signal_emoji = "🟢" if h['signal'] == 'LONG' else "🔴"
+        reason = f"[{strategy_name.upper()}] {h['reason']}"
+        msg = (f"📈 *Forward Test Posisi Baru Dibuka*\n\n"
+               f"*{h['symbol']}* {signal_emoji} *{h['signal']}*\n"
+               f"📄 *Alasan*: _{reason}_\n"
+               f"➡️ *Entry*: `{h['entry']:.4f}` | SL: `{h['stop_loss']:.4f}`")
+        await context.bot.send_message(chat_id=chat_id, text=msg, parse_mode='Markdown')
                 
 # ==============================================================================
 # FUNGSI BARU UNTUK PERINGKAT KINERJA KOIN
@@ -329,20 +665,10 @@ def find_top_performers(strategy_instance, days: int, top_n: int) -> list[dict]:
     
     PERUBAHAN: Sekarang mengembalikan list of dictionary hasil backtest, bukan hanya nama.
     """
-    # Pass context dummy karena tidak ada interaksi telegram di sini
-    symbols = utils.get_top_symbols({'bot_data':{}}) 
+    symbols = utils.get_top_symbols()
     logger.info(f"Mencari {top_n} koin terbaik dari {len(symbols)} koin selama {days} hari terakhir...")
     
-    all_results = []
-    with concurrent.futures.ThreadPoolExecutor(max_workers=config.BACKTEST_WORKERS) as executor:
-        futures = {executor.submit(run_backtest, strategy_instance, sym, days): sym for sym in symbols}
-        for future in concurrent.futures.as_completed(futures):
-            try:
-                result = future.result()
-                if result and result.get('total_trades', 0) > 0:
-                    all_results.append(result)
-            except Exception as e:
-                logger.error(f"Error dalam future find_top_performers: {e}")
+    all_results = [r for r in run_backtests(strategy_instance, symbols, days) if r.get('total_trades', 0) > 0]
 
     if not all_results:
         logger.warning("Tidak ada hasil backtest yang valid ditemukan untuk menentukan koin terbaik.")
@@ -2,17 +2,25 @@
 
 import logging
 import asyncio
+import math
+import time
 import concurrent.futures
 from datetime import timedelta
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
-from binance.exceptions import BinanceAPIException
 
 # Import dari file-file lain dalam proyek
 import config
 import utils
 import features
+import market_data
+import optimizer
+import perf
+import indicators
+import state_store
+import trade_monitor
+from positions import PositionBook
 from strategies import AVAILABLE_STRATEGIES # Mengimpor kamus strategi yang sudah dimuat
 
 logger = logging.getLogger(__name__)
@@ -47,8 +55,9 @@ def build_strategy_menu(command_prefix: str) -> InlineKeyboardMarkup:
     keyboard = []
     # Buat baris tombol, maksimal 2 tombol per baris
     row = []
-    for name, strategy_instance in AVAILABLE_STRATEGIES.items():
-        button_label = strategy_instance.name.replace('_', ' ').title()
+    # Hanya nama strategi (dari manifest): membangun menu tidak memuat modul strategi
+    for name in AVAILABLE_STRATEGIES:
+        button_label = name.replace('_', ' ').title()
         button = InlineKeyboardButton(f"📈 {button_label}", callback_data=f'{command_prefix}{name}')
         row.append(button)
         if len(row) == 2:
@@ -138,6 +147,25 @@ async def button_callback_handler(update: Update, context: ContextTypes.DEFAULT_
 # FUNGSI LOGIKA AKSI TOMBOL (Agar button_callback_handler tetap bersih)
 # ==============================================================================
 
+# Jeda minimum (detik) antar edit pesan progres scan
+SCAN_PROGRESS_EDIT_INTERVAL = 2.0
+
+def format_signal_hit(h: dict, strategy_name: str) -> str:
+    """Format pesan untuk satu sinyal live hasil scan."""
+    signal_emoji = "🟢" if h['signal'] == 'LONG' else "🔴"
+    rr_ratio = h.get('risk_reward_ratio', 'N/A')
+    return (f"🎯 *Sinyal Live (Strategi: `{strategy_name}`)*\n\n"
+            f"*{h['symbol']}* {signal_emoji} *{h['signal']}*\n"
+            f"📄 *Alasan*: _{h['reason']}_\n➡️ *Entry*: `{h['entry']:.4f}`\n"
+            f"🛡️ *SL*: `{h['stop_loss']:.4f}`\n🎯 *TP*: `{h['take_profit']:.4f}` (R:R {rr_ratio})")
+
+async def edit_progress(query, text: str):
+    """Mengedit pesan progres; kegagalan edit (misal isi tidak berubah) tidak menghentikan scan."""
+    try:
+        await query.edit_message_text(text, parse_mode='Markdown')
+    except Exception as e:
+        logger.debug(f"Gagal mengedit pesan progres: {e}")
+
 async def run_scan_action(query, context, action):
     """
     Fungsi yang dieksekusi saat tombol strategi scan ditekan.
@@ -178,36 +206,40 @@ async def run_scan_action(query, context, action):
     # await query.message.reply_text(ranking_text, parse_mode='Markdown')
     # === AKHIR KODE LAMA ===
 
-    # --- LOGIKA BARU: LANGSUNG SCAN SEMUA SIMBOL ---
-    symbols_to_scan = utils.get_top_symbols(context)
-    hits = []
-    primary_timeframe = getattr(strategy_instance, 'TIMEFRAME', '15m')
-    
+    # --- LOGIKA BARU: PIPELINE ASYNC ---
+    # Data setiap simbol diambil konkuren lewat klien async, check_signal dijalankan di
+    # worker pool, dan setiap sinyal langsung dikirim begitu ditemukan. Event loop tidak
+    # pernah diblokir, jadi bot tetap responsif untuk pengguna lain selama scan.
+    symbols_to_scan = await asyncio.to_thread(utils.get_top_symbols, context)
+    plan = features.plan_scan_cycle([strategy_instance], symbols_to_scan)
+    loop = asyncio.get_running_loop()
+    hits, done, last_edit = [], 0, time.monotonic()
+
     with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-        future_to_symbol = {
-            executor.submit(strategy_instance.check_signal, sym, utils.fetch_klines(sym, primary_timeframe, 200)): sym
-            for sym in symbols_to_scan # <-- Scan semua simbol, bukan hanya top 5
-        }
-        for future in concurrent.futures.as_completed(future_to_symbol):
+        async def scan_symbol(sym):
+            data_context = await features.prefetch_scan_frames({key: limit for key, limit in plan.items() if key[0] == sym})
+            return await loop.run_in_executor(executor, features.check_strategy_signal, strategy_instance, sym, data_context)
+
+        for next_result in asyncio.as_completed([scan_symbol(sym) for sym in symbols_to_scan]):
             try:
-                result = future.result()
-                if result: hits.append(result)
+                result = await next_result
+                if result:
+                    hits.append(result)
+                    await query.message.reply_text(format_signal_hit(result, strategy_name), parse_mode='Markdown')
             except Exception as e:
                 logger.error(f"Error saat scan live simbol: {e}")
+            done += 1
+
+            # Perbarui pesan progres, dibatasi agar tidak terkena rate limit Telegram
+            if time.monotonic() - last_edit >= SCAN_PROGRESS_EDIT_INTERVAL and done < len(symbols_to_scan):
+                last_edit = time.monotonic()
+                await edit_progress(query, f"🔍 *Scan `{strategy_name}`*: {done}/{len(symbols_to_scan)} pair diperiksa, {len(hits)} sinyal ditemukan...")
 
-    # --- Tampilkan Hasil Akhir (Sinyal Live) ---
+    # --- Tampilkan Hasil Akhir ---
+    await edit_progress(query, f"✅ *Scan `{strategy_name}` selesai*: {len(symbols_to_scan)} pair diperiksa, {len(hits)} sinyal ditemukan.")
     if not hits:
         await query.message.reply_text(f"Tidak ada sinyal live yang ditemukan saat ini untuk strategi `{strategy_name}`.", parse_mode='Markdown')
-    else:
-        text = f"🎯 *Sinyal Live Ditemukan (Strategi: `{strategy_name}`)*\n\n"
-        for h in hits:
-            signal_emoji = "🟢" if h['signal'] == 'LONG' else "🔴"
-            rr_ratio = h.get('risk_reward_ratio', 'N/A')
-            text += (f"*{h['symbol']}* {signal_emoji} *{h['signal']}*\n"
-                     f"📄 *Alasan*: _{h['reason']}_\n➡️ *Entry*: `{h['entry']:.4f}`\n"
-                     f"🛡️ *SL*: `{h['stop_loss']:.4f}`\n🎯 *TP*: `{h['take_profit']:.4f}` (R:R {rr_ratio})\n\n")
-        await query.message.reply_text(text, parse_mode='Markdown')
-    
+
     # Tampilkan kembali menu utama setelah semua proses selesai
     await query.message.reply_text("Pilih fitur selanjutnya:", reply_markup=build_main_menu())
 
@@ -224,19 +256,32 @@ async def prompt_for_backtest_params(query, context, action):
         prompt_text += "Ketik perintah:\nContoh: `/multibacktest 30`"
     await query.edit_message_text(prompt_text)
 
+AUTOSCAN_JOB_NAME = 'continuous_scan_job'
+
+def schedule_autoscan_job(job_queue):
+    """Menjadwalkan job auto scan (satu untuk semua chat) jika belum ada."""
+    if not job_queue.get_jobs_by_name(AUTOSCAN_JOB_NAME):
+        job_queue.run_repeating(features.continuous_scan_job, interval=timedelta(minutes=15), first=1, name=AUTOSCAN_JOB_NAME)
+
+def schedule_forwardtest_job(job_queue, chat_id: int):
+    """Menjadwalkan job forward test untuk satu chat."""
+    job_queue.run_repeating(features.forwardtest_job, interval=timedelta(minutes=5), first=1,
+                            name=f'forwardtest_job_{chat_id}', data={'chat_id': chat_id})
+
 async def manage_autoscan(context, query, start_job: bool):
     """Mengaktifkan atau menonaktifkan auto scan."""
-    job_name = 'continuous_scan_job'
+    job_name = AUTOSCAN_JOB_NAME
     chat_id = query.message.chat_id
     autoscan_chats = context.bot_data.setdefault('autoscan_chats', set())
 
     if start_job:
         autoscan_chats.add(chat_id)
-        if not context.job_queue.get_jobs_by_name(job_name):
-            context.job_queue.run_repeating(features.continuous_scan_job, interval=timedelta(minutes=15), first=1, name=job_name)
+        state_store.store.set_autoscan(chat_id, True)
+        schedule_autoscan_job(context.job_queue)
         text = "✅ *Auto Scan Telah Diaktifkan!*"
     else:
         autoscan_chats.discard(chat_id)
+        state_store.store.set_autoscan(chat_id, False)
         if not autoscan_chats:
             jobs = context.job_queue.get_jobs_by_name(job_name)
             for job in jobs: job.schedule_removal()
@@ -258,7 +303,9 @@ async def analyze_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     for symbol in symbols:
         analysis_text_for_symbol = f"💎 *Analisa Teknikal untuk {symbol}*\n"
         price_found, all_tf_results = False, {}
-        tasks = [asyncio.to_thread(utils.get_technical_analysis, symbol, tf) for tf in timeframes_to_analyze]
+        # Semua timeframe diambil konkuren lewat klien async, indikator dihitung di thread
+        frames = await market_data.client.fetch_klines_many([(symbol, tf, 250) for tf in timeframes_to_analyze])
+        tasks = [asyncio.to_thread(utils.get_technical_analysis, symbol, tf, frames[(symbol, tf, 250)]) for tf in timeframes_to_analyze]
         results = await asyncio.gather(*tasks)
         for i, analysis in enumerate(results):
             tf = timeframes_to_analyze[i]
@@ -372,7 +419,100 @@ async def multibacktest_handler(update: Update, context: ContextTypes.DEFAULT_TY
     except Exception as e:
         logger.error(f"Error saat multi-backtest: {e}", exc_info=True)
         await update.message.reply_text(f"Terjadi error: {e}")
-        
+
+async def optimize_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    /optimize HARI NAMA=v1,v2 [NAMA=start:stop:step ...] [symbols=A,B] [samples=N]
+    Mencari kombinasi parameter terbaik untuk strategi terpilih dengan backtest.
+    """
+    strategy_name = context.user_data.get('selected_strategy')
+    if not strategy_name:
+        await update.message.reply_text("Pilih strategi dari menu `/start` terlebih dahulu."); return
+    strategy_instance = AVAILABLE_STRATEGIES.get(strategy_name)
+    if not strategy_instance:
+        await update.message.reply_text(f"Strategi '{strategy_name}' tidak valid."); return
+    if len(context.args) < 2:
+        params = ', '.join(f"`{k}`" for k in sorted(strategy_instance.get_params()))
+        await update.message.reply_text(
+            "Format: `/optimize HARI NAMA=v1,v2 [NAMA=start:stop:step] [symbols=A,B] [samples=N]`\n"
+            f"Parameter tersedia: {params}", parse_mode='Markdown'); return
+    try:
+        days = int(context.args[0])
+        if not 1 <= days <= 90: await update.message.reply_text("Hari harus antara 1-90."); return
+        symbols, samples, grid = None, None, {}
+        for arg in context.args[1:]:
+            key, _, value = arg.partition('=')
+            if key.lower() == 'symbols':
+                symbols = [s.strip().upper() for s in value.split(',') if s.strip()]
+            elif key.lower() == 'samples':
+                samples = int(value)
+            else:
+                name, values = optimizer.parse_param_spec(arg, strategy_instance)
+                grid[name] = values
+    except ValueError as e:
+        await update.message.reply_text(f"Parameter tidak valid: {e}"); return
+    if not grid:
+        await update.message.reply_text("Sebutkan minimal satu parameter, misal `RSI_LENGTH=10,14,21`.", parse_mode='Markdown'); return
+    combinations = min(math.prod(len(v) for v in grid.values()), samples or float('inf'))
+    if combinations > config.OPTIMIZER_MAX_COMBINATIONS:
+        await update.message.reply_text(
+            f"Terlalu banyak kombinasi ({combinations}). Maksimal {config.OPTIMIZER_MAX_COMBINATIONS}, "
+            f"kurangi nilai atau pakai `samples=N`.", parse_mode='Markdown'); return
+    if not symbols:
+        symbols = (await asyncio.to_thread(utils.get_top_symbols, context))[:config.OPTIMIZER_DEFAULT_SYMBOLS]
+
+    status = await update.message.reply_text(
+        f"⏳ Optimasi *{strategy_name}*: {combinations} kombinasi x {len(symbols)} simbol, {days} hari...", parse_mode='Markdown')
+    loop = asyncio.get_running_loop()
+    last_edit = [0.0]
+
+    def on_progress(done, total):
+        # Dipanggil dari thread optimizer; edit pesan dijadwalkan ke event loop (dibatasi frekuensinya)
+        now = time.monotonic()
+        if done < total and now - last_edit[0] < SCAN_PROGRESS_EDIT_INTERVAL:
+            return
+        last_edit[0] = now
+        asyncio.run_coroutine_threadsafe(
+            status.edit_text(f"⏳ Optimasi *{strategy_name}*: {done}/{total} bagian selesai...", parse_mode='Markdown'), loop)
+
+    try:
+        ranked = await asyncio.to_thread(
+            optimizer.optimize, strategy_name, grid, symbols, days, samples=samples, progress=on_progress)
+        if not ranked or ranked[0]['total_trades'] == 0:
+            await update.message.reply_text("🚫 Tidak ada trade dihasilkan."); return
+        text = (f"🧪 **Hasil Optimasi: `{strategy_name}`**\n"
+                f"Periode: {days} hari | Simbol: {', '.join(symbols)}\n\n"
+                f"```\n{optimizer.format_table(ranked, 10)}\n```")
+        await update.message.reply_text(text, parse_mode='Markdown')
+    except Exception as e:
+        logger.error(f"Error saat optimasi: {e}", exc_info=True)
+        await update.message.reply_text(f"Terjadi error: {e}")
+
+async def perf_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    /perf                -> p50/p95/p99 per tahap (ms)
+    /perf TAHAP [LABEL]  -> rincian satu tahap per nilai label (misal `/perf check_signal strategy`)
+    /perf reset          -> mengosongkan data latensi
+    """
+    args = context.args
+    if args and args[0].lower() == 'reset':
+        perf.reset()
+        await update.message.reply_text("Data latensi dikosongkan."); return
+    stage = args[0] if args else None
+    by = None
+    if stage:
+        labels = perf.label_names(stage)
+        if not labels:
+            await update.message.reply_text(f"Belum ada data untuk tahap `{stage}`.", parse_mode='Markdown'); return
+        by = args[1] if len(args) > 1 else labels[0]
+        if by not in labels:
+            await update.message.reply_text(f"Label tersedia untuk `{stage}`: {', '.join(labels)}", parse_mode='Markdown'); return
+    cache_stats = indicators.stats()
+    title = f"⏱️ *Latensi* `{stage}` *per {by}* (ms)" if stage else "⏱️ *Latensi per tahap* (ms)"
+    text = (f"{title}\n```\n{perf.format_report(stage, by)}\n```\n"
+            f"Cache indikator: {cache_stats['hits']} hit / {cache_stats['misses']} miss ({cache_stats['hit_rate']:.0f}%)")
+    await update.message.reply_text(text, parse_mode='Markdown')
+
 async def forwardtest_handler(update: Update, context: ContextTypes.DEFAULT_TYPE, from_button: bool = False):
     message_interface = update.callback_query.message if from_button else update.message
     chat_id = message_interface.chat_id
@@ -384,55 +524,61 @@ async def forwardtest_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
         action = context.args[0].lower() if context.args else 'status'
 
     job_name = f'forwardtest_job_{chat_id}' # Job name unik per chat
-    ft_data = context.bot_data.setdefault('forwardtest_data', {}).setdefault(chat_id, {'active': False, 'open_trades': [], 'closed_trades': []})
+    ft_data = context.bot_data.setdefault('forwardtest_data', {}).setdefault(chat_id, {'active': False, 'book': PositionBook()})
     
     if action == 'start':
         if ft_data['active']:
             await message_interface.reply_text("Forward test sudah aktif untuk chat ini.")
             return
-        ft_data.update({'active': True, 'open_trades': [], 'closed_trades': []})
-        context.job_queue.run_repeating(features.forwardtest_job, interval=timedelta(minutes=5), first=1, name=job_name, data={'chat_id': chat_id})
+        if trade_monitor.monitor is not None:
+            trade_monitor.monitor.unwatch_chat(chat_id)
+        ft_data.update({'active': True, 'book': PositionBook()})
+        state_store.store.clear_trades(chat_id)
+        state_store.store.set_forwardtest_active(chat_id, True)
+        schedule_forwardtest_job(context.job_queue, chat_id)
         await message_interface.reply_text("✅ *Mode Forward Test Diaktifkan untuk chat ini!*")
     elif action == 'stop':
         if not ft_data['active']:
             await message_interface.reply_text("Forward test tidak aktif untuk chat ini.")
             return
         ft_data['active'] = False
+        if trade_monitor.monitor is not None:
+            trade_monitor.monitor.unwatch_chat(chat_id)
+        state_store.store.set_forwardtest_active(chat_id, False)
         jobs = context.job_queue.get_jobs_by_name(job_name)
         for job in jobs:
             job.schedule_removal()
         await message_interface.reply_text("❌ *Mode Forward Test Dinonaktifkan untuk chat ini.*")
     elif action == 'status':
-        if not ft_data.get('active') and not ft_data.get('closed_trades'):
+        book = ft_data['book']
+        stats = book.stats
+        if not ft_data.get('active') and not stats.count:
             await message_interface.reply_text("Mode forward test tidak aktif untuk chat ini.", parse_mode='Markdown')
             return
             
         status_text = "*(Aktif)*" if ft_data.get('active') else "*(Tidak Aktif)*"
         text = f"📊 *Status Forward Test {status_text}*\n\n"
         
-        open_trades = ft_data.get('open_trades', [])
-        text += f"**Posisi Terbuka ({len(open_trades)})**\n"
-        if not open_trades:
+        text += f"**Posisi Terbuka ({book.open_count})**\n"
+        if not book.open_count:
             text += "_Tidak ada posisi terbuka._\n"
         else:
-            for trade in open_trades:
+            for trade in book.open_trades():
                 text += f"- *{trade['symbol']} ({trade['signal']})* | Entry: `{trade['entry']:.4f}`\n"
         
-        closed_trades = ft_data.get('closed_trades', [])
-        wins = sum(1 for t in closed_trades if t['status'] == 'WIN')
-        losses = len(closed_trades) - wins
-        win_rate = (wins / len(closed_trades) * 100) if closed_trades else 0
-        
-        # Asumsi R:R default jika tidak ada di trade (bisa disesuaikan)
-        total_r = sum(t.get('risk_reward_ratio', config.RISK_REWARD_RATIO) for t in closed_trades if t['status'] == 'WIN') - losses
-        
-        text += f"\n**Hasil ({len(closed_trades)} Trade)**\n✅ Menang: {wins} | ❌ Kalah: {losses}\n"
-        text += f"📈 Win Rate: *{win_rate:.2f}%* | 💰 Profit: *{total_r:.2f}R*"
+        text += f"\n**Hasil ({stats.count} Trade)**\n✅ Menang: {stats.wins} | ❌ Kalah: {stats.losses}\n"
+        text += f"📈 Win Rate: *{stats.win_rate:.2f}%* | 💰 Profit: *{stats.total_r:.2f}R* | 📉 Max DD: *{stats.max_drawdown:.2f}R*"
+        if len(book.strategy_stats) > 1:
+            text += "\n\n**Per Strategi**"
+            for name, st in sorted(book.strategy_stats.items()):
+                text += f"\n- `{name}`: {st.wins}W/{st.losses}L ({st.win_rate:.0f}%) | *{st.total_r:.2f}R*"
         
         await message_interface.reply_text(text, parse_mode='Markdown')
 
 
 async def order_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    # Import di sini: package binance ikut memuat seluruh klien, cukup saat order pertama
+    from binance.exceptions import BinanceAPIException
     try:
         if len(context.args) != 3:
             await update.message.reply_text("Format: `/order SYMBOL SIDE QTY`"); return
@@ -0,0 +1,285 @@
+# incremental.py
+
+import copy
+import logging
+import math
+import sys
+from abc import ABC, abstractmethod
+from collections import deque
+import numpy as np
+import pandas as pd
+
+# Import dari file-file lain dalam proyek
+import indicators
+
+logger = logging.getLogger(__name__)
+
+# ==============================================================================
+# INDIKATOR INKREMENTAL (STREAMING)
+# ==============================================================================
+# pandas_ta menghitung ulang seluruh histori setiap kali dipanggil. Kelas di modul
+# ini menyimpan state sehingga setiap candle tertutup baru cukup diproses sekali
+# (O(1) per update, tidak bergantung panjang histori):
+#
+#     ema = EMA(21).seed(df)          # replay histori sekali
+#     ema.update(candle_baru)         # {'EMA_21': ...}
+#     ema.peek(candle_berjalan)       # nilai sementara, state tidak berubah
+#
+# Rumus dan nama kolom mengikuti pandas_ta 0.3.14b0 (versi di requirements.txt):
+#   - EMA   : seed SMA `length` candle pertama, lalu ewm(span, adjust=False)
+#   - RMA   : ewm(alpha=1/length, adjust=True, min_periods=length) untuk RSI, ATR, ADX
+#   - BBANDS: SMA & standar deviasi populasi (ddof=0)
+# Langkah EWM meniru algoritma pandas (termasuk perlakuan NaN), sehingga hasilnya
+# sama dengan pandas_ta hingga error pembulatan. Cek dengan `max_deviation()` atau
+# `python incremental.py` (lihat `main`).
+
+def _ohlc(candle) -> tuple[float, float, float]:
+    """(high, low, close) dari record CANDLE_DTYPE, baris DataFrame, atau dict."""
+    return float(candle['high']), float(candle['low']), float(candle['close'])
+
+class _EWM:
+    """Satu langkah `Series.ewm(alpha=..., adjust=..., min_periods=...).mean()` pandas (ignore_na=False)."""
+
+    def __init__(self, alpha: float, adjust: bool = True, min_periods: int = 0):
+        self.old_wt_factor = 1.0 - alpha
+        self.new_wt = 1.0 if adjust else alpha
+        self.adjust = adjust
+        self.min_periods = max(min_periods, 1)
+        self.weighted = math.nan
+        self.old_wt = 1.0
+        self.nobs = 0
+
+    def update(self, x: float) -> float:
+        is_observation = x == x
+        self.nobs += is_observation
+        if self.weighted == self.weighted:
+            self.old_wt *= self.old_wt_factor
+            if is_observation:
+                if self.weighted != x:
+                    self.weighted = (self.old_wt * self.weighted + self.new_wt * x) / (self.old_wt + self.new_wt)
+                self.old_wt = self.old_wt + self.new_wt if self.adjust else 1.0
+        elif is_observation:
+            self.weighted = x
+        return self.weighted if self.nobs >= self.min_periods else math.nan
+
+def _rma(length: int) -> _EWM:
+    return _EWM(1.0 / length, adjust=True, min_periods=length)
+
+def _div(a: float, b: float) -> float:
+    """Pembagian dengan semantik numpy (x/0 -> inf/nan) seperti operasi Series pandas_ta."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return float(np.float64(a) / np.float64(b))
+
+class IncrementalIndicator(ABC):
+    """Basis: `update` memproses satu candle TERTUTUP dan mengembalikan {nama_kolom: nilai}."""
+
+    def seed(self, df: pd.DataFrame):
+        """Memproses histori (DataFrame klines) dari awal. Mengembalikan self."""
+        for high, low, close in zip(df['high'].to_numpy(float), df['low'].to_numpy(float), df['close'].to_numpy(float)):
+            self._update(high, low, close)
+        return self
+
+    def update(self, candle) -> dict:
+        return self._update(*_ohlc(candle))
+
+    def peek(self, candle) -> dict:
+        """Nilai jika `candle` (misal candle yang masih berjalan) ditambahkan, tanpa mengubah state."""
+        return copy.deepcopy(self).update(candle)
+
+    @property
+    def value(self) -> dict:
+        return dict(self._value)
+
+    @abstractmethod
+    def _update(self, high: float, low: float, close: float) -> dict:
+        """Memproses satu candle dan memperbarui state; mengembalikan `self.value`."""
+        pass
+
+class EMA(IncrementalIndicator):
+    """Exponential Moving Average, kolom `EMA_{length}`."""
+
+    def __init__(self, length: int):
+        self.length = length
+        self.name = f"EMA_{length}"
+        self._warmup = []
+        self._ewm = _EWM(2.0 / (length + 1), adjust=False)
+        self._value = {self.name: math.nan}
+
+    def _update(self, high, low, close):
+        if self._warmup is not None:
+            self._warmup.append(close)
+            if len(self._warmup) < self.length:
+                return self.value
+            # Seed = SMA candle pertama (sama seperti pandas_ta: np.sum / n)
+            close = float(np.sum(np.array(self._warmup)) / self.length)
+            self._warmup = None
+        self._value = {self.name: self._ewm.update(close)}
+        return self.value
+
+class RSI(IncrementalIndicator):
+    """Relative Strength Index (Wilder), kolom `RSI_{length}`."""
+
+    def __init__(self, length: int = 14):
+        self.length = length
+        self.name = f"RSI_{length}"
+        self._prev_close = None
+        self._gain, self._loss = _rma(length), _rma(length)
+        self._value = {self.name: math.nan}
+
+    def _update(self, high, low, close):
+        change = math.nan if self._prev_close is None else close - self._prev_close
+        self._prev_close = close
+        gain = self._gain.update(max(change, 0.0) if change == change else change)
+        loss = self._loss.update(min(change, 0.0) if change == change else change)
+        self._value = {self.name: _div(100 * gain, gain + abs(loss))}
+        return self.value
+
+class _TrueRange:
+    def __init__(self):
+        self.prev_close = None
+
+    def update(self, high, low, close) -> float:
+        prev_close, self.prev_close = self.prev_close, close
+        if prev_close is None:
+            return math.nan
+        return max(abs(high - low), abs(high - prev_close), abs(prev_close - low))
+
+class ATR(IncrementalIndicator):
+    """Average True Range (RMA), kolom `ATRr_{length}`."""
+
+    def __init__(self, length: int = 14):
+        self.length = length
+        self.name = f"ATRr_{length}"
+        self._tr = _TrueRange()
+        self._rma = _rma(length)
+        self._value = {self.name: math.nan}
+
+    def _update(self, high, low, close):
+        self._value = {self.name: self._rma.update(self._tr.update(high, low, close))}
+        return self.value
+
+class ADX(IncrementalIndicator):
+    """Average Directional Index, kolom `ADX_{length}`, `DMP_{length}`, `DMN_{length}`."""
+
+    def __init__(self, length: int = 14, lensig: int | None = None):
+        self.length = length
+        self.lensig = lensig or length
+        self._atr = ATR(length)
+        self._prev = None
+        self._pos, self._neg, self._adx = _rma(length), _rma(length), _rma(self.lensig)
+        self._names = (f"ADX_{self.lensig}", f"DMP_{length}", f"DMN_{length}")
+        self._value = dict.fromkeys(self._names, math.nan)
+
+    def _update(self, high, low, close):
+        atr = self._atr._update(high, low, close)[self._atr.name]
+        if self._prev is None:
+            pos = neg = math.nan
+        else:
+            up, dn = high - self._prev[0], self._prev[1] - low
+            pos = up if up > dn and up > 0 else 0.0
+            neg = dn if dn > up and dn > 0 else 0.0
+            # pandas_ta membulatkan nilai sangat kecil menjadi 0 (fungsi `zero`)
+            pos = 0.0 if abs(pos) < sys.float_info.epsilon else pos
+            neg = 0.0 if abs(neg) < sys.float_info.epsilon else neg
+        self._prev = (high, low)
+
+        k = _div(100, atr)
+        dmp, dmn = k * self._pos.update(pos), k * self._neg.update(neg)
+        dx = _div(100 * abs(dmp - dmn), dmp + dmn)
+        self._value = dict(zip(self._names, (self._adx.update(dx), dmp, dmn)))
+        return self.value
+
+class BBands(IncrementalIndicator):
+    """
+    Bollinger Bands (SMA, deviasi standar populasi), kolom `BBL/BBM/BBU/BBB/BBP_{length}_{std}`.
+    Mean & varians jendela digeser dengan Welford (tambah satu, buang satu).
+    """
+
+    def __init__(self, length: int = 20, std: float = 2.0):
+        self.length = length
+        self.std = float(std)
+        suffix = f"{length}_{self.std}"
+        self._names = tuple(f"{p}_{suffix}" for p in ('BBL', 'BBM', 'BBU', 'BBB', 'BBP'))
+        self._window = deque()
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._value = dict.fromkeys(self._names, math.nan)
+
+    def _add(self, x):
+        n = len(self._window)
+        delta = x - self._mean
+        self._mean += delta / n
+        self._m2 += delta * (x - self._mean)
+
+    def _remove(self, x):
+        n = len(self._window)
+        delta = x - self._mean
+        self._mean -= delta / n
+        self._m2 -= delta * (x - self._mean)
+
+    def _update(self, high, low, close):
+        self._window.append(close)
+        self._add(close)
+        if len(self._window) > self.length:
+            self._remove(self._window.popleft())
+        if len(self._window) < self.length:
+            return self.value
+        mid = self._mean
+        deviation = self.std * math.sqrt(max(self._m2 / self.length, 0.0))
+        lower, upper = mid - deviation, mid + deviation
+        width = upper - lower
+        self._value = dict(zip(self._names, (
+            lower, mid, upper, _div(100 * width, mid), _div(close - lower, width),
+        )))
+        return self.value
+
+# Pemetaan nama pandas_ta -> kelas inkremental (argumen sama: length, std, ...)
+INDICATORS = {'ema': EMA, 'rsi': RSI, 'atr': ATR, 'adx': ADX, 'bbands': BBands}
+
+def series(indicator: IncrementalIndicator, df: pd.DataFrame) -> pd.DataFrame:
+    """Menjalankan `indicator` candle demi candle atas `df`; hasilnya berbentuk seperti output pandas_ta."""
+    rows = [indicator.update(row) for row in df[['high', 'low', 'close']].to_dict('records')]
+    return pd.DataFrame(rows, index=df.index)
+
+def max_deviation(kind: str, df: pd.DataFrame, **params) -> dict:
+    """
+    Selisih relatif maksimum hasil inkremental terhadap pandas_ta per kolom,
+    hanya pada candle di mana keduanya bernilai (NaN harus di posisi yang sama).
+    """
+    expected = indicators.compute(df, kind, **params)
+    if isinstance(expected, pd.Series):
+        expected = expected.to_frame()
+    got = series(INDICATORS[kind](**params), df)
+    deviations = {}
+    for col in got.columns:
+        a, b = got[col].to_numpy(), expected[col].to_numpy()
+        if not np.array_equal(np.isnan(a), np.isnan(b)):
+            deviations[col] = math.inf
+            continue
+        valid = ~np.isnan(a)
+        scale = np.maximum(np.abs(b[valid]), 1.0)
+        deviations[col] = float(np.max(np.abs(a[valid] - b[valid]) / scale)) if valid.any() else 0.0
+    return deviations
+
+# ==============================================================================
+# VALIDASI (CLI)
+# ==============================================================================
+
+def main(argv=None):
+    """Contoh: python incremental.py BTCUSDT 15m 1000"""
+    import utils # Import di sini agar modul tetap ringan untuk pemakai lain
+
+    args = sys.argv[1:] if argv is None else argv
+    symbol, interval = (args + ['BTCUSDT', '15m'])[:2]
+    limit = int(args[2]) if len(args) > 2 else 1000
+    df = utils.fetch_klines(symbol, interval, limit=limit)
+    if df.empty:
+        print(f"Data {symbol} {interval} tidak tersedia."); return
+    checks = [('ema', {'length': 21}), ('ema', {'length': 200}), ('rsi', {'length': 14}),
+              ('atr', {'length': 14}), ('adx', {'length': 14}), ('bbands', {'length': 20, 'std': 2.0})]
+    for kind, params in checks:
+        for col, deviation in max_deviation(kind, df, **params).items():
+            print(f"{col:<16} deviasi relatif maks: {deviation:.2e}")
+
+if __name__ == "__main__":
+    main()
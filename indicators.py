@@ -0,0 +1,115 @@
+# indicators.py
+
+import logging
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+# Import dari file-file lain dalam proyek
+import config
+
+logger = logging.getLogger(__name__)
+
+# ==============================================================================
+# CACHE KOLOM INDIKATOR (LRU)
+# ==============================================================================
+# Beberapa strategi (dan beberapa user lewat /analyze) sering meminta indikator yang
+# sama, misal EMA 50 BTCUSDT 15m, dalam candle yang sama. Optimizer juga menjalankan
+# strategi yang sama berkali-kali pada data histori yang sama. Hasil pandas_ta
+# disimpan di cache LRU bersama agar tidak dihitung ulang.
+#
+# Hanya frame yang ditandai lewat `tag()` yang di-cache. Frame live ditandai
+# `(symbol, interval)` oleh `utils.fetch_klines` / `market_data`, frame histori
+# ditandai optimizer dengan kunci tambahan. Kunci cache memuat panjang frame,
+# open_time pertama & terakhir, serta OHLCV candle terakhir (candle berjalan yang
+# terus berubah), sehingga potongan (iloc) dan salinan (copy) dari frame yang sama
+# tetap aman: pandas ikut menyalin `df.attrs`. Saat candle ditutup (event stream),
+# semua entri live untuk (symbol, interval) tersebut dibuang lewat `invalidate()`.
+
+_ATTR_KEY = 'indicator_cache_key'
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+def tag(df: pd.DataFrame, *key) -> pd.DataFrame:
+    """Menandai frame (OHLCV tidak akan diubah oleh pemakainya) agar indikatornya boleh di-cache."""
+    df.attrs[_ATTR_KEY] = key
+    return df
+
+def _frame_key(df: pd.DataFrame):
+    key = df.attrs.get(_ATTR_KEY)
+    if key is None or df.empty or config.INDICATOR_CACHE_SIZE <= 0:
+        return None
+    last = df.iloc[-1]
+    return (key, len(df), df['open_time'].iloc[0], last['open_time'],
+            last['open'], last['high'], last['low'], last['close'], last['volume'])
+
+def _ta(df: pd.DataFrame):
+    """Accessor `df.ta`. pandas_ta (import mahal) baru diimpor saat indikator pertama dihitung."""
+    if not hasattr(np, 'NaN'):
+        np.NaN = np.nan
+    import pandas_ta # noqa: F401 (mendaftarkan accessor DataFrame.ta)
+    return df.ta
+
+def compute(df: pd.DataFrame, kind: str, **params) -> pd.Series | pd.DataFrame | None:
+    """
+    Menghitung indikator pandas_ta `kind` (misal 'ema', 'rsi', 'bbands') tanpa mengubah `df`.
+    Hasil untuk frame yang ditandai diambil dari cache jika sudah pernah dihitung.
+    Hasil dari cache dipakai bersama, jadi jangan dimodifikasi.
+    """
+    frame_key = _frame_key(df)
+    if frame_key is None:
+        return getattr(_ta(df), kind)(**params)
+    key = (frame_key, kind, tuple(sorted(params.items())))
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            _stats['hits'] += 1
+            return _cache[key]
+        _stats['misses'] += 1
+    result = getattr(_ta(df), kind)(**params)
+    with _cache_lock:
+        _cache[key] = result
+        while len(_cache) > config.INDICATOR_CACHE_SIZE:
+            _cache.popitem(last=False)
+            _stats['evictions'] += 1
+    return result
+
+def append(df: pd.DataFrame, kind: str, **params) -> pd.DataFrame:
+    """Seperti `df.ta.<kind>(..., append=True)`: kolom hasil indikator ditambahkan ke `df`."""
+    result = compute(df, kind, **params)
+    if result is None:
+        return df
+    if isinstance(result, pd.Series):
+        df[result.name] = result.to_numpy()
+    else:
+        for col in result.columns:
+            df[col] = result[col].to_numpy()
+    return df
+
+def invalidate(symbol: str, interval: str) -> int:
+    """Membuang entri frame live (symbol, interval). Mengembalikan jumlah entri yang dibuang."""
+    with _cache_lock:
+        stale = [key for key in _cache if key[0][0] == (symbol, interval)]
+        for key in stale:
+            del _cache[key]
+    return len(stale)
+
+def on_candle_close(symbol: str, interval: str, record) -> None:
+    """Listener `streaming.MarketStream.add_close_listener`: hasil untuk candle yang baru ditutup sudah basi."""
+    invalidate(symbol, interval)
+
+def clear():
+    """Mengosongkan cache (dipanggil setelah optimasi selesai)."""
+    with _cache_lock:
+        _cache.clear()
+
+def cache_size() -> int:
+    return len(_cache)
+
+def stats() -> dict:
+    """Statistik cache: hits, misses, evictions, size, dan hit_rate (%)."""
+    with _cache_lock:
+        total = _stats['hits'] + _stats['misses']
+        return {**_stats, 'size': len(_cache), 'hit_rate': _stats['hits'] / total * 100 if total else 0.0}
@@ -0,0 +1,221 @@
+# market_data.py
+
+import asyncio
+import logging
+import time
+import aiohttp
+import numpy as np
+import pandas as pd
+
+# Import dari file-file lain dalam proyek
+import config
+import candle_store
+import indicators
+import perf
+import utils
+
+logger = logging.getLogger(__name__)
+
+# ==============================================================================
+# KLIEN MARKET DATA ASYNC (BINANCE FUTURES)
+# ==============================================================================
+# python-binance bersifat blocking, sehingga handler/job async harus membungkusnya
+# dengan thread. Modul ini menyediakan klien asyncio-native di atas aiohttp:
+#   - satu ClientSession dengan connection pool keep-alive untuk seluruh bot,
+#   - request identik yang sedang berjalan digabung (coalescing) jadi satu request,
+#   - jumlah koneksi dibatasi semaphore, dan weight berbagi bucket yang sama dengan
+#     klien sinkron (`utils.rest_limiter`), sehingga total tetap di bawah batas Binance.
+# Hanya endpoint publik (market data) yang didukung; order tetap lewat utils.binance.
+
+FUTURES_BASE_URL = 'https://fapi.binance.com'
+
+class BinanceAPIError(Exception):
+    """Respons error dari REST API Binance."""
+
+    def __init__(self, status: int, code: int | None, message: str):
+        super().__init__(f"HTTP {status} (code={code}): {message}")
+        self.status = status
+        self.code = code
+
+class AsyncMarketData:
+    """Klien market data Binance Futures berbasis aiohttp."""
+
+    def __init__(self, base_url: str = FUTURES_BASE_URL, max_connections: int = 20):
+        self.base_url = base_url
+        self.max_connections = max_connections
+        self._session = None
+        self._loop = None
+        self._semaphore = None
+        self._inflight = {}
+        self._blocked_until = 0.0
+        # Statistik sederhana untuk logging / diagnosa
+        self.request_count = 0
+        self.coalesced_count = 0
+
+    # --------------------------------------------------------------------------
+    # SESSION & REQUEST DASAR
+    # --------------------------------------------------------------------------
+
+    def _ensure_session(self) -> aiohttp.ClientSession:
+        """Membuat session (sekali per event loop) beserta connection pool-nya."""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, ttl_dns_cache=300, keepalive_timeout=60)
+            headers = {'X-MBX-APIKEY': config.BINANCE_API_KEY} if config.BINANCE_API_KEY else None
+            self._session = aiohttp.ClientSession(
+                connector=connector, headers=headers, timeout=aiohttp.ClientTimeout(total=20)
+            )
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_connections)
+            self._inflight = {}
+        return self._session
+
+    async def close(self):
+        """Menutup session. Dipanggil saat bot berhenti."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _acquire_weight(self, weight: int):
+        """Menunggu sampai weight tersedia di bucket bersama tanpa memblokir event loop."""
+        while True:
+            backoff = self._blocked_until - time.monotonic()
+            if backoff > 0:
+                await asyncio.sleep(backoff)
+                continue
+            wait = utils.rest_limiter.reserve(weight)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    async def _request(self, path: str, params: dict, weight: int):
+        session = self._ensure_session()
+        await self._acquire_weight(weight)
+        async with self._semaphore:
+            self.request_count += 1
+            with perf.span('binance_request', endpoint=path):
+                async with session.get(self.base_url + path, params=params) as resp:
+                    used = resp.headers.get('X-MBX-USED-WEIGHT-1M')
+                    if used is not None:
+                        utils.rest_limiter.observe_used(int(used))
+                    if resp.status in (418, 429):
+                        # Rate limit / IP ban: tahan semua request sampai waktu Retry-After
+                        retry_after = int(resp.headers.get('Retry-After', 60))
+                        self._blocked_until = time.monotonic() + retry_after
+                        logger.warning(f"Binance membatasi request ({resp.status}), jeda {retry_after} detik.")
+                    data = await resp.json(content_type=None)
+                    if resp.status >= 400:
+                        code, msg = (data.get('code'), data.get('msg', '')) if isinstance(data, dict) else (None, str(data))
+                        raise BinanceAPIError(resp.status, code, msg)
+                    return data
+
+    async def get(self, path: str, params: dict | None = None, weight: int = 1):
+        """
+        GET ke endpoint publik. Request dengan path & parameter yang sama yang masih
+        berjalan tidak dikirim ulang; pemanggil kedua menunggu hasil request pertama.
+        Hasil dipakai bersama, jadi jangan dimodifikasi oleh pemanggil.
+        """
+        params = {k: v for k, v in (params or {}).items() if v is not None}
+        self._ensure_session()
+        key = (path, tuple(sorted(params.items())))
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._request(path, params, weight))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced_count += 1
+        # shield: pembatalan satu pemanggil tidak membatalkan request untuk pemanggil lain
+        return await asyncio.shield(task)
+
+    # --------------------------------------------------------------------------
+    # ENDPOINT MARKET DATA
+    # --------------------------------------------------------------------------
+
+    async def klines(self, symbol: str, interval: str, limit: int = 500, **params) -> list:
+        """Respons mentah /fapi/v1/klines (format sama dengan binance.futures_klines)."""
+        return await self.get(
+            '/fapi/v1/klines',
+            {'symbol': symbol, 'interval': interval, 'limit': limit, **params},
+            weight=utils.klines_weight(limit),
+        )
+
+    async def fetch_klines(self, symbol: str, interval: str, limit: int = 500) -> pd.DataFrame:
+        """
+        Versi async dari `utils.fetch_klines` dengan format DataFrame dan perilaku yang
+        sama (buffer stream, lalu candle store). Mengembalikan DataFrame kosong jika gagal.
+        """
+        try:
+            with perf.span('fetch_klines', symbol=symbol, interval=interval):
+                records = await self.fetch_kline_records(symbol, interval, limit)
+            return indicators.tag(utils._records_to_frame(records), symbol, interval)
+        except Exception as e:
+            logger.error(f"Fetch klines async gagal untuk {symbol} ({interval}): {e}")
+            return pd.DataFrame()
+
+    async def fetch_kline_records(self, symbol: str, interval: str, limit: int = 500, use_sources: bool = True) -> np.ndarray:
+        """
+        Seperti `fetch_klines`, tetapi mengembalikan record array `candle_store.CANDLE_DTYPE` dan melempar error.
+        `use_sources=False` melewati sumber in-memory (dipakai stream saat mengisi buffernya sendiri).
+        """
+        if use_sources:
+            for source in utils._kline_sources:
+                records = source.read(symbol, interval, limit)
+                if records is not None:
+                    return records
+        if config.CANDLE_STORE_ENABLED:
+            return await self._sync_klines(symbol, interval, limit)
+        return utils._klines_to_records(await self.klines(symbol, interval, limit=limit))
+
+    async def _sync_klines(self, symbol: str, interval: str, limit: int) -> np.ndarray:
+        """Sinkronisasi candle store: request di event loop, tulis ke disk di thread."""
+        stored = candle_store.store.read(symbol, interval)
+        if config.CANDLE_STORE_OFFLINE:
+            return np.array(stored[-limit:])
+        now_ms = int(time.time() * 1000)
+        params = utils._plan_kline_request(stored, interval, limit, now_ms)
+        data = await self.klines(symbol, interval, **params)
+        return await asyncio.to_thread(self._store_klines, symbol, interval, limit, data, now_ms)
+
+    @staticmethod
+    def _store_klines(symbol: str, interval: str, limit: int, data: list, now_ms: int) -> np.ndarray:
+        with candle_store.store.lock(symbol, interval):
+            return utils._store_klines(symbol, interval, limit, data, now_ms)
+
+    async def fetch_klines_many(self, requests: list[tuple[str, str, int]]) -> dict:
+        """
+        Mengambil banyak klines sekaligus secara konkuren.
+
+        Args:
+            requests (list): List (symbol, interval, limit).
+
+        Returns:
+            dict: {(symbol, interval, limit): DataFrame}. DataFrame kosong jika gagal.
+        """
+        keys = list(dict.fromkeys(requests))
+        frames = await asyncio.gather(*(self.fetch_klines(s, i, l) for s, i, l in keys))
+        return dict(zip(keys, frames))
+
+    async def ticker_price(self, symbol: str | None = None) -> float | dict:
+        """
+        Harga terakhir. Dengan `symbol` mengembalikan float, tanpa `symbol`
+        mengembalikan {symbol: harga} untuk semua pair (satu request).
+        """
+        data = await self.get('/fapi/v1/ticker/price', {'symbol': symbol}, weight=1 if symbol else 2)
+        if symbol:
+            return float(data['price'])
+        return {item['symbol']: float(item['price']) for item in data}
+
+    async def ticker_24h(self, symbol: str | None = None) -> dict | list:
+        """Statistik 24 jam (format sama dengan binance.futures_ticker)."""
+        return await self.get('/fapi/v1/ticker/24hr', {'symbol': symbol}, weight=1 if symbol else 40)
+
+    async def mark_prices(self, symbol: str | None = None) -> float | dict:
+        """Mark price dari /fapi/v1/premiumIndex. Tanpa `symbol` -> {symbol: mark price}."""
+        data = await self.get('/fapi/v1/premiumIndex', {'symbol': symbol}, weight=1 if symbol else 10)
+        if symbol:
+            return float(data['markPrice'])
+        return {item['symbol']: float(item['markPrice']) for item in data}
+
+# Instance global yang dipakai handler dan job
+client = AsyncMarketData(max_connections=config.MARKET_DATA_MAX_CONNECTIONS)
@@ -0,0 +1,145 @@
+# market_structure.py
+
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# ==============================================================================
+# DETEKSI STRUKTUR PASAR (SMC) BERBASIS ARRAY
+# ==============================================================================
+# Fair Value Gap, Order Block, swing point dan Break of Structure dihitung untuk
+# seluruh candle sekaligus dengan perbandingan array yang digeser (tanpa loop
+# per baris). Hasil berupa array sepanjang data:
+#   kind   : BULLISH (1), BEARISH (-1), atau 0 (tidak ada pola di index tersebut)
+#   top    : batas atas zona (NaN jika kind == 0)
+#   bottom : batas bawah zona (NaN jika kind == 0)
+# `zones()` mengubahnya menjadi list dict {'type', 'top', 'bottom', 'index'} (format
+# lama strategi SMC), terurut dari yang terbaru.
+
+BULLISH, BEARISH = 1, -1
+_TYPE_NAMES = {BULLISH: 'bullish', BEARISH: 'bearish'}
+
+def _arrays(df: pd.DataFrame, *columns) -> list[np.ndarray]:
+    return [df[col].to_numpy(dtype=float) for col in columns]
+
+def _empty(n: int) -> dict:
+    return {'kind': np.zeros(n, dtype=np.int8), 'top': np.full(n, np.nan), 'bottom': np.full(n, np.nan)}
+
+def fair_value_gaps(df: pd.DataFrame) -> dict:
+    """
+    FVG tiga candle, dicatat di index candle tengah i:
+        bullish: low[i-1] > high[i+1]  -> zona [high[i+1], low[i-1]]
+        bearish: high[i-1] < low[i+1]  -> zona [high[i-1], low[i+1]] (hanya jika bukan bullish)
+    """
+    high, low = _arrays(df, 'high', 'low')
+    out = _empty(len(df))
+    if len(df) < 3:
+        return out
+    prev_low, prev_high = low[:-2], high[:-2]
+    next_low, next_high = low[2:], high[2:]
+    bullish = prev_low > next_high
+    bearish = ~bullish & (prev_high < next_low)
+    mid = slice(1, len(df) - 1)
+    out['kind'][mid] = np.where(bullish, BULLISH, np.where(bearish, BEARISH, 0))
+    out['top'][mid] = np.where(bullish, prev_low, np.where(bearish, next_low, np.nan))
+    out['bottom'][mid] = np.where(bullish, next_high, np.where(bearish, prev_high, np.nan))
+    return out
+
+def swing_points(df: pd.DataFrame, n: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Swing high/low: high[i] (low[i]) adalah yang tertinggi (terendah) di antara 2n+1 candle
+    berpusat di i. Candle tanpa n tetangga penuh di kedua sisi bukan swing.
+
+    Returns:
+        tuple: (is_swing_high, is_swing_low), array boolean.
+    """
+    high, low = _arrays(df, 'high', 'low')
+    is_high, is_low = np.zeros(len(df), dtype=bool), np.zeros(len(df), dtype=bool)
+    if len(df) < 2 * n + 1:
+        return is_high, is_low
+    center = slice(n, len(df) - n)
+    is_high[center] = high[center] == np.lib.stride_tricks.sliding_window_view(high, 2 * n + 1).max(axis=1)
+    is_low[center] = low[center] == np.lib.stride_tricks.sliding_window_view(low, 2 * n + 1).min(axis=1)
+    return is_high, is_low
+
+def last_before(mask: np.ndarray, price: np.ndarray) -> np.ndarray:
+    """Untuk setiap i: `price` pada index terakhir j < i dengan mask[j] True (NaN jika belum ada)."""
+    values = pd.Series(np.where(mask, price, np.nan)).ffill().to_numpy()
+    return np.r_[np.nan, values[:-1]]
+
+def break_of_structure(df: pd.DataFrame, is_swing_high: np.ndarray, is_swing_low: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Break of Structure per candle i: high[i] menembus swing high terakhir SEBELUM i (bullish),
+    atau low[i] menembus swing low terakhir sebelum i (bearish).
+
+    Returns:
+        tuple: (bos_bullish, bos_bearish), array boolean.
+    """
+    high, low = _arrays(df, 'high', 'low')
+    with np.errstate(invalid='ignore'):
+        return high > last_before(is_swing_high, high), low < last_before(is_swing_low, low)
+
+def order_blocks(df: pd.DataFrame, impulse_factor: float, start: int = 1,
+                 bos_bullish: np.ndarray | None = None, bos_bearish: np.ndarray | None = None) -> dict:
+    """
+    Order Block: candle i (i >= start) bergerak impulsif (range > rata-rata range x `impulse_factor`)
+    dan berlawanan warna dengan candle i-1. Zona = high/low candle i-1, dicatat di index i-1.
+        bullish: candle i-1 merah, candle i hijau (dan bos_bullish[i] jika diberikan)
+        bearish: candle i-1 hijau, candle i merah (dan bos_bearish[i] jika diberikan)
+    """
+    open_, high, low, close = _arrays(df, 'open', 'high', 'low', 'close')
+    out = _empty(len(df))
+    start = max(start, 1)
+    if len(df) <= start:
+        return out
+    candle_range = high - low
+    impulsive = candle_range > np.mean(candle_range) * impulse_factor
+    is_red, is_green = close < open_, close > open_
+    bullish = impulsive[1:] & is_red[:-1] & is_green[1:]
+    bearish = impulsive[1:] & ~bullish & is_green[:-1] & is_red[1:]
+    if bos_bullish is not None:
+        bullish &= bos_bullish[1:]
+    if bos_bearish is not None:
+        bearish &= bos_bearish[1:]
+    # Posisi k pada array [1:] = trigger di candle k+1, zona di candle k
+    valid = np.arange(len(df) - 1) + 1 >= start
+    bullish, bearish = bullish & valid, bearish & valid
+    is_zone = bullish | bearish
+    out['kind'][:-1] = np.where(bullish, BULLISH, np.where(bearish, BEARISH, 0))
+    out['top'][:-1] = np.where(is_zone, high[:-1], np.nan)
+    out['bottom'][:-1] = np.where(is_zone, low[:-1], np.nan)
+    return out
+
+def zones(structure: dict, limit: int | None = None) -> list[dict]:
+    """Hasil `fair_value_gaps` / `order_blocks` sebagai list dict, terbaru dulu, maksimal `limit`."""
+    idx = np.flatnonzero(structure['kind'])[::-1][:limit]
+    return [
+        {'type': _TYPE_NAMES[int(structure['kind'][i])], 'top': structure['top'][i],
+         'bottom': structure['bottom'][i], 'index': int(i)}
+        for i in idx
+    ]
+
+def invalidation_levels(df: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Low terendah dan high tertinggi dari index k sampai akhir data (panjang n+1, elemen
+    terakhir = tanpa candle). Dipakai `zone_invalidated` tanpa memindai ulang data.
+    """
+    high, low = _arrays(df, 'high', 'low')
+    lowest = np.r_[np.minimum.accumulate(low[::-1])[::-1], np.inf]
+    highest = np.r_[np.maximum.accumulate(high[::-1])[::-1], -np.inf]
+    return lowest, highest
+
+def zone_invalidated(zone: dict, levels: tuple[np.ndarray, np.ndarray], offset: int = 2) -> bool:
+    """
+    Zona tidak valid jika sudah tertembus oleh candle mulai index zona + `offset`:
+    bullish jika ada low < bottom, bearish jika ada high > top.
+    """
+    lowest, highest = levels
+    k = min(zone['index'] + offset, len(lowest) - 1)
+    if zone['type'] == 'bullish':
+        return bool(lowest[k] < zone['bottom'])
+    if zone['type'] == 'bearish':
+        return bool(highest[k] > zone['top'])
+    return False
@@ -0,0 +1,295 @@
+# optimizer.py
+
+import argparse
+import concurrent.futures
+import json
+import logging
+import math
+import random
+from datetime import datetime, timezone
+
+# Import dari file-file lain dalam proyek
+import config
+import utils
+import features
+import indicators
+from strategies import AVAILABLE_STRATEGIES # Mengimpor kamus strategi yang sudah dimuat
+
+logger = logging.getLogger(__name__)
+
+# ==============================================================================
+# OPTIMIZER PARAMETER STRATEGI (GRID / RANDOM SEARCH)
+# ==============================================================================
+# Menjalankan run_backtest untuk banyak kombinasi parameter strategi (atribut
+# UPPERCASE, lihat BaseStrategy.get_params) pada sekumpulan simbol dan periode.
+# Data candle dimuat SEKALI per simbol dan dipakai untuk semua kombinasi. Kolom
+# indikator di-cache (indicators.py), dan kombinasi diurutkan agar kombinasi dengan
+# lookback yang sama dievaluasi berdekatan di worker yang sama.
+
+# Metrik yang bisa dipakai untuk peringkat
+METRICS = ('profit_factor', 'win_rate', 'expectancy', 'total_r')
+
+# Parameter timeframe tidak bisa dioptimasi karena mengubah data yang dimuat
+_FIXED_PARAMS = ('TIMEFRAME', 'HTF_TIMEFRAME', 'LTF_TIMEFRAME')
+
+def _cast(raw: str, default):
+    """Mengubah string menjadi tipe yang sama dengan nilai default parameter."""
+    if isinstance(default, bool):
+        if raw.lower() not in ('true', 'false', '1', '0'):
+            raise ValueError(f"Nilai boolean tidak valid: {raw}")
+        return raw.lower() in ('true', '1')
+    if isinstance(default, int):
+        return int(float(raw)) if float(raw).is_integer() else float(raw)
+    if isinstance(default, float):
+        return float(raw)
+    return raw
+
+def parse_param_spec(spec: str, strategy_instance) -> tuple[str, list]:
+    """
+    Mem-parsing satu spesifikasi parameter:
+        'RSI_LENGTH=10,14,21'          -> daftar nilai
+        'RISK_REWARD_RATIO=1.5:3:0.5'  -> rentang start:stop:step (stop ikut)
+    """
+    if '=' not in spec:
+        raise ValueError(f"Format parameter harus NAMA=nilai: '{spec}'")
+    name, values = spec.split('=', 1)
+    name = name.strip().upper()
+    params = strategy_instance.get_params()
+    if name not in params:
+        raise ValueError(f"Parameter '{name}' tidak ada di strategi '{strategy_instance.name}'. Tersedia: {', '.join(sorted(params))}")
+    if name in _FIXED_PARAMS:
+        raise ValueError(f"Parameter timeframe '{name}' tidak bisa dioptimasi.")
+    default = params[name]
+
+    if ':' in values:
+        start, stop, step = (float(v) for v in values.split(':'))
+        if step <= 0:
+            raise ValueError(f"Step harus positif: '{spec}'")
+        count = int(math.floor((stop - start) / step + 1e-9)) + 1
+        raw_values = [f"{round(start + k * step, 10)}" for k in range(count)]
+    else:
+        raw_values = [v.strip() for v in values.split(',') if v.strip()]
+    if not raw_values:
+        raise ValueError(f"Tidak ada nilai untuk parameter '{name}'.")
+    return name, list(dict.fromkeys(_cast(v, default) for v in raw_values))
+
+def _lookback_first(grid: dict) -> list[str]:
+    """Parameter lookback indikator diletakkan di depan agar berubah paling jarang (cache lebih sering kena)."""
+    is_lookback = lambda name: any(tag in name for tag in ('LENGTH', 'LOOKBACK', 'PERIOD', 'STDDEV'))
+    return sorted(grid, key=lambda name: (not is_lookback(name), list(grid).index(name)))
+
+def build_param_sets(grid: dict, samples: int | None = None, seed: int | None = None) -> list[dict]:
+    """
+    Semua kombinasi grid, atau `samples` kombinasi acak (random search) jika diisi dan lebih
+    kecil dari jumlah kombinasi. Urutan hasil selalu mengikuti urutan grid (lookback dulu).
+    """
+    keys = _lookback_first(grid)
+    sizes = [len(grid[k]) for k in keys]
+    total = math.prod(sizes)
+    if samples is None or samples >= total:
+        indexes = range(total)
+    else:
+        # Sampel index kombinasi tanpa membentuk seluruh product (grid bisa sangat besar)
+        indexes = sorted(random.Random(seed).sample(range(total), samples))
+
+    param_sets = []
+    for index in indexes:
+        combo = {}
+        for key, size in zip(reversed(keys), reversed(sizes)):
+            index, pos = divmod(index, size)
+            combo[key] = grid[key][pos]
+        param_sets.append({k: combo[k] for k in keys})
+    return param_sets
+
+def summarize(strategy_instance, params: dict, results: list[dict]) -> dict:
+    """Agregasi hasil semua simbol untuk satu set parameter."""
+    trades = sum(r['total_trades'] for r in results)
+    wins = sum(r['wins'] for r in results)
+    losses = sum(r['losses'] for r in results)
+    rr = params.get('RISK_REWARD_RATIO', getattr(strategy_instance, 'RISK_REWARD_RATIO', 1.5))
+    total_r = wins * rr - losses
+    return {
+        'params': params, 'symbols': len(results), 'total_trades': trades, 'wins': wins, 'losses': losses,
+        'win_rate': wins / trades * 100 if trades else 0,
+        'profit_factor': (wins * rr) / losses if losses else (float('inf') if wins else 0),
+        'total_r': total_r, 'expectancy': total_r / trades if trades else 0,
+    }
+
+def rank(summaries: list[dict], metric: str = 'profit_factor', min_trades: int = 10) -> list[dict]:
+    """Urutkan: set dengan trade >= min_trades dulu, lalu metrik (tinggi ke rendah), lalu win rate."""
+    return sorted(summaries, key=lambda r: (r['total_trades'] >= min_trades, r[metric], r['win_rate']), reverse=True)
+
+# ------------------------------------------------------------------------------
+# EVALUASI (DIPANGGIL DI THREAD, PROSES WORKER, ATAU INLINE)
+# ------------------------------------------------------------------------------
+
+def _evaluate_chunk(strategy_name: str, chunk: list[tuple[int, dict]], symbol: str, days: int, preloaded: dict) -> list[tuple[int, dict | None]]:
+    base = AVAILABLE_STRATEGIES[strategy_name]
+    results = []
+    for idx, params in chunk:
+        try:
+            results.append((idx, features.run_backtest(base.with_params(**params), symbol, days, preloaded=preloaded)))
+        except Exception as e:
+            logger.error(f"Optimizer: backtest {symbol} dengan {params} gagal: {e}")
+            results.append((idx, None))
+    return results
+
+def _optimize_worker(task: dict) -> list[tuple[int, dict | None]]:
+    """Dijalankan di proses worker: data dibaca dari shared memory, cache indikator dibuang setelah selesai."""
+    preloaded = features.unpack_backtest_data(task['shm_name'], task['layout'], task['symbol'], task['timeframe'])
+    _tag(preloaded, task['symbol'], task['timeframe'], task['end_ms'])
+    try:
+        return _evaluate_chunk(task['strategy'], task['chunk'], task['symbol'], task['days'], preloaded)
+    finally:
+        indicators.clear()
+
+def _tag(data: dict, symbol: str, timeframe: str, end_ms: int):
+    """Menandai frame histori agar indikatornya boleh di-cache antar set parameter."""
+    indicators.tag(data['df_full'], symbol, timeframe, end_ms)
+    for key, df in data['frames'].items():
+        indicators.tag(df, *key, end_ms)
+
+def optimize(strategy_name: str, grid: dict, symbols: list[str], days: int, end_ms: int | None = None,
+             samples: int | None = None, seed: int | None = None, executor_mode: str | None = None,
+             metric: str = 'profit_factor', min_trades: int = 10, progress=None) -> list[dict]:
+    """
+    Menjalankan optimasi dan mengembalikan ringkasan semua set parameter, terurut dari yang terbaik.
+
+    Args:
+        strategy_name (str): Nama strategi di AVAILABLE_STRATEGIES.
+        grid (dict): {NAMA_PARAMETER: [nilai, ...]}.
+        symbols (list): Simbol yang di-backtest.
+        days (int): Panjang periode backtest (hari) yang berakhir di `end_ms`.
+        end_ms (int | None): Akhir periode (ms UTC). None = sekarang.
+        samples (int | None): Jumlah kombinasi acak (random search). None = seluruh grid.
+        executor_mode (str | None): 'thread', 'process', atau 'inline'. Default `config.BACKTEST_EXECUTOR`.
+        metric (str): Salah satu METRICS untuk peringkat.
+        min_trades (int): Set dengan trade lebih sedikit diletakkan di bawah.
+        progress (callable | None): `progress(selesai, total)` dipanggil setiap satu bagian selesai.
+    """
+    if metric not in METRICS:
+        raise ValueError(f"Metrik harus salah satu dari {METRICS}")
+    strategy_instance = AVAILABLE_STRATEGIES.get(strategy_name)
+    if not strategy_instance:
+        raise ValueError(f"Strategi '{strategy_name}' tidak ditemukan.")
+    executor_mode = executor_mode or config.BACKTEST_EXECUTOR
+    param_sets = build_param_sets(grid, samples, seed)
+    primary_timeframe = getattr(strategy_instance, 'TIMEFRAME', '15m')
+    end_ms = end_ms or int(datetime.now(timezone.utc).timestamp() * 1000)
+    logger.info(f"Optimizer: {len(param_sets)} set parameter x {len(symbols)} simbol untuk '{strategy_name}' ({executor_mode}).")
+
+    # Data HTF dimuat sekali dengan kebutuhan terbesar dari semua set parameter
+    requirements = {}
+    for params in param_sets:
+        for interval, limit in strategy_instance.with_params(**params).data_requirements():
+            requirements[interval] = max(requirements.get(interval, 0), limit)
+    datasets = features.load_backtest_datasets(strategy_instance, symbols, days, end_ms, list(requirements.items()))
+
+    # Bagi set parameter menjadi potongan berurutan per simbol; cukup banyak potongan agar semua worker terpakai
+    workers = config.BACKTEST_PROCESSES if executor_mode == 'process' else config.BACKTEST_WORKERS
+    chunks_per_symbol = min(len(param_sets), max(1, math.ceil(workers * 2 / max(len(symbols), 1))))
+    chunk_size = math.ceil(len(param_sets) / chunks_per_symbol)
+    indexed = list(enumerate(param_sets))
+    tasks = [(sym, indexed[k:k + chunk_size]) for sym in symbols for k in range(0, len(indexed), chunk_size)]
+
+    per_set = {idx: [] for idx in range(len(param_sets))}
+    def collect(chunk_results, done):
+        for idx, result in chunk_results:
+            if result and result.get('total_trades', 0) > 0:
+                per_set[idx].append(result)
+        if progress:
+            progress(done, len(tasks))
+
+    try:
+        if executor_mode == 'process':
+            shm, layouts = features.pack_backtest_data(datasets, primary_timeframe)
+            try:
+                pool = features.get_process_pool()
+                futures = [
+                    pool.submit(_optimize_worker, {
+                        'shm_name': shm.name, 'layout': layouts[sym], 'symbol': sym, 'timeframe': primary_timeframe,
+                        'end_ms': end_ms, 'strategy': strategy_name, 'chunk': chunk, 'days': days,
+                    })
+                    for sym, chunk in tasks
+                ]
+                for done, future in enumerate(concurrent.futures.as_completed(futures), start=1):
+                    collect(future.result(), done)
+            finally:
+                shm.close()
+                shm.unlink()
+        else:
+            for sym, data in datasets.items():
+                _tag(data, sym, primary_timeframe, end_ms)
+            if executor_mode == 'inline':
+                for done, (sym, chunk) in enumerate(tasks, start=1):
+                    collect(_evaluate_chunk(strategy_name, chunk, sym, days, datasets[sym]), done)
+            else:
+                with concurrent.futures.ThreadPoolExecutor(max_workers=config.BACKTEST_WORKERS) as executor:
+                    futures = [executor.submit(_evaluate_chunk, strategy_name, chunk, sym, days, datasets[sym]) for sym, chunk in tasks]
+                    for done, future in enumerate(concurrent.futures.as_completed(futures), start=1):
+                        collect(future.result(), done)
+    finally:
+        indicators.clear()
+
+    summaries = [summarize(strategy_instance, param_sets[idx], results) for idx, results in per_set.items()]
+    return rank(summaries, metric, min_trades)
+
+def format_table(ranked: list[dict], top: int = 10) -> str:
+    """Tabel teks (monospace) untuk `top` set parameter terbaik."""
+    lines = [f"{'#':>2} {'PF':>6} {'WR%':>6} {'Trade':>5} {'R':>7}  Parameter"]
+    for pos, row in enumerate(ranked[:top], start=1):
+        pf = 'inf' if row['profit_factor'] == float('inf') else f"{row['profit_factor']:.2f}"
+        params = ' '.join(f"{k}={v}" for k, v in row['params'].items())
+        lines.append(f"{pos:>2} {pf:>6} {row['win_rate']:>6.1f} {row['total_trades']:>5} {row['total_r']:>7.1f}  {params}")
+    return '\n'.join(lines)
+
+# ==============================================================================
+# CLI
+# ==============================================================================
+
+def main(argv=None):
+    """
+    Contoh:
+        python optimizer.py momentum_trend_rider_v1 --days 30 --symbols BTCUSDT,ETHUSDT \\
+            --param RSI_LENGTH=10,14,21 --param RISK_REWARD_RATIO=1.5:3:0.5 --executor process
+    """
+    parser = argparse.ArgumentParser(description="Optimasi parameter strategi dengan backtest (grid / random search).")
+    parser.add_argument('strategy', choices=sorted(AVAILABLE_STRATEGIES))
+    parser.add_argument('--param', action='append', required=True, help="NAMA=v1,v2,... atau NAMA=start:stop:step (boleh berulang)")
+    parser.add_argument('--symbols', help="Daftar simbol dipisah koma. Default: top simbol.")
+    parser.add_argument('--top-symbols', type=int, default=config.OPTIMIZER_DEFAULT_SYMBOLS, help="Jumlah top simbol jika --symbols kosong.")
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--end', help="Tanggal akhir periode (YYYY-MM-DD, UTC). Default: sekarang.")
+    parser.add_argument('--samples', type=int, help="Random search: jumlah kombinasi acak.")
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--executor', choices=['thread', 'process', 'inline'])
+    parser.add_argument('--metric', choices=METRICS, default='profit_factor')
+    parser.add_argument('--min-trades', type=int, default=10)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--json', help="Simpan seluruh hasil ke file JSON.")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+    strategy_instance = AVAILABLE_STRATEGIES[args.strategy]
+    grid = dict(parse_param_spec(spec, strategy_instance) for spec in args.param)
+    if args.symbols:
+        symbols = [s.strip().upper() for s in args.symbols.split(',') if s.strip()]
+    else:
+        symbols = utils.get_top_symbols()[:args.top_symbols]
+    end_ms = None
+    if args.end:
+        end_ms = int(datetime.strptime(args.end, '%Y-%m-%d').replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+    ranked = optimize(
+        args.strategy, grid, symbols, args.days, end_ms=end_ms, samples=args.samples, seed=args.seed,
+        executor_mode=args.executor, metric=args.metric, min_trades=args.min_trades,
+        progress=lambda done, total: logger.info(f"Optimizer: {done}/{total} bagian selesai"),
+    )
+    print(format_table(ranked, args.top))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(ranked, f, indent=2, default=str)
+    features.shutdown_process_pool()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+# perf.py
+
+import logging
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+import numpy as np
+
+# Import dari file-file lain dalam proyek
+import config
+
+logger = logging.getLogger(__name__)
+
+# ==============================================================================
+# PENCATATAN LATENSI PER TAHAP
+# ==============================================================================
+# Setiap tahap (stage) yang diukur dicatat dengan label, misal:
+#     with perf.span('check_signal', strategy='snr_reversal_v3', symbol='BTCUSDT'):
+#         ...
+# Durasi disimpan per (stage, label) dalam buffer berukuran tetap berisi
+# `config.PERF_SAMPLE_SIZE` sampel terakhir, sehingga p50/p95/p99 mencerminkan
+# kondisi terkini dan memori tetap terbatas. Jumlah & total durasi sejak start
+# dihitung terpisah (counter Prometheus).
+#
+# Tahap yang dicatat bot:
+#   fetch_klines        (symbol, interval)       utils.fetch_klines / market_data.fetch_klines
+#   binance_request     (endpoint)               request REST klien market data async
+#   check_signal        (strategy, symbol)       scan live & auto scan
+#   backtest_load / backtest_signals / backtest_exits (strategy, symbol)
+#   telegram            (method)                 semua panggilan Bot API (sendMessage, ...)
+#   startup             -                        start proses sampai bot siap polling (bot.py)
+#   client_init         (client)                 inisialisasi lazy klien Binance / Gemini (utils.client)
+#
+# Data hanya ada di memori proses ini (worker process pool backtest tidak ikut terhitung).
+
+_lock = threading.Lock()
+_samples = {}  # (stage, ((label, nilai), ...)) -> deque durasi (detik)
+_totals = {}   # kunci yang sama -> [jumlah, total durasi]
+QUANTILES = (50, 95, 99)
+
+def record(stage: str, seconds: float, **labels):
+    """Mencatat satu durasi (detik) untuk `stage` dengan label tertentu."""
+    if not config.PERF_ENABLED:
+        return
+    key = (stage, tuple(sorted((k, str(v)) for k, v in labels.items())))
+    with _lock:
+        samples = _samples.get(key)
+        if samples is None:
+            samples = _samples[key] = deque(maxlen=config.PERF_SAMPLE_SIZE)
+            _totals[key] = [0, 0.0]
+        samples.append(seconds)
+        totals = _totals[key]
+        totals[0] += 1
+        totals[1] += seconds
+
+@contextmanager
+def span(stage: str, **labels):
+    """Context manager: mencatat durasi blok (termasuk jika blok melempar error)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start, **labels)
+
+def reset():
+    with _lock:
+        _samples.clear()
+        _totals.clear()
+
+# ==============================================================================
+# RINGKASAN
+# ==============================================================================
+
+def summary(stage: str | None = None, by: str | None = None) -> list[dict]:
+    """
+    Ringkasan per tahap (atau per nilai label `by` di dalam tahap), diurutkan dari p95 terbesar.
+    Setiap baris: stage, group, count (sejak start), total (detik), p50/p95/p99 & max (detik, sampel terakhir).
+    """
+    groups = {}
+    with _lock:
+        for key, samples in _samples.items():
+            key_stage, labels = key
+            if stage is not None and key_stage != stage:
+                continue
+            group = dict(labels).get(by, '-') if by else ''
+            entry = groups.setdefault((key_stage, group), {'samples': [], 'count': 0, 'total': 0.0})
+            entry['samples'].extend(samples)
+            entry['count'] += _totals[key][0]
+            entry['total'] += _totals[key][1]
+
+    rows = []
+    for (key_stage, group), entry in groups.items():
+        values = np.asarray(entry['samples'])
+        p50, p95, p99 = np.percentile(values, QUANTILES)
+        rows.append({'stage': key_stage, 'group': group, 'count': entry['count'], 'total': entry['total'],
+                     'p50': p50, 'p95': p95, 'p99': p99, 'max': values.max()})
+    return sorted(rows, key=lambda r: r['p95'], reverse=True)
+
+def _ms(seconds: float) -> str:
+    return f"{seconds * 1000:.1f}" if seconds < 10 else f"{seconds * 1000:.0f}"
+
+def format_report(stage: str | None = None, by: str | None = None, top: int = 15) -> str:
+    """Tabel teks (monospace) untuk perintah /perf. Durasi dalam milidetik."""
+    rows = summary(stage, by)
+    if not rows:
+        return "Belum ada data latensi."
+    title = 'group' if by else 'stage'
+    lines = [f"{title:<22} {'n':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}"]
+    for r in rows[:top]:
+        name = (r['group'] if by else r['stage'])[:22]
+        lines.append(f"{name:<22} {r['count']:>6} {_ms(r['p50']):>8} {_ms(r['p95']):>8} {_ms(r['p99']):>8} {_ms(r['max']):>8}")
+    if len(rows) > top:
+        lines.append(f"... {len(rows) - top} baris lainnya")
+    return "\n".join(lines)
+
+def label_names(stage: str) -> list[str]:
+    """Nama label yang pernah dipakai untuk `stage` (untuk bantuan /perf)."""
+    with _lock:
+        return sorted({name for (key_stage, labels) in _samples if key_stage == stage for name, _ in labels})
+
+# ==============================================================================
+# EKSPOR PROMETHEUS (OPSIONAL)
+# ==============================================================================
+
+_METRIC = 'bot_stage_duration_seconds'
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _label_text(pairs) -> str:
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+def prometheus_text() -> str:
+    """Semua data dalam format teks eksposisi Prometheus (tipe summary)."""
+    with _lock:
+        items = [(key, np.asarray(samples), tuple(_totals[key])) for key, samples in _samples.items()]
+    lines = [f"# HELP {_METRIC} Durasi tahap pemrosesan bot (kuantil dari sampel terakhir).",
+             f"# TYPE {_METRIC} summary"]
+    for (stage, labels), values, (count, total) in sorted(items, key=lambda item: item[0]):
+        base = (('stage', stage),) + labels
+        for q, value in zip(QUANTILES, np.percentile(values, QUANTILES)):
+            lines.append(f"{_METRIC}{_label_text(base + (('quantile', str(q / 100)),))} {value:.6f}")
+        lines.append(f"{_METRIC}_sum{_label_text(base)} {total:.6f}")
+        lines.append(f"{_METRIC}_count{_label_text(base)} {count}")
+    return "\n".join(lines) + "\n"
+
+async def start_metrics_server(host: str, port: int):
+    """Menjalankan endpoint HTTP GET /metrics. Mengembalikan runner (panggil `await runner.cleanup()` saat berhenti)."""
+    from aiohttp import web # Import di sini: hanya dibutuhkan jika endpoint diaktifkan
+
+    async def metrics(request):
+        return web.Response(text=prometheus_text(), content_type='text/plain', charset='utf-8')
+
+    app = web.Application()
+    app.router.add_get('/metrics', metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"Endpoint metrik Prometheus aktif di http://{host}:{port}/metrics")
+    return runner
@@ -0,0 +1,170 @@
+# positions.py
+
+import logging
+import math
+
+logger = logging.getLogger(__name__)
+
+# ==============================================================================
+# BUKU POSISI FORWARD TEST
+# ==============================================================================
+# Forward test dulu menyimpan posisi sebagai list `open_trades` / `closed_trades`:
+# setiap job membangun ulang list posisi terbuka, mencari posisi per simbol dengan
+# memindai list, dan /forwardtest status menjumlahkan ulang semua trade yang ditutup.
+#
+# PositionBook menyimpan posisi terbuka dengan indeks per simbol dan per strategi, lalu
+# memperbarui statistik (menang, kalah, total R, kurva equity, drawdown) setiap kali
+# posisi ditutup. Pengecekan "sudah ada posisi di simbol ini?" dan ringkasan status
+# tidak bergantung pada panjang histori.
+#
+# Trade tetap berupa dict (format sinyal strategi + 'sl', 'tp', 'entry_time',
+# 'status', dan 'strategy'), sehingga bisa disimpan apa adanya oleh state_store.
+
+UNKNOWN_STRATEGY = '-'
+
+def trade_r(trade: dict) -> float:
+    """
+    Hasil trade dalam R: LOSS = -1, WIN = risk_reward_ratio trade, atau jarak TP/SL
+    dari entry jika rasio tidak tersedia.
+    """
+    if trade['status'] != 'WIN':
+        return -1.0
+    ratio = trade.get('risk_reward_ratio')
+    if isinstance(ratio, (int, float)) and math.isfinite(ratio):
+        return float(ratio)
+    risk = abs(trade['entry'] - trade['sl'])
+    return abs(trade['tp'] - trade['entry']) / risk if risk > 0 else 0.0
+
+def exit_result(trade: dict, price: float) -> str | None:
+    """'WIN' / 'LOSS' jika `price` menyentuh TP / SL trade, None jika belum."""
+    if trade['signal'] == 'LONG':
+        if price >= trade['tp']:
+            return 'WIN'
+        if price <= trade['sl']:
+            return 'LOSS'
+    elif trade['signal'] == 'SHORT':
+        if price <= trade['tp']:
+            return 'WIN'
+        if price >= trade['sl']:
+            return 'LOSS'
+    return None
+
+class TradeStats:
+    """Statistik berjalan dari trade yang sudah ditutup (semua dalam R)."""
+
+    __slots__ = ('wins', 'losses', 'total_r', 'peak_r', 'max_drawdown', 'equity')
+
+    def __init__(self):
+        self.wins = 0
+        self.losses = 0
+        self.total_r = 0.0
+        self.peak_r = 0.0
+        self.max_drawdown = 0.0
+        self.equity = [] # Total R kumulatif setelah setiap trade ditutup
+
+    def record(self, status: str, r: float):
+        if status == 'WIN':
+            self.wins += 1
+        else:
+            self.losses += 1
+        self.total_r += r
+        self.peak_r = max(self.peak_r, self.total_r)
+        self.max_drawdown = max(self.max_drawdown, self.peak_r - self.total_r)
+        self.equity.append(self.total_r)
+
+    @property
+    def count(self) -> int:
+        return self.wins + self.losses
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.count * 100 if self.count else 0.0
+
+class PositionBook:
+    """Posisi forward test satu chat (lihat keterangan modul)."""
+
+    def __init__(self):
+        self._open = {}         # id(trade) -> trade, urutan pembukaan
+        self._by_symbol = {}    # symbol -> {id(trade): trade}
+        self._by_strategy = {}  # strategy -> {id(trade): trade}
+        self.closed = []        # Trade yang sudah ditutup, urutan penutupan
+        self.stats = TradeStats()
+        self.strategy_stats = {}
+
+    # --------------------------------------------------------------------------
+    # POSISI TERBUKA
+    # --------------------------------------------------------------------------
+
+    def open(self, trade: dict) -> dict:
+        """Mencatat posisi baru (status 'OPEN')."""
+        key = id(trade)
+        self._open[key] = trade
+        self._by_symbol.setdefault(trade['symbol'], {})[key] = trade
+        self._by_strategy.setdefault(trade.get('strategy', UNKNOWN_STRATEGY), {})[key] = trade
+        return trade
+
+    def is_open(self, trade: dict) -> bool:
+        return id(trade) in self._open
+
+    def has_symbol(self, symbol: str) -> bool:
+        return symbol in self._by_symbol
+
+    def open_trades(self, symbol: str | None = None, strategy: str | None = None) -> list[dict]:
+        """Salinan daftar posisi terbuka (semua, per simbol, atau per strategi); aman diiterasi sambil menutup posisi."""
+        if symbol is not None:
+            return list(self._by_symbol.get(symbol, {}).values())
+        if strategy is not None:
+            return list(self._by_strategy.get(strategy, {}).values())
+        return list(self._open.values())
+
+    def open_symbols(self) -> set:
+        return set(self._by_symbol)
+
+    @property
+    def open_count(self) -> int:
+        return len(self._open)
+
+    # --------------------------------------------------------------------------
+    # PENUTUPAN
+    # --------------------------------------------------------------------------
+
+    def close(self, trade: dict, status: str, close_price: float, close_time) -> float:
+        """Menutup posisi terbuka dengan hasil 'WIN' / 'LOSS'. Mengembalikan hasil dalam R."""
+        key = id(trade)
+        if self._open.pop(key, None) is None:
+            raise KeyError(f"Posisi {trade['symbol']} tidak terbuka di buku ini.")
+        for index, name in ((self._by_symbol, trade['symbol']), (self._by_strategy, trade.get('strategy', UNKNOWN_STRATEGY))):
+            group = index[name]
+            del group[key]
+            if not group:
+                del index[name]
+        trade.update({'status': status, 'close_price': close_price, 'close_time': close_time})
+        return self._record_closed(trade)
+
+    def _record_closed(self, trade: dict) -> float:
+        r = trade_r(trade)
+        self.closed.append(trade)
+        self.stats.record(trade['status'], r)
+        strategy = trade.get('strategy', UNKNOWN_STRATEGY)
+        if strategy not in self.strategy_stats:
+            self.strategy_stats[strategy] = TradeStats()
+        self.strategy_stats[strategy].record(trade['status'], r)
+        return r
+
+    # --------------------------------------------------------------------------
+    # PEMULIHAN
+    # --------------------------------------------------------------------------
+
+    @classmethod
+    def from_trades(cls, trades: list[dict]) -> 'PositionBook':
+        """Membangun buku dari trade tersimpan (state_store); trade tertutup diurutkan menurut waktu tutup."""
+        book = cls()
+        closed = []
+        for trade in trades:
+            if trade.get('status', 'OPEN') == 'OPEN':
+                book.open(trade)
+            else:
+                closed.append(trade)
+        for trade in sorted(closed, key=lambda t: (t.get('close_time') is None, str(t.get('close_time')))):
+            book._record_closed(trade)
+        return book
@@ -0,0 +1,232 @@
+# state_store.py
+
+import os
+import json
+import queue
+import sqlite3
+import logging
+import threading
+import itertools
+import time
+from datetime import datetime, timedelta
+
+# Import konfigurasi dari file config.py
+import config
+from positions import PositionBook
+
+logger = logging.getLogger(__name__)
+
+# ==============================================================================
+# PENYIMPANAN STATE BOT (SQLITE WAL)
+# ==============================================================================
+# State yang dulu hanya ada di `app.bot_data` (hilang setiap restart) disimpan ke
+# satu file SQLite (mode WAL) di STATE_DB_PATH:
+#   autoscan_chats      : chat yang mengaktifkan auto scan
+#   signal_times        : waktu sinyal terakhir per (simbol + strategi) untuk anti-spam
+#   forwardtest_chats   : status aktif forward test per chat
+#   forwardtest_trades  : satu baris per trade forward test (data trade sebagai JSON)
+#
+# Penulisan tidak pernah dilakukan di event loop: setiap perubahan dimasukkan ke
+# antrean, lalu thread penulis menjalankannya dalam satu transaksi per batch (setiap
+# STATE_FLUSH_SECONDS). Trade disimpan per baris (upsert berdasarkan id), jadi biaya
+# menulis satu perubahan tidak bergantung pada jumlah histori trade.
+#
+# Saat bot start, `open()` membaca semua state sekali dan mengembalikannya dalam format
+# bot_data (forward test per chat: {'active': bool, 'book': PositionBook}).
+
+SIGNAL_TIME_RETENTION = timedelta(days=1) # Waktu sinyal lebih tua dari ini tidak dipulihkan
+MAX_BATCH = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS autoscan_chats (chat_id INTEGER PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS signal_times (key TEXT PRIMARY KEY, sent_at TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS forwardtest_chats (chat_id INTEGER PRIMARY KEY, active INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS forwardtest_trades (
+    id INTEGER PRIMARY KEY, chat_id INTEGER NOT NULL, status TEXT NOT NULL, data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS forwardtest_trades_chat ON forwardtest_trades (chat_id, status);
+"""
+
+def _encode(value):
+    """Nilai non-JSON di dict trade: datetime/Timestamp -> {'__dt__': iso}, scalar numpy -> Python."""
+    if isinstance(value, datetime):
+        return {'__dt__': value.isoformat()}
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+def _decode(obj: dict):
+    if len(obj) == 1 and '__dt__' in obj:
+        return datetime.fromisoformat(obj['__dt__'])
+    return obj
+
+class StateStore:
+    """State bot yang persisten (lihat keterangan modul). Tanpa `open()`, semua penulisan diabaikan."""
+
+    def __init__(self, path: str, flush_seconds: float = 1.0):
+        self.path = path
+        self.flush_seconds = flush_seconds
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._trade_ids = itertools.count(1)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # --------------------------------------------------------------------------
+    # START (PEMULIHAN) & STOP
+    # --------------------------------------------------------------------------
+
+    def open(self) -> dict:
+        """
+        Membuka database, memulai thread penulis, dan mengembalikan state tersimpan:
+        {'autoscan_chats': set, 'last_signal_time': {key: datetime},
+         'forwardtest_data': {chat_id: {'active': bool, 'book': PositionBook}}}
+        """
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        start = time.perf_counter()
+        conn = self._connect()
+        try:
+            conn.executescript(_SCHEMA)
+            cutoff = (datetime.now() - SIGNAL_TIME_RETENTION).isoformat()
+            conn.execute("DELETE FROM signal_times WHERE sent_at < ?", (cutoff,))
+            conn.commit()
+            state = {
+                'autoscan_chats': {row[0] for row in conn.execute("SELECT chat_id FROM autoscan_chats")},
+                'last_signal_time': {key: datetime.fromisoformat(sent_at)
+                                     for key, sent_at in conn.execute("SELECT key, sent_at FROM signal_times")},
+                'forwardtest_data': {},
+            }
+            active = dict(conn.execute("SELECT chat_id, active FROM forwardtest_chats"))
+            trades = {chat_id: [] for chat_id in active}
+            max_id = 0
+            for trade_id, chat_id, data in conn.execute("SELECT id, chat_id, data FROM forwardtest_trades ORDER BY id"):
+                trade = json.loads(data, object_hook=_decode)
+                trade['id'] = trade_id
+                trades.setdefault(chat_id, []).append(trade)
+                max_id = trade_id
+        finally:
+            conn.close()
+
+        forwardtest = state['forwardtest_data']
+        for chat_id, chat_trades in trades.items():
+            forwardtest[chat_id] = {'active': bool(active.get(chat_id)), 'book': PositionBook.from_trades(chat_trades)}
+
+        self._trade_ids = itertools.count(max_id + 1)
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._writer, name='state-store', daemon=True)
+            self._thread.start()
+        count = sum(len(chat_trades) for chat_trades in trades.values())
+        logger.info(f"State dipulihkan dari {self.path} dalam {(time.perf_counter() - start) * 1000:.0f} ms: "
+                    f"{len(state['autoscan_chats'])} chat auto scan, {len(forwardtest)} chat forward test, {count} trade.")
+        return state
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Menunggu (blocking) sampai semua perubahan yang sudah diantrekan tertulis ke disk."""
+        if not self.running:
+            return True
+        done = threading.Event()
+        self._queue.put(('flush', done))
+        return done.wait(timeout)
+
+    def close(self):
+        """Menulis sisa antrean lalu menghentikan thread penulis (dipanggil saat bot berhenti)."""
+        if not self.running:
+            return
+        self._queue.put(('stop', None))
+        self._thread.join()
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    # --------------------------------------------------------------------------
+    # PERUBAHAN STATE (NON-BLOCKING)
+    # --------------------------------------------------------------------------
+
+    def _put(self, sql: str, params: tuple):
+        if self.running:
+            self._queue.put((sql, params))
+
+    def set_autoscan(self, chat_id: int, enabled: bool):
+        if enabled:
+            self._put("INSERT OR IGNORE INTO autoscan_chats (chat_id) VALUES (?)", (chat_id,))
+        else:
+            self._put("DELETE FROM autoscan_chats WHERE chat_id = ?", (chat_id,))
+
+    def set_signal_time(self, key: str, sent_at: datetime):
+        self._put("INSERT OR REPLACE INTO signal_times (key, sent_at) VALUES (?, ?)", (key, sent_at.isoformat()))
+
+    def set_forwardtest_active(self, chat_id: int, active: bool):
+        self._put("INSERT OR REPLACE INTO forwardtest_chats (chat_id, active) VALUES (?, ?)", (chat_id, int(active)))
+
+    def clear_trades(self, chat_id: int):
+        """Menghapus semua trade forward test satu chat (forward test dimulai ulang)."""
+        self._put("DELETE FROM forwardtest_trades WHERE chat_id = ?", (chat_id,))
+
+    def save_trade(self, chat_id: int, trade: dict):
+        """
+        Menyimpan (insert/update) satu trade. Trade baru mendapat `trade['id']`.
+        Data trade diserialisasi saat dipanggil, jadi perubahan berikutnya perlu disimpan ulang.
+        """
+        trade_id = trade.setdefault('id', next(self._trade_ids))
+        data = json.dumps({k: v for k, v in trade.items() if k != 'id'}, default=_encode)
+        self._put("INSERT OR REPLACE INTO forwardtest_trades (id, chat_id, status, data) VALUES (?, ?, ?, ?)",
+                  (trade_id, chat_id, trade.get('status', 'OPEN'), data))
+
+    # --------------------------------------------------------------------------
+    # THREAD PENULIS
+    # --------------------------------------------------------------------------
+
+    def _writer(self):
+        conn = self._connect()
+        stop = False
+        while not stop:
+            ops = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_seconds
+            # Kumpulkan perubahan lain selama jendela flush, kecuali ada permintaan flush/stop
+            while ops[-1][0] not in ('flush', 'stop') and len(ops) < MAX_BATCH:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    ops.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            # Permintaan flush/stop dipisahkan dari penulisan, agar tetap dilayani walau penulisan gagal
+            waiters = [params for sql, params in ops if sql == 'flush']
+            stop = any(sql == 'stop' for sql, _ in ops)
+            try:
+                self._write(conn, [op for op in ops if op[0] not in ('flush', 'stop')])
+            finally:
+                for done in waiters:
+                    done.set()
+        conn.close()
+
+    def _write(self, conn: sqlite3.Connection, writes: list):
+        """
+        Menulis satu batch dalam satu transaksi. Jika gagal, batch diulang per perubahan
+        sehingga hanya perubahan yang gagal yang dibuang (perubahan chat lain tetap tersimpan).
+        """
+        if not writes:
+            return
+        try:
+            with conn:
+                for sql, params in writes:
+                    conn.execute(sql, params)
+            return
+        except sqlite3.Error as e:
+            logger.warning(f"Batch {len(writes)} perubahan state gagal ditulis ({e}), diulang per perubahan.")
+        for sql, params in writes:
+            try:
+                with conn:
+                    conn.execute(sql, params)
+            except sqlite3.Error as e:
+                logger.error(f"Gagal menulis perubahan state ke {self.path}, dibuang: {e} ({sql.split('(')[0].strip()})")
+
+# Instance global; dibuka oleh bot.py saat start (jika STATE_STORE_ENABLED)
+store = StateStore(config.STATE_DB_PATH, config.STATE_FLUSH_SECONDS)
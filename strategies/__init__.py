@@ -1,35 +1,90 @@
 import os
 import importlib
 import inspect
+import threading
+from collections.abc import Mapping
 from .base_strategy import BaseStrategy
 
+# Manifest strategi: nama strategi -> (modul di folder ini, nama kelas).
+# Modul strategi (beserta pandas_ta dkk.) baru diimpor dan diinstansiasi saat strategi
+# pertama kali dipakai, sehingga menampilkan menu atau daftar nama tidak mengimpor apa pun.
+# Strategi baru cukup ditambahkan di sini; file strategi yang belum terdaftar tetap
+# dimuat (langsung, seperti dulu) dengan peringatan.
+STRATEGY_MANIFEST = {
+    'daytrade_confluence': ('daytrade_confluence', 'DaytradeConfluenceStrategy'),
+    'momentum_trend_rider_v1': ('momentum_trend_rider_v1', 'MomentumTrendRiderStrategy'),
+    'snr_reversal_v3': ('strategy_snr_reversal', 'SnRReversalStrategy'),
+}
+
+class StrategyRegistry(Mapping):
+    """
+    Dict {'nama_strategi': instance} yang memuat strategi saat pertama diakses.
+    `len`, `in`, dan iterasi nama tidak memuat strategi; `registry[nama]`, `.get`,
+    `.values()` dan `.items()` memuat strategi yang dibutuhkan.
+    """
+
+    def __init__(self, manifest: dict):
+        self._manifest = dict(manifest)
+        self._instances = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name: str) -> BaseStrategy:
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        if name not in self._manifest:
+            raise KeyError(name)
+        with self._lock:
+            if name not in self._instances:
+                module_name, class_name = self._manifest[name]
+                module = importlib.import_module(f'strategies.{module_name}')
+                self._register(getattr(module, class_name)(), name)
+            return self._instances[name]
+
+    def __iter__(self):
+        return iter(self._manifest)
+
+    def __len__(self) -> int:
+        return len(self._manifest)
+
+    def __contains__(self, name) -> bool:
+        return name in self._manifest
+
+    def _register(self, instance: BaseStrategy, name: str | None = None):
+        if name is not None and instance.name != name:
+            raise ValueError(f"Manifest strategi '{name}' menunjuk ke strategi bernama '{instance.name}'.")
+        self._manifest.setdefault(instance.name, (type(instance).__module__.rsplit('.', 1)[-1], type(instance).__name__))
+        self._instances[instance.name] = instance
+        print(f"Strategi '{instance.name}' berhasil dimuat.")
+
+    def loaded(self) -> list[str]:
+        """Nama strategi yang sudah dimuat."""
+        return list(self._instances)
+
+    def load_all(self):
+        """Memuat semua strategi (dipanggil di thread latar saat bot start)."""
+        for name in self:
+            self[name]
+
 # Dictionary untuk menyimpan semua strategi yang ditemukan
-# Format: {'nama_strategi': KelasStrategi}
-AVAILABLE_STRATEGIES = {}
+# Format: {'nama_strategi': instance strategi}
+AVAILABLE_STRATEGIES = StrategyRegistry(STRATEGY_MANIFEST)
 
 def load_strategies():
-    """Mencari dan memuat semua kelas strategi dari folder ini."""
-    
-    # Path ke direktori 'strategies' saat ini
+    """Memuat langsung file strategi di folder ini yang belum terdaftar di STRATEGY_MANIFEST."""
+    listed = {module_name for module_name, _ in STRATEGY_MANIFEST.values()}
     strategy_dir = os.path.dirname(__file__)
-    
-    # Loop melalui semua file di direktori
-    for filename in os.listdir(strategy_dir):
+    for filename in sorted(os.listdir(strategy_dir)):
+        module_name = filename[:-3]
         # Hanya proses file python, bukan __init__.py atau base_strategy.py
-        if filename.endswith('.py') and not filename.startswith('__') and not filename.startswith('base_'):
-            # Hapus .py untuk mendapatkan nama modul
-            module_name = filename[:-3]
-            
-            # Import modul secara dinamis
-            module = importlib.import_module(f'strategies.{module_name}')
-            
-            # Cari kelas di dalam modul yang merupakan turunan dari BaseStrategy
-            for name, cls in inspect.getmembers(module, inspect.isclass):
-                if issubclass(cls, BaseStrategy) and cls is not BaseStrategy:
-                    # Instansiasi kelas dan simpan
-                    instance = cls()
-                    AVAILABLE_STRATEGIES[instance.name] = instance
-                    print(f"Strategi '{instance.name}' berhasil dimuat.")
-
-# Panggil fungsi load saat package di-import
-load_strategies()
\ No newline at end of file
+        if not filename.endswith('.py') or filename.startswith(('__', 'base_')) or module_name in listed:
+            continue
+        print(f"Peringatan: '{filename}' belum ada di STRATEGY_MANIFEST, dimuat saat import.")
+        module = importlib.import_module(f'strategies.{module_name}')
+        # Cari kelas di dalam modul yang merupakan turunan dari BaseStrategy
+        for name, cls in inspect.getmembers(module, inspect.isclass):
+            if issubclass(cls, BaseStrategy) and cls is not BaseStrategy and cls.__module__ == module.__name__:
+                AVAILABLE_STRATEGIES._register(cls())
+
+# Panggil fungsi load saat package di-import (hanya strategi di luar manifest)
+load_strategies()
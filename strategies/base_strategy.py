@@ -1,13 +1,26 @@
 # strategies/base_strategy.py
 
+import logging
 from abc import ABC, abstractmethod
 
+import numpy as np
+import pandas as pd
+
+import data_context as data_context_module
+
+# Kolom standar hasil `generate_signals`
+SIGNAL_COLUMNS = ['signal', 'entry', 'stop_loss', 'take_profit', 'reason']
+
 class BaseStrategy(ABC):
     """
     Kelas dasar abstrak untuk semua strategi trading.
     Setiap strategi harus mewarisi kelas ini dan mengimplementasikan metodenya.
     """
-    
+
+    def __init__(self):
+        # Logger per strategi, bisa dipakai subclass lewat `self.logger`
+        self.logger = logging.getLogger(self.__class__.__module__)
+
     @property
     @abstractmethod
     def name(self) -> str:
@@ -21,16 +34,113 @@ class BaseStrategy(ABC):
         pass
 
     @abstractmethod
-    def check_signal(self, symbol: str) -> dict | None:
+    def check_signal(self, symbol: str, df: pd.DataFrame, data_context=None) -> dict | None:
         """
         Metode utama untuk memeriksa sinyal trading pada satu simbol.
 
         Args:
             symbol (str): Simbol pair yang akan dianalisis (misal: 'BTCUSDT').
+            df (pd.DataFrame): Data klines timeframe utama, candle terakhir = candle yang dievaluasi.
+            data_context (DataContext | None): Sumber data timeframe lain (lihat `data_context.py`).
+                                               None = data live.
 
         Returns:
             dict | None: Sebuah dictionary berisi detail sinyal jika ditemukan,
                          atau None jika tidak ada sinyal.
                          Contoh dict: {'symbol': 'BTCUSDT', 'signal': 'LONG', ...}
         """
-        pass
\ No newline at end of file
+        pass
+
+    def data_requirements(self) -> list[tuple[str, int]]:
+        """
+        Data timeframe lain yang dibutuhkan strategi: list (interval, limit).
+        Dipakai backtester untuk memuat data HTF sekali di awal.
+        """
+        return []
+
+    def get_params(self) -> dict:
+        """
+        Parameter strategi: atribut UPPERCASE (kelas maupun instance) yang bukan method dan
+        sudah ada pada instance baru (atribut yang baru diset saat runtime tidak ikut).
+        """
+        defaults = self.__class__()
+        return {
+            key: getattr(self, key) for key in dir(defaults)
+            if key.isupper() and not key.startswith('_') and not callable(getattr(defaults, key))
+        }
+
+    def with_params(self, **params) -> 'BaseStrategy':
+        """Instance baru dari strategi yang sama dengan sebagian parameter diganti."""
+        clone = self.__class__()
+        for key, value in params.items():
+            if not key.isupper() or not hasattr(clone, key):
+                raise ValueError(f"Parameter '{key}' tidak dikenal untuk strategi '{self.name}'.")
+            setattr(clone, key, value)
+        return clone
+
+    def get_klines(self, symbol: str, interval: str, limit: int, data_context=None) -> pd.DataFrame:
+        """Mengambil klines timeframe lain lewat konteks data (default: live)."""
+        return (data_context or data_context_module.LIVE).get_klines(symbol, interval, limit)
+
+    def map_htf(self, symbol: str, df: pd.DataFrame, interval: str, data_context, func, rows=None) -> list:
+        """
+        Mengevaluasi `func(ctx)` untuk setiap candle di `df` (atau hanya `rows`) dengan
+        konteks data point-in-time. Karena hasil hanya bergantung pada candle HTF yang
+        sudah ditutup, `func` cukup dipanggil sekali per candle HTF yang berbeda.
+        Tanpa konteks historis, `func` dipanggil sekali dengan data live.
+        """
+        rows = np.arange(len(df)) if rows is None else np.asarray(rows)
+        if data_context is None or not data_context.is_historical:
+            return [func(data_context)] * len(rows)
+
+        as_of = data_context.as_of_times(df)[rows]
+        counts = data_context.visible_counts(symbol, interval, as_of)
+        cache, values = {}, []
+        for count, t in zip(counts, as_of):
+            if count not in cache:
+                cache[count] = func(data_context.at(int(t)))
+            values.append(cache[count])
+        return values
+
+    @staticmethod
+    def empty_signals(df: pd.DataFrame) -> pd.DataFrame:
+        """Membuat DataFrame sinyal kosong (tanpa sinyal) dengan index yang sama seperti `df`."""
+        return pd.DataFrame({
+            'signal': pd.Series(None, index=df.index, dtype=object),
+            'entry': np.nan, 'stop_loss': np.nan, 'take_profit': np.nan,
+            'reason': pd.Series(None, index=df.index, dtype=object),
+        }, index=df.index)
+
+    def generate_signals(self, symbol: str, df: pd.DataFrame, start: int = 0, data_context=None) -> pd.DataFrame:
+        """
+        Versi batch dari `check_signal`: menghasilkan sinyal untuk SETIAP candle di `df`.
+
+        Baris ke-i berisi hasil yang sama dengan `check_signal(symbol, df.iloc[0:i+1])`.
+        Implementasi default ini adalah adapter yang memanggil `check_signal` per candle
+        (lambat, O(N²)). Strategi sebaiknya meng-override metode ini dengan versi
+        vectorized yang menghitung indikator sekali saja.
+
+        Args:
+            symbol (str): Simbol pair yang dianalisis.
+            df (pd.DataFrame): Data klines timeframe utama (seluruh histori).
+            start (int): Index candle pertama yang perlu dievaluasi. Hanya petunjuk;
+                         implementasi vectorized boleh mengevaluasi semua candle.
+            data_context (DataContext | None): Jika historis, setiap candle melihat data
+                                               HTF sesuai waktunya sendiri (point-in-time).
+
+        Returns:
+            pd.DataFrame: Kolom `SIGNAL_COLUMNS` ('signal' berisi 'LONG'/'SHORT'/None).
+        """
+        signals = self.empty_signals(df)
+        as_of = data_context.as_of_times(df) if data_context is not None and data_context.is_historical else None
+        rows, values = [], []
+        for i in range(max(start, 0), len(df)):
+            ctx = data_context.at(int(as_of[i])) if as_of is not None else data_context
+            signal = self.check_signal(symbol, df.iloc[0:i+1].copy(), ctx)
+            if signal:
+                rows.append(i)
+                values.append([signal.get(col) for col in SIGNAL_COLUMNS])
+        if rows:
+            for col_idx, col in enumerate(SIGNAL_COLUMNS):
+                signals.iloc[rows, signals.columns.get_loc(col)] = [v[col_idx] for v in values]
+        return signals
@@ -4,7 +4,6 @@ import pandas_ta as ta
 import numpy as np
 
 # Import dari file lain dalam proyek Anda
-import utils 
 # Import kelas dasar (BaseStrategy) dari file base_strategy.py
 from .base_strategy import BaseStrategy 
 
@@ -34,22 +33,51 @@ class DaytradeConfluenceStrategy(BaseStrategy):
         self.SR_PROXIMITY_PERCENT = 0.5   # Jarak (dalam %) dari harga ke S/R 1H
         # VOLUME_SPIKE_FACTOR telah dihapus
 
+    @staticmethod
+    def _raw_pivots(highs: np.ndarray, lows: np.ndarray, n: int) -> np.ndarray:
+        """
+        Pivot mentah (sebelum ffill/bfill): candle i adalah pivot high jika high-nya lebih tinggi
+        dari n candle di kiri DAN n candle di kanan (pivot low sebaliknya; pivot high diutamakan).
+        Candle tanpa n tetangga penuh di kedua sisi bukan pivot. Selain itu NaN.
+        """
+        pivots = np.full(len(highs), np.nan)
+        if n < 1 or len(highs) < 2 * n + 1:
+            return pivots
+        # window_max[j] = max(highs[j:j+n]) -> kiri candle i: j = i-n, kanan: j = i+1
+        window_max = np.lib.stride_tricks.sliding_window_view(highs, n).max(axis=1)
+        window_min = np.lib.stride_tricks.sliding_window_view(lows, n).min(axis=1)
+        i = np.arange(n, len(highs) - n)
+        is_pivot_high = (highs[i] > window_max[i - n]) & (highs[i] > window_max[i + 1])
+        is_pivot_low = (lows[i] < window_min[i - n]) & (lows[i] < window_min[i + 1]) & ~is_pivot_high
+        pivots[i[is_pivot_high]] = highs[i[is_pivot_high]]
+        pivots[i[is_pivot_low]] = lows[i[is_pivot_low]]
+        return pivots
+
     def _find_pivots(self, df: pd.DataFrame, n: int) -> pd.Series:
         """Helper untuk menemukan pivot high dan low."""
-        pivots = pd.Series(np.nan, index=df.index)
-        
-        for i in range(n, len(df) - n):
-            is_pivot_high = df['high'].iloc[i] > df['high'].iloc[i-n:i].max() and \
-                            df['high'].iloc[i] > df['high'].iloc[i+1:i+1+n].max()
-            is_pivot_low = df['low'].iloc[i] < df['low'].iloc[i-n:i].min() and \
-                           df['low'].iloc[i] < df['low'].iloc[i+1:i+1+n].min()
-
-            if is_pivot_high:
-                pivots.iloc[i] = df['high'].iloc[i]
-            elif is_pivot_low:
-                pivots.iloc[i] = df['low'].iloc[i]
-        
-        return pivots.ffill().bfill()
+        pivots = self._raw_pivots(df['high'].to_numpy(dtype=float), df['low'].to_numpy(dtype=float), n)
+        return pd.Series(pivots, index=df.index).ffill().bfill()
+
+    @staticmethod
+    def _build_sr_index(pivots_1h: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Level S/R 1H unik terurut menurut harga, beserta open_time pertama level tersebut muncul.
+        Level dengan waktu <= T ada di antara pivot yang relevan untuk candle bertanggal T.
+        """
+        values = pivots_1h.to_numpy(dtype=float)
+        valid = ~np.isnan(values)
+        levels, first_idx = np.unique(values[valid], return_index=True)
+        return levels, np.asarray(pivots_1h.index)[valid][first_idx]
+
+    def _has_sr_confluence(self, sr_index: tuple[np.ndarray, np.ndarray], entry_price: float, candle_time) -> bool:
+        """Apakah ada level S/R 1H (yang sudah ada pada `candle_time`) dalam jarak SR_PROXIMITY_PERCENT dari entry."""
+        levels, first_times = sr_index
+        # Cari kandidat dengan binary search (batas sedikit dilebarkan), lalu cek dengan rumus persis
+        band = abs(entry_price) * self.SR_PROXIMITY_PERCENT / 100 * (1 + 1e-9)
+        lo = np.searchsorted(levels, entry_price - band, side='left')
+        hi = np.searchsorted(levels, entry_price + band, side='right')
+        near = np.abs(entry_price - levels[lo:hi]) / entry_price * 100 < self.SR_PROXIMITY_PERCENT
+        return bool(np.any(near & (first_times[lo:hi] <= np.datetime64(candle_time))))
 
     def _is_reversal_candle(self, df: pd.DataFrame, index: int) -> str | None:
         """Memeriksa apakah candle di indeks tertentu adalah candle pembalikan."""
@@ -61,7 +89,31 @@ class DaytradeConfluenceStrategy(BaseStrategy):
         if current['open'] > prev['close'] and current['close'] < prev['open'] and current['close'] < current['open'] and prev['close'] > prev['open']: return 'BEARISH'
         return None
 
-    def check_signal(self, symbol: str, df: pd.DataFrame) -> dict | None:
+    def _calculate_sl_tp(self, signal: str, entry_price: float, sl_raw: float, rr: float, buffer_percent: float) -> tuple[float, float]:
+        """Menghitung SL (swing + buffer persen) dan TP berdasarkan R:R. Mengembalikan (0, 0) jika tidak valid."""
+        if signal == 'LONG':
+            sl_price = sl_raw * (1 - buffer_percent / 100)
+            risk_distance = entry_price - sl_price
+            if risk_distance <= 0: return 0, 0
+            return sl_price, entry_price + (risk_distance * rr)
+        sl_price = sl_raw * (1 + buffer_percent / 100)
+        risk_distance = sl_price - entry_price
+        if risk_distance <= 0: return 0, 0
+        return sl_price, entry_price - (risk_distance * rr)
+
+    def data_requirements(self) -> list[tuple[str, int]]:
+        return [('1h', 500)]
+
+    def _get_sr_levels_1h(self, symbol: str, data_context=None) -> pd.Series | None:
+        """Mengambil level S/R (pivot) 1H, di-index dengan open_time candle 1H."""
+        df_1h = self.get_klines(symbol, '1h', 500, data_context)
+        if df_1h.empty:
+            self.logger.warning(f"Gagal mengambil data 1H untuk {symbol}.")
+            return None
+        pivots_1h = self._find_pivots(df_1h, self.PIVOT_LOOKBACK)
+        return pd.Series(pivots_1h.to_numpy(), index=df_1h['open_time'].to_numpy())
+
+    def check_signal(self, symbol: str, df: pd.DataFrame, data_context=None) -> dict | None:
         """Fungsi utama untuk memeriksa sinyal berdasarkan logika confluence."""
         if len(df) < 100:
             self.logger.warning(f"Data tidak cukup untuk {symbol} ({len(df)} candle).")
@@ -70,12 +122,10 @@ class DaytradeConfluenceStrategy(BaseStrategy):
         # --- PERBAIKAN KINERJA ---
         # Data 1H diambil HANYA SATU KALI di awal, bukan di dalam loop.
         try:
-            df_1h = utils.fetch_klines(symbol, '1h', limit=500)
-            if df_1h.empty:
-                self.logger.warning(f"Gagal mengambil data 1H untuk {symbol}.")
+            pivots_1h = self._get_sr_levels_1h(symbol, data_context)
+            if pivots_1h is None:
                 return None
-            pivots_1h = self._find_pivots(df_1h, self.PIVOT_LOOKBACK)
-            sr_levels_1h = pivots_1h.dropna().unique()
+            sr_index = self._build_sr_index(pivots_1h)
         except Exception as e:
             self.logger.error(f"Error saat fetch data 1H atau kalkulasi pivot: {e}")
             return None
@@ -117,9 +167,7 @@ class DaytradeConfluenceStrategy(BaseStrategy):
 
             entry_price = candle['close']
             
-            relevant_sr_1h = [sr for sr_time, sr in pivots_1h.dropna().items() if sr_time <= candle['open_time']]
-            sr_confluence = any(abs(entry_price - sr) / entry_price * 100 < self.SR_PROXIMITY_PERCENT for sr in relevant_sr_1h)
-            if not sr_confluence: continue
+            if not self._has_sr_confluence(sr_index, entry_price, candle['open_time']): continue
 
             # --- Jika SEMUA kondisi terpenuhi, buat sinyal ---
             self.logger.info(f"SINYAL DITEMUKAN untuk {symbol} ({potential_signal}) pada candle ke-{i}")
@@ -142,3 +190,114 @@ class DaytradeConfluenceStrategy(BaseStrategy):
             }
             
         return None
+
+    def generate_signals(self, symbol: str, df: pd.DataFrame, start: int = 0, data_context=None) -> pd.DataFrame:
+        """
+        Versi vectorized dari `check_signal`. Baris ke-t identik dengan hasil
+        `check_signal(symbol, df.iloc[0:t+1])`, termasuk aturan bahwa pivot baru
+        terkonfirmasi setelah PIVOT_LOOKBACK candle di kanannya.
+        """
+        signals = self.empty_signals(df)
+        n_candles = len(df)
+        if n_candles < 100:
+            return signals
+
+        def sr_levels_1h(ctx):
+            try:
+                return self._get_sr_levels_1h(symbol, ctx)
+            except Exception as e:
+                self.logger.error(f"Error saat fetch data 1H atau kalkulasi pivot: {e}")
+                return None
+
+        # Data live: level S/R 1H diambil sekali. Data historis: per candle (point-in-time),
+        # dan hanya untuk candle kandidat yang lolos filter Fibonacci + pembalikan.
+        is_historical = data_context is not None and data_context.is_historical
+        live_levels = None
+        if not is_historical:
+            live_levels = sr_levels_1h(data_context)
+            if live_levels is None:
+                return signals
+
+        n = self.PIVOT_LOOKBACK
+        opens, closes = df['open'].to_numpy(), df['close'].to_numpy()
+        highs, lows = df['high'].to_numpy(dtype=float), df['low'].to_numpy(dtype=float)
+
+        # --- Pivot mentah pada seluruh data (sebelum ffill/bfill) ---
+        raw_pivots = self._raw_pivots(highs, lows, n)
+        pivot_idx = np.flatnonzero(~np.isnan(raw_pivots))
+        if len(pivot_idx) == 0:
+            return signals
+        first_pivot_idx, first_pivot = pivot_idx[0], raw_pivots[pivot_idx[0]]
+        pivots_ffill = pd.Series(raw_pivots).ffill().to_numpy()
+
+        t = np.arange(n_candles)
+        confirmed_upto = t - n  # pivot di index p terkonfirmasi pada candle t jika p <= t - n
+
+        def pivot_at(j):
+            """Nilai pivot (setelah ffill/bfill) di index j sesuai data yang tersedia pada candle t."""
+            m = np.minimum(j, confirmed_upto)
+            value = np.where(m >= 0, pivots_ffill[np.clip(m, 0, None)], np.nan)
+            return np.where(np.isnan(value) & (first_pivot_idx <= confirmed_upto), first_pivot, value)
+
+        # --- Pola candle pembalikan (engulfing) per candle ---
+        prev_open, prev_close = np.r_[np.nan, opens[:-1]], np.r_[np.nan, closes[:-1]]
+        is_bullish_rev = (closes > prev_open) & (opens < prev_close) & (closes > opens) & (prev_close < prev_open)
+        is_bearish_rev = (opens > prev_close) & (closes < prev_open) & (closes < opens) & (prev_close > prev_open)
+
+        fib_ratios = [('0.382', 0.382), ('0.500', 0.500), ('0.618', 0.618)]
+        found = np.zeros(n_candles, dtype=bool)
+        found[:99] = True  # check_signal menolak data < 100 candle
+
+        # check_signal memeriksa 4 candle terakhir, dimulai dari yang terbaru
+        for k in range(4):
+            i = t - k
+            valid = (i >= 50) & ~found
+            i_safe = np.clip(i, 1, None)
+            last_pivot, prev_pivot = pivot_at(i), pivot_at(i - 1)
+            valid &= ~np.isnan(last_pivot) & ~np.isnan(prev_pivot)
+
+            is_long = last_pivot > prev_pivot
+            swing_high = np.where(is_long, last_pivot, prev_pivot)
+            swing_low = np.where(is_long, prev_pivot, last_pivot)
+            swing_range = swing_high - swing_low
+            valid &= swing_range > 0
+
+            candle_low, candle_high = lows[i_safe], highs[i_safe]
+            fib_hit = np.full(n_candles, None, dtype=object)
+            for fib_name, ratio in reversed(fib_ratios):
+                level = np.where(is_long, swing_high - (swing_range * ratio), swing_low + (swing_range * ratio))
+                fib_hit = np.where((candle_low <= level) & (level <= candle_high), fib_name, fib_hit)
+            valid &= pd.notna(fib_hit)
+
+            is_reversal = np.where(is_long, is_bullish_rev[i_safe], is_bearish_rev[i_safe])
+            valid &= is_reversal & (i >= 1)
+
+            candidates = np.flatnonzero(valid)
+            if is_historical:
+                levels_per_row = self.map_htf(symbol, df, '1h', data_context, sr_levels_1h, rows=candidates)
+            else:
+                levels_per_row = [live_levels] * len(candidates)
+
+            sr_indexes = {}  # per objek level S/R (satu candle 1H dipakai banyak candle); objeknya ikut disimpan agar id() tetap unik
+            for row, pivots_1h in zip(candidates, levels_per_row):
+                if pivots_1h is None: continue
+                candle_idx = i[row]
+                entry_price = closes[candle_idx]
+                if id(pivots_1h) not in sr_indexes:
+                    sr_indexes[id(pivots_1h)] = (pivots_1h, self._build_sr_index(pivots_1h))
+                if not self._has_sr_confluence(sr_indexes[id(pivots_1h)][1], entry_price, df['open_time'].iloc[candle_idx]):
+                    continue
+
+                potential_signal = 'LONG' if is_long[row] else 'SHORT'
+                sl_raw = swing_low[row] if potential_signal == 'LONG' else swing_high[row]
+                sl_price, tp_price = self._calculate_sl_tp(
+                    potential_signal, entry_price, sl_raw, self.RISK_REWARD_RATIO, self.SL_BUFFER_PERCENT
+                )
+                if sl_price == 0 or tp_price == 0: continue
+
+                found[row] = True
+                signals.iloc[row, [signals.columns.get_loc(c) for c in ('signal', 'entry', 'stop_loss', 'take_profit', 'reason')]] = [
+                    potential_signal, entry_price, sl_price, tp_price,
+                    f"Reversal di Fib {fib_hit[row]} + Konfirmasi S/R 1H."
+                ]
+        return signals
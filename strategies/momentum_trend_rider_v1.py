@@ -6,9 +6,7 @@ import numpy as np
 
 # Import dari file-file lain dalam proyek
 from strategies.base_strategy import BaseStrategy
-# Diasumsikan ada file 'utils.py' yang berisi fungsi fetch_klines
-# seperti pada contoh yang Anda berikan.
-import utils 
+import indicators
 
 class MomentumTrendRiderStrategy(BaseStrategy):
     """
@@ -53,7 +51,10 @@ class MomentumTrendRiderStrategy(BaseStrategy):
     # Lookback untuk mencari swing high/low terdekat untuk Stop Loss
     SL_LOOKBACK_PERIOD = 10 
 
-    def _get_htf_trend(self, symbol: str) -> str | None:
+    def data_requirements(self) -> list[tuple[str, int]]:
+        return [(self.HTF_TIMEFRAME, self.HTF_EMA_LENGTH + 5)]
+
+    def _get_htf_trend(self, symbol: str, data_context=None) -> str | None:
         """
         Menganalisis timeframe tinggi (HTF) untuk menentukan tren utama.
         
@@ -61,14 +62,14 @@ class MomentumTrendRiderStrategy(BaseStrategy):
             str | None: "BULLISH", "BEARISH", atau None jika data tidak cukup.
         """
         # Ambil data klines untuk HTF, cukup beberapa candle terakhir untuk cek EMA.
-        df_htf = utils.fetch_klines(symbol, self.HTF_TIMEFRAME, limit=self.HTF_EMA_LENGTH + 5)
+        df_htf = self.get_klines(symbol, self.HTF_TIMEFRAME, self.HTF_EMA_LENGTH + 5, data_context)
         
         if df_htf.empty or len(df_htf) < self.HTF_EMA_LENGTH:
             # print(f"Peringatan: Data HTF untuk {symbol} tidak cukup.")
             return None
 
         # Hitung EMA di HTF
-        df_htf.ta.ema(length=self.HTF_EMA_LENGTH, append=True)
+        indicators.append(df_htf, 'ema', length=self.HTF_EMA_LENGTH)
         
         last_candle_htf = df_htf.iloc[-1]
         htf_ema = last_candle_htf[f'EMA_{self.HTF_EMA_LENGTH}']
@@ -85,7 +86,7 @@ class MomentumTrendRiderStrategy(BaseStrategy):
         else:
             return None
 
-    def check_signal(self, symbol: str, df: pd.DataFrame) -> dict | None:
+    def check_signal(self, symbol: str, df: pd.DataFrame, data_context=None) -> dict | None:
         """
         Metode utama untuk memeriksa sinyal trading pada timeframe rendah (LTF).
         Bot harus memanggil metode ini pada penutupan setiap candle 15M.
@@ -93,6 +94,7 @@ class MomentumTrendRiderStrategy(BaseStrategy):
         Args:
             symbol (str): Simbol pair yang dianalisis (misal: 'BTCUSDT').
             df (pd.DataFrame): DataFrame berisi data klines dari LTF (15M).
+            data_context (DataContext | None): Sumber data HTF (None = live).
 
         Returns:
             dict | None: Dictionary berisi detail sinyal jika ditemukan, atau None.
@@ -103,15 +105,15 @@ class MomentumTrendRiderStrategy(BaseStrategy):
             return None
 
         # 1. Dapatkan Tren Utama dari HTF
-        htf_trend = self._get_htf_trend(symbol)
+        htf_trend = self._get_htf_trend(symbol, data_context)
         if not htf_trend:
             return None # Tidak ada tren jelas di HTF, jangan trading.
 
         # 2. Persiapan Indikator Kunci di LTF
-        df.ta.ema(length=self.LTF_EMA_FAST_LENGTH, append=True)
-        df.ta.ema(length=self.LTF_EMA_SLOW_LENGTH, append=True)
-        df.ta.rsi(length=self.RSI_LENGTH, append=True)
-        df.ta.bbands(length=self.BB_LENGTH, std=self.BB_STDDEV, append=True)
+        indicators.append(df, 'ema', length=self.LTF_EMA_FAST_LENGTH)
+        indicators.append(df, 'ema', length=self.LTF_EMA_SLOW_LENGTH)
+        indicators.append(df, 'rsi', length=self.RSI_LENGTH)
+        indicators.append(df, 'bbands', length=self.BB_LENGTH, std=self.BB_STDDEV)
 
         # Ambil data candle terakhir di LTF untuk analisis
         last = df.iloc[-1]
@@ -197,4 +199,83 @@ class MomentumTrendRiderStrategy(BaseStrategy):
                 }
 
         # Jika tidak ada kondisi yang terpenuhi, tidak ada sinyal
-        return None
\ No newline at end of file
+        return None
+
+    def generate_signals(self, symbol: str, df: pd.DataFrame, start: int = 0, data_context=None) -> pd.DataFrame:
+        """
+        Versi vectorized dari `check_signal` untuk SELURUH candle sekaligus.
+        Indikator dihitung satu kali pada seluruh DataFrame; nilai pada baris ke-i
+        identik dengan hasil `check_signal` atas `df.iloc[0:i+1]`.
+
+        Args:
+            symbol (str): Simbol pair yang dianalisis (misal: 'BTCUSDT').
+            df (pd.DataFrame): DataFrame berisi data klines dari LTF (15M).
+            start (int): Tidak dipakai, semua candle dievaluasi sekaligus.
+            data_context (DataContext | None): Sumber data HTF (historis = point-in-time per candle).
+
+        Returns:
+            pd.DataFrame: Kolom sinyal standar (lihat `BaseStrategy.generate_signals`).
+        """
+        signals = self.empty_signals(df)
+        min_length = max(self.LTF_EMA_SLOW_LENGTH, self.BB_LENGTH, self.RSI_LENGTH)
+        if df.empty or len(df) < min_length:
+            return signals
+
+        # 1. Tren HTF untuk setiap candle (dihitung sekali per candle HTF)
+        htf_trend = pd.Series(
+            self.map_htf(symbol, df, self.HTF_TIMEFRAME, data_context, lambda ctx: self._get_htf_trend(symbol, ctx)),
+            index=df.index, dtype=object
+        )
+        if htf_trend.isna().all():
+            return signals
+
+        # 2. Indikator LTF untuk seluruh candle (di-cache jika frame histori ditandai, lihat indicators.py)
+        indicators.append(df, 'ema', length=self.LTF_EMA_FAST_LENGTH)
+        indicators.append(df, 'ema', length=self.LTF_EMA_SLOW_LENGTH)
+        indicators.append(df, 'rsi', length=self.RSI_LENGTH)
+        indicators.append(df, 'bbands', length=self.BB_LENGTH, std=self.BB_STDDEV)
+
+        ema_fast = df[f'EMA_{self.LTF_EMA_FAST_LENGTH}']
+        ema_slow = df[f'EMA_{self.LTF_EMA_SLOW_LENGTH}']
+        rsi = df[f'RSI_{self.RSI_LENGTH}']
+        bb_middle = df[f'BBM_{self.BB_LENGTH}_{self.BB_STDDEV}']
+
+        # Baris dengan histori < min_length tidak akan pernah menghasilkan sinyal
+        has_history = pd.Series(np.arange(len(df)) >= min_length - 1, index=df.index)
+        is_valid = has_history & ema_fast.notna() & ema_slow.notna() & rsi.notna() & bb_middle.notna()
+        entry_price = df['close']
+
+        # A. LONG: HTF bullish + pullback ke EMA/BB + candle hijau + RSI bullish
+        pullback_target = np.maximum(ema_fast, bb_middle)
+        long_condition = (is_valid & (htf_trend == "BULLISH") & (ema_fast > ema_slow)
+                          & (df['low'] <= pullback_target) & (df['close'] > df['open'])
+                          & (rsi > self.RSI_MID_LINE) & (rsi < self.RSI_UPPER_BOUND))
+        # Setara dengan df['low'].iloc[-SL_LOOKBACK_PERIOD:-1].min() pada setiap candle
+        long_sl = df['low'].shift(1).rolling(self.SL_LOOKBACK_PERIOD - 1).min()
+        long_risk = entry_price - long_sl
+        long_condition &= long_risk > 0
+
+        # B. SHORT: HTF bearish + reli ke EMA/BB + candle merah + RSI bearish
+        rally_target = np.minimum(ema_fast, bb_middle)
+        short_condition = (is_valid & (htf_trend == "BEARISH") & (ema_fast < ema_slow)
+                           & (df['high'] >= rally_target) & (df['close'] < df['open'])
+                           & (rsi > self.RSI_LOWER_BOUND) & (rsi < self.RSI_MID_LINE))
+        short_sl = df['high'].shift(1).rolling(self.SL_LOOKBACK_PERIOD - 1).max()
+        short_risk = short_sl - entry_price
+        short_condition &= short_risk > 0
+
+        signals.loc[long_condition, 'signal'] = 'LONG'
+        signals.loc[long_condition, 'stop_loss'] = long_sl[long_condition]
+        signals.loc[long_condition, 'take_profit'] = (entry_price + long_risk * self.RISK_REWARD_RATIO)[long_condition]
+        signals.loc[long_condition, 'reason'] = pullback_target[long_condition].map(
+            lambda t: f"HTF Bullish, pullback ke EMA/BB ({t:.4f}) di LTF, RSI > {self.RSI_MID_LINE}")
+
+        signals.loc[short_condition, 'signal'] = 'SHORT'
+        signals.loc[short_condition, 'stop_loss'] = short_sl[short_condition]
+        signals.loc[short_condition, 'take_profit'] = (entry_price - short_risk * self.RISK_REWARD_RATIO)[short_condition]
+        signals.loc[short_condition, 'reason'] = rally_target[short_condition].map(
+            lambda t: f"HTF Bearish, reli ke EMA/BB ({t:.4f}) di LTF, RSI < {self.RSI_MID_LINE}")
+
+        has_signal = long_condition | short_condition
+        signals.loc[has_signal, 'entry'] = entry_price[has_signal]
+        return signals
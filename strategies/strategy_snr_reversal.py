@@ -6,7 +6,7 @@ import numpy as np
 
 # Import dari file-file lain dalam proyek
 from strategies.base_strategy import BaseStrategy
-import utils
+import indicators
 
 class SnRReversalStrategy(BaseStrategy):
     # Nama dan deskripsi diperbarui untuk mencerminkan versi baru
@@ -38,9 +38,12 @@ class SnRReversalStrategy(BaseStrategy):
     VOLUME_FACTOR = 1.2 
     # <<<--- AKHIR PARAMETER BARU ---
 
-    def _find_major_zones(self, symbol: str):
+    def data_requirements(self) -> list[tuple[str, int]]:
+        return [(self.HTF_TIMEFRAME, self.HTF_LOOKBACK)]
+
+    def _find_major_zones(self, symbol: str, data_context=None):
         """Mendeteksi zona Support & Resistance mayor dari Higher Timeframe."""
-        df_htf = utils.fetch_klines(symbol, self.HTF_TIMEFRAME, limit=self.HTF_LOOKBACK)
+        df_htf = self.get_klines(symbol, self.HTF_TIMEFRAME, self.HTF_LOOKBACK, data_context)
         if df_htf.empty or len(df_htf) < (self.SWING_LOOKBACK * 2 + 1):
             return None, None
 
@@ -53,7 +56,7 @@ class SnRReversalStrategy(BaseStrategy):
         
         return major_support, major_resistance
 
-    def check_signal(self, symbol: str, df: pd.DataFrame) -> dict | None:
+    def check_signal(self, symbol: str, df: pd.DataFrame, data_context=None) -> dict | None:
         """
         Metode utama yang memeriksa sinyal berdasarkan data LTF,
         kini dengan tambahan konfirmasi volume.
@@ -61,13 +64,13 @@ class SnRReversalStrategy(BaseStrategy):
         self.TIMEFRAME = self.LTF_TIMEFRAME
         if df.empty or len(df) < 50: return None
         
-        support_zone, resistance_zone = self._find_major_zones(symbol)
+        support_zone, resistance_zone = self._find_major_zones(symbol, data_context)
         if not support_zone and not resistance_zone: return None
 
         # --- PERSIAPAN INDIKATOR (TERMASUK VOLUME MA) ---
-        df.ta.atr(length=self.ATR_LENGTH_LTF, append=True)
+        indicators.append(df, 'atr', length=self.ATR_LENGTH_LTF)
         if self.USE_RSI_FILTER:
-            df.ta.rsi(length=self.RSI_LENGTH, append=True)
+            indicators.append(df, 'rsi', length=self.RSI_LENGTH)
         # <<<--- PERUBAHAN: Hitung Volume Moving Average ---
         if self.USE_VOLUME_FILTER:
             df['volume_ma'] = df['volume'].rolling(self.VOLUME_MA_LENGTH).mean()
@@ -136,4 +139,67 @@ class SnRReversalStrategy(BaseStrategy):
                 reason = f"Rejection dari Resistance HTF ({resistance_zone:.4f}) + Volume"
                 return {'symbol': symbol, 'signal': 'SHORT', 'entry': entry_price, 'stop_loss': stop_loss, 'take_profit': take_profit, 'reason': reason, 'risk_reward_ratio': self.RISK_REWARD_RATIO}
 
-        return None
\ No newline at end of file
+        return None
+
+    def generate_signals(self, symbol: str, df: pd.DataFrame, start: int = 0, data_context=None) -> pd.DataFrame:
+        """
+        Versi vectorized dari `check_signal`: semua candle dievaluasi sekaligus.
+        Baris ke-i identik dengan hasil `check_signal` atas `df.iloc[0:i+1]`.
+        """
+        self.TIMEFRAME = self.LTF_TIMEFRAME
+        signals = self.empty_signals(df)
+        if df.empty or len(df) < 50: return signals
+
+        # Zona HTF untuk setiap candle (dihitung sekali per candle HTF)
+        zones = self.map_htf(symbol, df, self.HTF_TIMEFRAME, data_context, lambda ctx: self._find_major_zones(symbol, ctx))
+        support = pd.Series([z[0] if z[0] else np.nan for z in zones], index=df.index, dtype=float)
+        resistance = pd.Series([z[1] if z[1] else np.nan for z in zones], index=df.index, dtype=float)
+        if support.isna().all() and resistance.isna().all(): return signals
+
+        # --- PERSIAPAN INDIKATOR UNTUK SELURUH CANDLE ---
+        indicators.append(df, 'atr', length=self.ATR_LENGTH_LTF)
+        if self.USE_RSI_FILTER:
+            indicators.append(df, 'rsi', length=self.RSI_LENGTH)
+        if self.USE_VOLUME_FILTER:
+            df['volume_ma'] = df['volume'].rolling(self.VOLUME_MA_LENGTH).mean()
+
+        atr = df[f'ATRr_{self.ATR_LENGTH_LTF}']
+        entry_price = df['close']
+        # check_signal menolak data < 50 candle
+        is_valid = pd.Series(np.arange(len(df)) >= 49, index=df.index) & atr.notna()
+
+        volume_ok = pd.Series(True, index=df.index)
+        if self.USE_VOLUME_FILTER:
+            volume_ok = df['volume_ma'].notna() & (df['volume'] >= df['volume_ma'] * self.VOLUME_FACTOR)
+        rsi = df[f'RSI_{self.RSI_LENGTH}'] if self.USE_RSI_FILTER else None
+
+        # --- SINYAL LONG DI ZONA SUPPORT ---
+        rsi_ok = ~(rsi > self.RSI_OVERBOUGHT) if rsi is not None else True
+        long_condition = (is_valid & support.notna() & (df['low'] <= support) & (df['close'] > support)
+                          & (df['close'] > df['open']) & rsi_ok & volume_ok)
+        long_sl = df['low'] - (atr * self.SL_ATR_BUFFER)
+        long_risk = entry_price - long_sl
+        # check_signal berhenti (None) jika risk <= 0, tanpa mengecek sisi SHORT
+        is_long = long_condition & (long_risk > 0)
+
+        # --- SINYAL SHORT DI ZONA RESISTANCE ---
+        rsi_ok = ~(rsi < self.RSI_OVERSOLD) if rsi is not None else True
+        short_condition = (is_valid & ~long_condition & resistance.notna() & (df['high'] >= resistance)
+                           & (df['close'] < resistance) & (df['close'] < df['open']) & rsi_ok & volume_ok)
+        short_sl = df['high'] + (atr * self.SL_ATR_BUFFER)
+        short_risk = short_sl - entry_price
+        is_short = short_condition & (short_risk > 0)
+
+        signals.loc[is_long, 'signal'] = 'LONG'
+        signals.loc[is_long, 'stop_loss'] = long_sl[is_long]
+        signals.loc[is_long, 'take_profit'] = (entry_price + long_risk * self.RISK_REWARD_RATIO)[is_long]
+        signals.loc[is_long, 'reason'] = support[is_long].map(lambda z: f"Reversal dari Support HTF ({z:.4f}) + Volume")
+
+        signals.loc[is_short, 'signal'] = 'SHORT'
+        signals.loc[is_short, 'stop_loss'] = short_sl[is_short]
+        signals.loc[is_short, 'take_profit'] = (entry_price - short_risk * self.RISK_REWARD_RATIO)[is_short]
+        signals.loc[is_short, 'reason'] = resistance[is_short].map(lambda z: f"Rejection dari Resistance HTF ({z:.4f}) + Volume")
+
+        has_signal = is_long | is_short
+        signals.loc[has_signal, 'entry'] = entry_price[has_signal]
+        return signals
@@ -0,0 +1,297 @@
+# streaming.py
+
+import asyncio
+import json
+import logging
+import threading
+import time
+import numpy as np
+import websockets
+
+# Import dari file-file lain dalam proyek
+import config
+import candle_store
+import market_data
+import utils
+
+logger = logging.getLogger(__name__)
+
+# ==============================================================================
+# BUFFER CANDLE IN-MEMORY
+# ==============================================================================
+
+class CandleRingBuffer:
+    """
+    Buffer berukuran tetap berisi candle yang sudah ditutup untuk satu (symbol, interval),
+    ditambah satu candle yang sedang berjalan. Ditulis oleh event loop (stream), dibaca
+    dari thread mana pun (scanner, strategi) sehingga dilindungi lock.
+    """
+
+    def __init__(self, interval: str, capacity: int):
+        self.interval_ms = utils.interval_to_ms(interval)
+        self.capacity = capacity
+        self.data = np.empty(capacity, dtype=candle_store.CANDLE_DTYPE)
+        self.head = 0        # posisi tulis berikutnya
+        self.count = 0       # jumlah candle tertutup yang valid
+        self.forming = None  # candle berjalan (record tunggal) atau None
+        self.seeded = False
+        self.lock = threading.Lock()
+
+    def seed(self, records: np.ndarray, now_ms: int):
+        """Mengisi ulang buffer dari data REST (candle berjalan dipisahkan dari candle tertutup)."""
+        closed = records[records['close_time'] < now_ms][-self.capacity:]
+        forming = records[records['close_time'] >= now_ms]
+        with self.lock:
+            self.data[:len(closed)] = closed
+            self.head, self.count = len(closed) % self.capacity, len(closed)
+            if len(forming) and (self.forming is None or forming['open_time'][-1] >= self.forming['open_time']):
+                self.forming = forming[-1].copy()
+            self.seeded = True
+
+    def _last_closed(self):
+        return self.data[(self.head - 1) % self.capacity] if self.count else None
+
+    def update(self, record: np.void, is_closed: bool) -> bool:
+        """
+        Menerapkan satu event kline. Mengembalikan False jika terjadi celah (ada candle
+        tertutup yang terlewat), dan buffer perlu di-seed ulang.
+        """
+        with self.lock:
+            if not self.seeded:
+                return True
+            if not is_closed:
+                self.forming = record
+                return True
+            last = self._last_closed()
+            if last is not None:
+                if record['open_time'] <= last['open_time']:
+                    # Event duplikat/lama: timpa hanya jika candle yang sama
+                    if record['open_time'] == last['open_time']:
+                        self.data[(self.head - 1) % self.capacity] = record
+                    return True
+                if record['open_time'] != last['close_time'] + 1:
+                    self.seeded = False
+                    return False
+            self.data[self.head] = record
+            self.head = (self.head + 1) % self.capacity
+            self.count = min(self.count + 1, self.capacity)
+            if self.forming is not None and self.forming['open_time'] <= record['open_time']:
+                self.forming = None
+            return True
+
+    def read(self, limit: int, now_ms: int) -> np.ndarray | None:
+        """
+        `limit` candle terakhir (termasuk candle berjalan), atau None jika buffer belum
+        siap, tidak cukup panjang, atau tertinggal dari waktu sekarang.
+        """
+        with self.lock:
+            if not self.seeded or self.count == 0:
+                return None
+            last = self._last_closed()
+            current_open = now_ms // self.interval_ms * self.interval_ms
+            # Candle tertutup terakhir harus candle periode sebelumnya. Sesaat setelah pergantian
+            # periode, event penutupan candle boleh terlambat hingga STREAM_MAX_LAG_SECONDS.
+            in_grace = now_ms - current_open <= config.STREAM_MAX_LAG_SECONDS * 1000
+            if last['close_time'] + 1 < current_open - (self.interval_ms if in_grace else 0):
+                return None
+            has_forming = self.forming is not None and self.forming['open_time'] > last['open_time']
+            n_closed = limit - 1 if has_forming else limit
+            if self.count < n_closed:
+                return None
+            idx = (self.head - n_closed + np.arange(n_closed)) % self.capacity
+            closed = self.data[idx]
+            if not has_forming:
+                return closed
+            return np.concatenate([closed, np.array([self.forming], dtype=candle_store.CANDLE_DTYPE)])
+
+def _kline_event_to_record(k: dict) -> np.void:
+    """Mengubah payload 'k' dari stream kline menjadi satu record CANDLE_DTYPE."""
+    return np.array(
+        [(k['t'], float(k['o']), float(k['h']), float(k['l']), float(k['c']), float(k['v']), k['T'])],
+        dtype=candle_store.CANDLE_DTYPE,
+    )[0]
+
+# ==============================================================================
+# STREAM WEBSOCKET BINANCE FUTURES
+# ==============================================================================
+
+# Batas jumlah stream per koneksi combined stream Binance Futures
+MAX_STREAMS_PER_CONNECTION = 200
+# Jeda sebelum menyambung ulang setelah error tak terduga (detik), berlipat dua hingga batas
+RECONNECT_DELAY_MIN = 1
+RECONNECT_DELAY_MAX = 60
+
+class MarketStream:
+    """
+    Berlangganan combined stream kline & markPrice Binance Futures untuk universe
+    simbol, lalu memelihara `CandleRingBuffer` per (symbol, interval) dan mark price
+    terbaru per simbol. Setelah `start`, buffer terdaftar sebagai sumber di
+    `utils.fetch_klines`, sehingga scanner dan strategi membaca data tanpa REST.
+    """
+
+    def __init__(self, intervals: list[str], capacity: int):
+        self.intervals = list(intervals)
+        self.capacity = capacity
+        self.symbols = []
+        self.buffers = {}
+        self.mark_prices = {}
+        self._close_listeners = []
+        self._tasks = []
+        self._universe_task = None
+        self._reseeding = set()
+
+    # --------------------------------------------------------------------------
+    # API UNTUK PEMBACA
+    # --------------------------------------------------------------------------
+
+    def read(self, symbol: str, interval: str, limit: int) -> np.ndarray | None:
+        """Dipanggil `utils.fetch_klines`. None jika (symbol, interval) tidak di-stream atau belum aktual."""
+        buffer = self.buffers.get((symbol, interval))
+        if buffer is None or limit > self.capacity:
+            return None
+        return buffer.read(limit, int(time.time() * 1000))
+
+    def mark_price(self, symbol: str, max_age: float = 10.0) -> float | None:
+        """Mark price terbaru dari stream, atau None jika tidak ada / lebih tua dari `max_age` detik."""
+        item = self.mark_prices.get(symbol)
+        if item is None or time.time() * 1000 - item[1] > max_age * 1000:
+            return None
+        return item[0]
+
+    def add_close_listener(self, callback):
+        """`callback(symbol, interval, record)` dipanggil di event loop setiap candle ditutup."""
+        self._close_listeners.append(callback)
+
+    # --------------------------------------------------------------------------
+    # SIKLUS HIDUP
+    # --------------------------------------------------------------------------
+
+    async def start(self, symbol_provider, refresh_seconds: int = 1800):
+        """
+        Mulai streaming. `symbol_provider` adalah fungsi sinkron tanpa argumen yang
+        mengembalikan daftar simbol; dipanggil ulang setiap `refresh_seconds`.
+        """
+        symbols = await asyncio.to_thread(symbol_provider)
+        await self.set_symbols(symbols)
+        utils.register_kline_source(self)
+        self._universe_task = asyncio.create_task(self._universe_loop(symbol_provider, refresh_seconds))
+
+    async def stop(self):
+        utils.unregister_kline_source(self)
+        tasks = self._tasks + ([self._universe_task] if self._universe_task else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks, self._universe_task = [], None
+
+    async def set_symbols(self, symbols: list[str]):
+        """Mengganti universe simbol: koneksi dibuat ulang hanya jika daftarnya berubah."""
+        symbols = sorted(set(symbols))
+        if symbols == self.symbols and self._tasks:
+            return
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+        self.symbols = symbols
+        self.buffers = {
+            (s, i): self.buffers.get((s, i)) or CandleRingBuffer(i, self.capacity)
+            for s in symbols for i in self.intervals
+        }
+        streams = [f"{s.lower()}@kline_{i}" for s in symbols for i in self.intervals]
+        streams += [f"{s.lower()}@markPrice@1s" for s in symbols]
+        self._tasks = [
+            asyncio.create_task(self._run_connection(streams[k:k + MAX_STREAMS_PER_CONNECTION]))
+            for k in range(0, len(streams), MAX_STREAMS_PER_CONNECTION)
+        ]
+        logger.info(f"Streaming {len(symbols)} simbol x {self.intervals} lewat {len(self._tasks)} koneksi WebSocket.")
+
+    async def _universe_loop(self, symbol_provider, refresh_seconds: int):
+        while True:
+            await asyncio.sleep(refresh_seconds)
+            try:
+                await self.set_symbols(await asyncio.to_thread(symbol_provider))
+            except Exception as e:
+                logger.error(f"Gagal memperbarui universe simbol stream: {e}")
+
+    async def _run_connection(self, streams: list[str]):
+        """Satu koneksi combined stream dengan reconnect otomatis; buffer di-seed ulang setiap terhubung."""
+        url = f"{config.STREAM_BASE_URL}/stream?streams={'/'.join(streams)}"
+        keys = [
+            (name.split('@')[0].upper(), name.split('_', 1)[1])
+            for name in streams if '@kline_' in name
+        ]
+        delay = RECONNECT_DELAY_MIN
+        while True:
+            try:
+                async for ws in websockets.connect(url, ping_interval=20, max_size=2 ** 22):
+                    # Seed setelah koneksi terbuka agar candle yang ditutup selama seeding tidak terlewat
+                    seed_task = asyncio.create_task(self._seed(keys))
+                    try:
+                        async for raw in ws:
+                            self._on_message(json.loads(raw))
+                            delay = RECONNECT_DELAY_MIN
+                    except websockets.ConnectionClosed as e:
+                        logger.warning(f"Koneksi stream terputus ({e}), menyambung ulang...")
+                    finally:
+                        seed_task.cancel()
+            except Exception as e:
+                # Error lain (pesan tidak valid, handshake ditolak, ...) menutup koneksi; tunggu dulu agar tidak reconnect beruntun
+                logger.error(f"Error pada koneksi stream ({e}), menyambung ulang dalam {delay} detik...")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RECONNECT_DELAY_MAX)
+
+    async def _seed(self, keys: list[tuple[str, str]]):
+        """Mengisi buffer dari REST (lewat candle store, jadi hanya candle baru yang diminta)."""
+        async def seed_one(symbol, interval):
+            try:
+                records = await market_data.client.fetch_kline_records(symbol, interval, self.capacity, use_sources=False)
+                buffer = self.buffers.get((symbol, interval))
+                if buffer is not None:
+                    buffer.seed(records, int(time.time() * 1000))
+            except Exception as e:
+                logger.error(f"Seed buffer stream gagal untuk {symbol} ({interval}): {e}")
+        await asyncio.gather(*(seed_one(s, i) for s, i in keys))
+
+    def _on_message(self, message: dict):
+        data = message.get('data', message)
+        event = data.get('e')
+        if event == 'kline':
+            k = data['k']
+            key = (data['s'], k['i'])
+            buffer = self.buffers.get(key)
+            if buffer is None:
+                return
+            record = _kline_event_to_record(k)
+            if not buffer.update(record, k['x']):
+                self._schedule_reseed(key)
+            elif k['x']:
+                for callback in self._close_listeners:
+                    try:
+                        callback(key[0], key[1], record)
+                    except Exception as e:
+                        logger.error(f"Listener candle close error: {e}")
+        elif event == 'markPriceUpdate':
+            self.mark_prices[data['s']] = (float(data['p']), data['E'])
+
+    def _schedule_reseed(self, key: tuple[str, str]):
+        if key in self._reseeding:
+            return
+        self._reseeding.add(key)
+        logger.warning(f"Celah data stream pada {key}, seed ulang dari REST.")
+        task = asyncio.create_task(self._seed([key]))
+        task.add_done_callback(lambda _: self._reseeding.discard(key))
+
+def default_intervals() -> list[str]:
+    """Interval yang di-stream: STREAM_INTERVALS, atau semua timeframe yang dipakai strategi aktif."""
+    if config.STREAM_INTERVALS:
+        return [i.strip() for i in config.STREAM_INTERVALS.split(',') if i.strip()]
+    from strategies import AVAILABLE_STRATEGIES
+    intervals = []
+    for strategy in AVAILABLE_STRATEGIES.values():
+        intervals.append(getattr(strategy, 'TIMEFRAME', '15m'))
+        intervals.extend(interval for interval, _ in strategy.data_requirements())
+    return list(dict.fromkeys(intervals))
+
+# Instance global; dibuat saat bot start jika STREAMING_ENABLED
+hub: MarketStream | None = None
@@ -0,0 +1,7 @@
+# tests/conftest.py
+
+import os
+import sys
+
+# Modul proyek berada di root repo (bukan package), jadi root ditambahkan ke sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,76 @@
+# tests/test_backtest_engines.py
+
+import numpy as np
+import pytest
+
+import benchmark
+import candle_store
+import features
+import indicators
+import utils
+from candles import Candles
+from strategies import STRATEGY_MANIFEST, AVAILABLE_STRATEGIES
+
+# ==============================================================================
+# ENGINE BACKTEST 'vectorized' VS 'slice'
+# ==============================================================================
+# Kedua engine dijalankan atas candle sintetis deterministik (benchmark.synthetic_records)
+# lewat `preloaded=`, tanpa jaringan. Frame HTF dibentuk dari candle timeframe utama
+# (resample), sehingga level HTF konsisten dengan harga yang diuji strategi.
+
+SYMBOL = 'BTCUSDT'
+CANDLES = 1000
+
+def _resample(records: np.ndarray, interval: str) -> np.ndarray:
+    """Menggabungkan candle `records` menjadi candle `interval` (sisa di akhir dibuang)."""
+    group = utils.interval_to_ms(interval) // int(records['open_time'][1] - records['open_time'][0])
+    grouped = records[:len(records) // group * group].reshape(-1, group)
+    out = np.empty(len(grouped), dtype=candle_store.CANDLE_DTYPE)
+    out['open_time'], out['close_time'] = grouped['open_time'][:, 0], grouped['close_time'][:, -1]
+    out['open'], out['close'] = grouped['open'][:, 0], grouped['close'][:, -1]
+    out['high'], out['low'] = grouped['high'].max(axis=1), grouped['low'].min(axis=1)
+    out['volume'] = grouped['volume'].sum(axis=1)
+    return out
+
+def _preloaded(strategy_instance) -> dict:
+    """Data dalam format `features.load_backtest_data`."""
+    primary_timeframe = getattr(strategy_instance, 'TIMEFRAME', '15m')
+    records = benchmark.synthetic_records(SYMBOL, primary_timeframe, CANDLES)
+    frames = {(SYMBOL, interval): Candles.from_records(_resample(records, interval)).to_pandas()
+              for interval, _ in strategy_instance.data_requirements()}
+    return {'df_full': Candles.from_records(records).to_pandas(), 'frames': frames}
+
+def _run(strategy_instance, engine: str, monkeypatch) -> tuple[dict, list, list]:
+    """Hasil run_backtest, sinyal mentah engine, dan sinyal yang diterima (masuk simulasi exit)."""
+    collected, accepted = [], []
+    collector = {'vectorized': '_collect_signals_vectorized', 'slice': '_collect_signals_slice'}[engine]
+    collect, resolve_exits = getattr(features, collector), features.exit_resolver.resolve_exits
+
+    def spy_collect(*args, **kwargs):
+        signals = collect(*args, **kwargs)
+        collected.extend((i, signal['signal'], signal['entry'], signal['stop_loss'], signal['take_profit'])
+                         for i, signal in signals)
+        return signals
+
+    def spy_resolve_exits(highs, lows, entry_idx, sl, tp, is_long):
+        accepted.extend(zip(entry_idx.tolist(), is_long.tolist(), sl.tolist(), tp.tolist()))
+        return resolve_exits(highs, lows, entry_idx, sl, tp, is_long)
+
+    monkeypatch.setattr(features, collector, spy_collect)
+    monkeypatch.setattr(features.exit_resolver, 'resolve_exits', spy_resolve_exits)
+    indicators.clear()
+    result = features.run_backtest(strategy_instance, SYMBOL, CANDLES // 96, engine=engine,
+                                   intrabar_interval='', preloaded=_preloaded(strategy_instance))
+    monkeypatch.undo()
+    return result, collected, accepted
+
+@pytest.mark.parametrize('name', list(STRATEGY_MANIFEST))
+def test_vectorized_matches_slice(name, monkeypatch):
+    strategy_instance = AVAILABLE_STRATEGIES[name]
+    vectorized = _run(strategy_instance, 'vectorized', monkeypatch)
+    sliced = _run(strategy_instance, 'slice', monkeypatch)
+
+    result, signals, accepted = vectorized
+    assert signals == sliced[1]
+    assert accepted == sliced[2]
+    assert result == sliced[0]
@@ -0,0 +1,48 @@
+# tests/test_incremental.py
+
+from importlib import metadata
+
+import pytest
+
+import benchmark
+import incremental
+from candles import Candles
+
+# Rumus kelas inkremental mengikuti pandas_ta versi di requirements.txt; versi lain
+# (misal seed RMA yang berbeda) memang memberi hasil berbeda
+PANDAS_TA_VERSION = '0.3.14b0'
+MAX_DEVIATION = 1e-9
+
+CHECKS = [
+    ('ema', {'length': 21}), ('ema', {'length': 200}), ('rsi', {'length': 14}),
+    ('atr', {'length': 14}), ('adx', {'length': 14}), ('bbands', {'length': 20, 'std': 2.0}),
+]
+
+def _installed_version() -> str | None:
+    try:
+        return metadata.version('pandas_ta')
+    except metadata.PackageNotFoundError:
+        return None
+
+@pytest.fixture(scope='module')
+def df():
+    return Candles.from_records(benchmark.synthetic_records('BTCUSDT', '15m', 2000)).to_pandas()
+
+@pytest.mark.skipif(_installed_version() != PANDAS_TA_VERSION, reason=f"butuh pandas_ta=={PANDAS_TA_VERSION}")
+@pytest.mark.parametrize('kind, params', CHECKS, ids=[f"{kind}{params}" for kind, params in CHECKS])
+def test_matches_pandas_ta(df, kind, params):
+    deviations = incremental.max_deviation(kind, df, **params)
+    assert deviations
+    assert all(deviation <= MAX_DEVIATION for deviation in deviations.values()), deviations
+
+def test_peek_does_not_change_state(df):
+    indicator = incremental.ADX(14).seed(df.iloc[:-1])
+    peeked = indicator.peek(df.iloc[-1])
+    assert indicator.update(df.iloc[-1]) == peeked
+
+def test_indicator_must_implement_update():
+    class Incomplete(incremental.IncrementalIndicator):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,45 @@
+# tests/test_state_store.py
+
+import threading
+
+import state_store
+
+# Perubahan yang pasti gagal ditulis (tabel tidak ada)
+FAILING_SQL = "INSERT INTO missing_table (id) VALUES (?)"
+
+def _opened(tmp_path, flush_seconds: float = 1.0) -> state_store.StateStore:
+    store = state_store.StateStore(str(tmp_path / 'state.db'), flush_seconds)
+    store.open()
+    return store
+
+def _returns(func, timeout: float = 5.0) -> bool:
+    """True jika `func()` selesai dalam `timeout` detik."""
+    thread = threading.Thread(target=func, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    return not thread.is_alive()
+
+def test_close_returns_after_failed_write_in_same_batch(tmp_path):
+    store = _opened(tmp_path)
+    store.set_autoscan(1, True)
+    store._put(FAILING_SQL, (1,))
+    store.set_autoscan(2, True)
+    assert _returns(store.close)
+    assert not store.running
+
+    # Hanya perubahan yang gagal yang dibuang
+    reopened = state_store.StateStore(str(tmp_path / 'state.db'))
+    try:
+        assert reopened.open()['autoscan_chats'] == {1, 2}
+    finally:
+        reopened.close()
+
+def test_flush_returns_after_failed_write(tmp_path):
+    store = _opened(tmp_path)
+    try:
+        store._put(FAILING_SQL, (1,))
+        assert store.flush(timeout=5)
+        store.set_autoscan(3, True)
+        assert store.flush(timeout=5)
+    finally:
+        store.close()
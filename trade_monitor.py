@@ -0,0 +1,244 @@
+# trade_monitor.py
+
+import asyncio
+import bisect
+import itertools
+import json
+import logging
+import time
+import websockets
+
+# Import dari file-file lain dalam proyek
+import config
+from positions import exit_result
+
+logger = logging.getLogger(__name__)
+
+# Jeda sebelum menyambung ulang setelah error tak terduga (detik), berlipat dua hingga batas
+RECONNECT_DELAY_MIN = 1
+RECONNECT_DELAY_MAX = 60
+
+# ==============================================================================
+# MONITOR SL/TP FORWARD TEST BERBASIS STREAM MARK PRICE
+# ==============================================================================
+# Dulu exit forward test hanya dicek setiap 5 menit dari snapshot harga, sehingga
+# lonjakan yang menyentuh SL/TP di antara dua polling terlewat atau salah dihitung.
+#
+# TradeMonitor membuka satu koneksi WebSocket sendiri dan hanya berlangganan stream
+# `<symbol>@markPrice@1s` untuk simbol yang punya posisi forward test terbuka
+# (SUBSCRIBE/UNSUBSCRIBE saat posisi pertama dibuka / terakhir ditutup). Perubahan
+# langganan dikumpulkan dan dikirim sekali per putaran event loop, paling banyak satu
+# pesan SUBSCRIBE dan satu UNSUBSCRIBE, karena Binance membatasi 10 pesan masuk per detik.
+# Level SL/TP per simbol disimpan di LevelBook (dua list terurut), sehingga setiap
+# update harga cukup dibandingkan dengan level terdekat; posisi yang tersentuh langsung
+# ditutup lewat callback `on_exit(chat_id, trade, result, price)`.
+#
+# Simbol yang belum menerima update dalam FORWARDTEST_MONITOR_MAX_AGE detik (baru
+# dibuka, koneksi terputus) tetap dicek oleh polling `features.forwardtest_job`.
+
+class LevelBook:
+    """
+    Level SL/TP semua posisi satu simbol:
+      upper: level yang tersentuh saat harga >= level (TP LONG, SL SHORT)
+      lower: level yang tersentuh saat harga <= level (SL LONG, TP SHORT)
+    Masing-masing berupa list level terurut + list key sejajar.
+    """
+
+    __slots__ = ('upper_levels', 'upper_keys', 'lower_levels', 'lower_keys')
+
+    def __init__(self):
+        self.upper_levels, self.upper_keys = [], []
+        self.lower_levels, self.lower_keys = [], []
+
+    def __len__(self) -> int:
+        return len(self.upper_keys)
+
+    @staticmethod
+    def _insert(levels: list, keys: list, level: float, key):
+        i = bisect.bisect_right(levels, level)
+        levels.insert(i, level)
+        keys.insert(i, key)
+
+    @staticmethod
+    def _remove(levels: list, keys: list, key):
+        i = keys.index(key)
+        del levels[i], keys[i]
+
+    def add(self, key, signal: str, sl: float, tp: float):
+        upper, lower = (tp, sl) if signal == 'LONG' else (sl, tp)
+        self._insert(self.upper_levels, self.upper_keys, upper, key)
+        self._insert(self.lower_levels, self.lower_keys, lower, key)
+
+    def remove(self, key):
+        self._remove(self.upper_levels, self.upper_keys, key)
+        self._remove(self.lower_levels, self.lower_keys, key)
+
+    def crossed(self, price: float) -> list:
+        """Key posisi yang levelnya tersentuh oleh `price` (tanpa menghapusnya)."""
+        upper = self.upper_keys[:bisect.bisect_right(self.upper_levels, price)]
+        lower = self.lower_keys[bisect.bisect_left(self.lower_levels, price):]
+        return list(dict.fromkeys(upper + lower))
+
+class TradeMonitor:
+    """Monitor exit posisi forward test (lihat keterangan modul)."""
+
+    def __init__(self, on_exit, max_age: float = 10.0):
+        self.on_exit = on_exit
+        self.max_age = max_age
+        self.levels = {}       # symbol -> LevelBook
+        self.trades = {}       # key -> (chat_id, trade)
+        self.last_update = {}  # symbol -> waktu update mark price terakhir (epoch detik)
+        self._ws = None
+        self._task = None
+        self._tasks = set()  # Task kirim/notify yang masih berjalan (referensi agar tidak di-GC)
+        self._request_ids = itertools.count(1)
+        self._pending_subscribe = set()
+        self._pending_unsubscribe = set()
+        self._flush_scheduled = False
+
+    # --------------------------------------------------------------------------
+    # POSISI YANG DIPANTAU
+    # --------------------------------------------------------------------------
+
+    @staticmethod
+    def _key(chat_id: int, trade: dict):
+        return (chat_id, id(trade))
+
+    def watch(self, chat_id: int, trade: dict):
+        """Mulai memantau SL/TP posisi terbuka."""
+        key = self._key(chat_id, trade)
+        if key in self.trades:
+            return
+        symbol = trade['symbol']
+        if symbol not in self.levels:
+            self.levels[symbol] = LevelBook()
+            self._queue('SUBSCRIBE', symbol)
+        self.levels[symbol].add(key, trade['signal'], trade['sl'], trade['tp'])
+        self.trades[key] = (chat_id, trade)
+
+    def unwatch(self, chat_id: int, trade: dict):
+        key = self._key(chat_id, trade)
+        if self.trades.pop(key, None) is None:
+            return
+        symbol = trade['symbol']
+        book = self.levels[symbol]
+        book.remove(key)
+        if not len(book):
+            del self.levels[symbol]
+            self.last_update.pop(symbol, None)
+            self._queue('UNSUBSCRIBE', symbol)
+
+    def unwatch_chat(self, chat_id: int):
+        for key_chat_id, trade in [item for item in self.trades.values() if item[0] == chat_id]:
+            self.unwatch(key_chat_id, trade)
+
+    def is_live(self, symbol: str) -> bool:
+        """True jika simbol dipantau dan menerima update mark price dalam `max_age` detik terakhir."""
+        updated = self.last_update.get(symbol)
+        return updated is not None and time.time() - updated <= self.max_age
+
+    # --------------------------------------------------------------------------
+    # KONEKSI STREAM
+    # --------------------------------------------------------------------------
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self._task, self._ws = None, None
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _queue(self, method: str, symbol: str):
+        """
+        Mencatat perubahan langganan untuk dikirim di akhir putaran event loop ini. Perubahan
+        yang membatalkan perubahan tertunda (SUBSCRIBE lalu UNSUBSCRIBE simbol yang sama,
+        atau sebaliknya) cukup menghapus yang tertunda. Jika belum terhubung, diabaikan:
+        langganan dibuat saat (re)connect.
+        """
+        if self._ws is None:
+            return
+        pending, opposite = ((self._pending_subscribe, self._pending_unsubscribe) if method == 'SUBSCRIBE'
+                             else (self._pending_unsubscribe, self._pending_subscribe))
+        if symbol in opposite:
+            opposite.discard(symbol)
+        else:
+            pending.add(symbol)
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            asyncio.get_running_loop().call_soon(self._flush)
+
+    def _flush(self):
+        """Mengirim perubahan langganan tertunda: maksimal satu pesan per jenis."""
+        self._flush_scheduled = False
+        for method, symbols in (('UNSUBSCRIBE', self._pending_unsubscribe), ('SUBSCRIBE', self._pending_subscribe)):
+            if symbols and self._ws is not None:
+                message = json.dumps({'method': method, 'params': [f"{s.lower()}@markPrice@1s" for s in sorted(symbols)],
+                                      'id': next(self._request_ids)})
+                self._spawn(self._send_message(method, message))
+            symbols.clear()
+
+    async def _send_message(self, method: str, message: str):
+        try:
+            await self._ws.send(message)
+        except (AttributeError, websockets.ConnectionClosed) as e:
+            # Koneksi putus sebelum terkirim: langganan dikirim ulang saat reconnect
+            logger.warning(f"Gagal mengirim {method} monitor SL/TP: {e}")
+
+    async def _run(self):
+        delay = RECONNECT_DELAY_MIN
+        while True:
+            try:
+                async for ws in websockets.connect(f"{config.STREAM_BASE_URL}/ws", ping_interval=20):
+                    self._ws = ws
+                    try:
+                        # Koneksi baru belum berlangganan apa pun: langganan semua simbol yang dipantau
+                        self._pending_subscribe.clear()
+                        self._pending_unsubscribe.clear()
+                        for symbol in self.levels:
+                            self._queue('SUBSCRIBE', symbol)
+                        async for raw in ws:
+                            try:
+                                self._on_message(json.loads(raw))
+                            except Exception as e:
+                                logger.error(f"Gagal memproses pesan monitor SL/TP: {e}")
+                                continue
+                            delay = RECONNECT_DELAY_MIN
+                    except websockets.ConnectionClosed as e:
+                        logger.warning(f"Koneksi monitor SL/TP terputus ({e}), menyambung ulang...")
+                    finally:
+                        self._ws = None
+            except Exception as e:
+                logger.error(f"Error pada koneksi monitor SL/TP ({e}), menyambung ulang dalam {delay} detik...")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RECONNECT_DELAY_MAX)
+
+    def _on_message(self, data: dict):
+        if data.get('e') != 'markPriceUpdate':
+            return # Balasan SUBSCRIBE/UNSUBSCRIBE
+        symbol = data['s']
+        book = self.levels.get(symbol)
+        if book is None:
+            return
+        self.last_update[symbol] = time.time()
+        price = float(data['p'])
+        for key in book.crossed(price):
+            chat_id, trade = self.trades[key]
+            result = exit_result(trade, price)
+            self.unwatch(chat_id, trade)
+            self._spawn(self._notify(chat_id, trade, result, price))
+
+    async def _notify(self, chat_id: int, trade: dict, result: str, price: float):
+        try:
+            await self.on_exit(chat_id, trade, result, price)
+        except Exception as e:
+            logger.error(f"Gagal memproses exit {trade['symbol']} untuk chat {chat_id}: {e}")
+
+# Instance global; dibuat saat bot start jika FORWARDTEST_MONITOR_ENABLED
+monitor: TradeMonitor | None = None
@@ -0,0 +1,274 @@
+# universe.py
+
+import logging
+import time
+import threading
+import concurrent.futures
+import pandas as pd
+
+# Import dari file-file lain dalam proyek
+import config
+import utils
+
+logger = logging.getLogger(__name__)
+
+# ==============================================================================
+# UNIVERSE SIMBOL (TOP SYMBOLS) BERSAMA UNTUK SELURUH PROSES
+# ==============================================================================
+# Sebelumnya `utils.get_top_symbols` mengambil futures_ticker untuk semua kontrak dan
+# memfilternya pada request pertama yang menemukan cache kedaluwarsa, dengan cache per
+# context (backtest memakai dict sementara sehingga selalu fetch ulang).
+#
+# UniverseService menyimpan satu snapshot untuk seluruh proses:
+#   - snapshot diperbarui thread latar setiap `UNIVERSE_REFRESH_SECONDS`; pembaca
+#     selalu langsung mendapat snapshot terakhir dan tidak pernah menunggu refresh
+#     (kecuali saat belum ada snapshot sama sekali, yaitu saat start),
+#   - setiap snapshot punya nomor versi yang naik per refresh berhasil, dan tidak
+#     diubah setelah dibuat (refresh membuat snapshot baru),
+#   - jika refresh gagal, snapshot lama tetap dipakai. Selama belum ada snapshot,
+#     thread latar mencoba lagi dengan jeda UNIVERSE_RETRY_SECONDS yang berlipat dua
+#     (maksimal `UNIVERSE_REFRESH_SECONDS`), dan pembaca langsung mendapat universe
+#     kosong alih-alih menjalankan ulang refresh yang baru saja gagal.
+#
+# Pipeline filter & peringkat (config UNIVERSE_FILTERS, UNIVERSE_RANK_BY):
+#   filter  : "nama:nilai" dipisah koma, dijalankan berurutan, misal
+#             "min_volume:20000000,min_volatility:0.05,max_abs_funding:0.001"
+#   rank_by : kolom statistik untuk pengurutan menurun, diambil TOP_N_SYMBOLS teratas
+# Kolom statistik per simbol (DataFrame `snapshot.stats`, index = simbol):
+#   volume (quote 24 jam), volatility ((high - low) / low 24 jam), last_price,
+#   funding & abs_funding (funding rate terakhir), open_interest (dalam USDT).
+# Funding dan open interest hanya diambil jika dipakai pipeline; open interest
+# (satu request per simbol) hanya untuk simbol yang lolos filter lain.
+
+FILTERS = {
+    'min_volume':        lambda stats, value: stats['volume'] >= value,
+    'min_volatility':    lambda stats, value: stats['volatility'] >= value,
+    'max_volatility':    lambda stats, value: stats['volatility'] <= value,
+    'max_abs_funding':   lambda stats, value: stats['abs_funding'] <= value,
+    'min_open_interest': lambda stats, value: stats['open_interest'] >= value,
+}
+# Kolom yang dibutuhkan setiap filter (selain kolom dasar dari ticker 24 jam)
+_FILTER_COLUMNS = {
+    'max_abs_funding': 'funding',
+    'min_open_interest': 'open_interest',
+}
+RANK_COLUMNS = ('volume', 'volatility', 'funding', 'abs_funding', 'open_interest')
+# Jeda awal percobaan ulang saat belum ada snapshot sama sekali (detik)
+UNIVERSE_RETRY_SECONDS = 5
+
+def parse_filters(text: str) -> list[tuple[str, float]]:
+    """'min_volume:1e7,min_volatility:0.05' -> [('min_volume', 1e7), ('min_volatility', 0.05)]."""
+    steps = []
+    for item in filter(None, (part.strip() for part in text.split(','))):
+        name, _, value = item.partition(':')
+        name = name.strip()
+        if name not in FILTERS:
+            raise ValueError(f"Filter universe tidak dikenal: '{name}'. Pilihan: {', '.join(FILTERS)}")
+        steps.append((name, float(value)))
+    return steps
+
+class UniverseSnapshot:
+    """Hasil satu refresh universe (tidak diubah setelah dibuat)."""
+
+    __slots__ = ('version', 'symbols', 'stats', 'created_at', 'duration')
+
+    def __init__(self, version: int, symbols: tuple, stats: pd.DataFrame, created_at: float, duration: float):
+        self.version = version
+        self.symbols = symbols
+        self.stats = stats
+        self.created_at = created_at
+        self.duration = duration
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.created_at
+
+    def __repr__(self) -> str:
+        return f"UniverseSnapshot(version={self.version}, n={len(self.symbols)})"
+
+class UniverseService:
+    """Penyedia universe simbol dengan refresh latar (lihat keterangan modul)."""
+
+    def __init__(self, filters: list[tuple[str, float]], rank_by: str = 'volume',
+                 top_n: int = 50, refresh_seconds: int = 900):
+        if rank_by not in RANK_COLUMNS:
+            raise ValueError(f"UNIVERSE_RANK_BY tidak dikenal: '{rank_by}'. Pilihan: {', '.join(RANK_COLUMNS)}")
+        self.filters = list(filters)
+        self.rank_by = rank_by
+        self.top_n = top_n
+        self.refresh_seconds = refresh_seconds
+        self._snapshot = None
+        self._version = 0
+        self._attempts = 0      # Jumlah refresh yang sudah selesai (berhasil atau gagal)
+        self._failed_at = None  # Waktu (monotonic) refresh gagal terakhir selama belum ada snapshot
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # --------------------------------------------------------------------------
+    # API UNTUK PEMBACA
+    # --------------------------------------------------------------------------
+
+    def snapshot(self) -> UniverseSnapshot | None:
+        """
+        Snapshot terakhir. Hanya menunggu jika belum pernah ada snapshot; snapshot yang
+        sudah kedaluwarsa tetap dikembalikan dan refresh dijalankan di latar.
+        None jika belum ada snapshot dan refresh terakhir gagal (dicoba lagi oleh thread
+        latar, atau oleh pembaca berikutnya setelah UNIVERSE_RETRY_SECONDS tanpa thread).
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            failed_at = self._failed_at
+            if failed_at is not None and (self.running or time.monotonic() - failed_at < UNIVERSE_RETRY_SECONDS):
+                return None
+            return self.refresh()
+        if snapshot.age > self.refresh_seconds and not self.running:
+            self.refresh_in_background()
+        return snapshot
+
+    def symbols(self) -> list:
+        snapshot = self.snapshot()
+        return list(snapshot.symbols) if snapshot else []
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    # --------------------------------------------------------------------------
+    # REFRESH
+    # --------------------------------------------------------------------------
+
+    def refresh(self) -> UniverseSnapshot | None:
+        """
+        Membuat snapshot baru (blocking). Refresh yang sedang berjalan tidak digandakan:
+        pemanggil lain menunggu lalu memakai hasilnya, termasuk jika refresh itu gagal.
+        Jika gagal, snapshot lama (atau None) dikembalikan.
+        """
+        attempts = self._attempts
+        with self._refresh_lock:
+            if self._attempts != attempts:
+                return self._snapshot # Refresh lain selesai selama menunggu
+            start = time.perf_counter()
+            try:
+                symbols, stats = self._build()
+            except Exception as e:
+                logger.error(f"Gagal memperbarui universe simbol: {e}")
+                if self._snapshot is None:
+                    self._failed_at = time.monotonic()
+                return self._snapshot
+            finally:
+                self._attempts += 1
+            self._failed_at = None
+            self._version += 1
+            self._snapshot = UniverseSnapshot(self._version, tuple(symbols), stats, time.time(), time.perf_counter() - start)
+            logger.info(f"Universe simbol v{self._version}: {len(symbols)} simbol ({self._snapshot.duration:.1f} detik).")
+            return self._snapshot
+
+    def refresh_in_background(self):
+        """Menjalankan `refresh` di thread terpisah jika belum ada refresh yang berjalan."""
+        if not self._refresh_lock.locked():
+            threading.Thread(target=self.refresh, name='universe-refresh', daemon=True).start()
+
+    def start(self):
+        """Memulai thread refresh berkala (refresh pertama langsung dijalankan di thread tersebut)."""
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='universe', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._thread = None
+
+    def _loop(self):
+        retry_delay = UNIVERSE_RETRY_SECONDS
+        while not self._stop.is_set():
+            if self.refresh() is not None:
+                retry_delay = UNIVERSE_RETRY_SECONDS
+                self._stop.wait(self.refresh_seconds)
+                continue
+            # Belum ada snapshot: coba lagi lebih cepat dari interval refresh biasa
+            logger.warning(f"Universe simbol belum tersedia, mencoba lagi dalam {retry_delay} detik.")
+            self._stop.wait(retry_delay)
+            retry_delay = min(retry_delay * 2, self.refresh_seconds)
+
+    # --------------------------------------------------------------------------
+    # PIPELINE
+    # --------------------------------------------------------------------------
+
+    def _needs(self, column: str) -> bool:
+        wanted = {_FILTER_COLUMNS.get(name) for name, _ in self.filters} | {self.rank_by}
+        return column in wanted or (column == 'funding' and 'abs_funding' in wanted)
+
+    def _build(self) -> tuple[list, pd.DataFrame]:
+        if not utils.binance:
+            raise RuntimeError("Klien Binance tidak terinisialisasi.")
+        stats = _ticker_stats()
+        if self._needs('funding'):
+            stats = _with_funding(stats)
+
+        # Filter tanpa open interest dulu, agar open interest hanya diambil untuk sisa simbol
+        deferred = []
+        for name, value in self.filters:
+            if _FILTER_COLUMNS.get(name) == 'open_interest':
+                deferred.append((name, value))
+                continue
+            stats = stats[FILTERS[name](stats, value)]
+        if self._needs('open_interest'):
+            stats = _with_open_interest(stats)
+        for name, value in deferred:
+            stats = stats[FILTERS[name](stats, value)]
+
+        stats = stats.sort_values(self.rank_by, ascending=False, kind='stable')
+        return stats.index[:self.top_n].tolist(), stats
+
+# ==============================================================================
+# PENGAMBILAN STATISTIK
+# ==============================================================================
+
+def _ticker_stats() -> pd.DataFrame:
+    """Statistik 24 jam semua kontrak perpetual USDT (satu request, weight 40)."""
+    utils.rest_limiter.acquire(40)
+    df = pd.DataFrame(utils.binance.futures_ticker())
+    df = df[df['symbol'].str.contains('USDT') & ~df['symbol'].str.contains('_')]
+    stats = pd.DataFrame({
+        'volume': df['quoteVolume'].astype(float).to_numpy(),
+        'high': df['highPrice'].astype(float).to_numpy(),
+        'low': df['lowPrice'].astype(float).to_numpy(),
+        'last_price': df['lastPrice'].astype(float).to_numpy(),
+    }, index=pd.Index(df['symbol'].to_numpy(), name='symbol'))
+    stats = stats[stats['low'] > 0]
+    stats['volatility'] = (stats['high'] - stats['low']) / stats['low']
+    return stats.drop(columns=['high', 'low'])
+
+def _with_funding(stats: pd.DataFrame) -> pd.DataFrame:
+    """Menambahkan funding rate terakhir dari premiumIndex (satu request, weight 10)."""
+    utils.rest_limiter.acquire(10)
+    funding = {item['symbol']: float(item['lastFundingRate'] or 0) for item in utils.binance.futures_mark_price()}
+    stats = stats.assign(funding=stats.index.map(funding).astype(float))
+    return stats.assign(abs_funding=stats['funding'].abs())
+
+def _with_open_interest(stats: pd.DataFrame) -> pd.DataFrame:
+    """Menambahkan open interest (USDT) per simbol, paralel dan menghormati batas weight."""
+    def fetch(symbol):
+        utils.rest_limiter.acquire(1)
+        try:
+            return float(utils.binance.futures_open_interest(symbol=symbol)['openInterest'])
+        except Exception as e:
+            logger.warning(f"Gagal mengambil open interest {symbol}: {e}")
+            return float('nan')
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=config.HISTORY_FETCH_WORKERS) as executor:
+        contracts = list(executor.map(fetch, stats.index))
+    return stats.assign(open_interest=pd.Series(contracts, index=stats.index) * stats['last_price'])
+
+# Instance global yang dipakai utils.get_top_symbols, stream, dan job
+service = UniverseService(
+    parse_filters(config.UNIVERSE_FILTERS),
+    rank_by=config.UNIVERSE_RANK_BY,
+    top_n=config.TOP_N_SYMBOLS,
+    refresh_seconds=config.UNIVERSE_REFRESH_SECONDS,
+)
@@ -1,21 +1,23 @@
 # utils.py
 
 import logging
+import time
+import threading
+import concurrent.futures
 import pandas as pd
 import numpy as np
 
-# Cek dan perbaiki atribut NaN jika tidak ada
+# Cek dan perbaiki atribut NaN jika tidak ada (dibutuhkan pandas_ta, yang diimpor
+# belakangan oleh indicators.py & modul strategi)
 if not hasattr(np, 'NaN'):
     np.NaN = np.nan
 
-import pandas_ta as ta # <-- Import pandas_ta setelah perbaikan
-
-from binance.client import Client as BinanceClient
-import google.generativeai as genai
-from datetime import datetime, timedelta
-
 # Import konfigurasi dari file config.py
 import config
+import candle_store
+import indicators
+import perf
+from candles import Candles
 
 # Setup Logging
 logger = logging.getLogger(__name__)
@@ -24,110 +26,359 @@ logger = logging.getLogger(__name__)
 # INISIALISASI KLIEN EKSTERNAL
 # ==============================================================================
 
-# Inisialisasi Klien Binance sekali saja saat modul diimpor
-try:
-    binance = BinanceClient(
-        api_key=config.BINANCE_API_KEY,
-        api_secret=config.BINANCE_API_SECRET,
-        requests_params={'timeout': 20}
-    )
-    # Cek koneksi
-    binance.ping()
-    logger.info("Koneksi ke Binance API berhasil.")
-except Exception as e:
-    logger.error(f"Gagal menginisialisasi atau terhubung ke Binance API: {e}")
-    binance = None
-
-# Inisialisasi Model Gemini (Opsional)
-gemini_model = None
-if config.GEMINI_API_KEY:
+# Klien dibuat saat pertama dipakai (atau oleh `warm_up_clients` di latar saat bot start),
+# bukan saat modul diimpor: import python-binance & google-generativeai serta ping ke
+# Binance memakan waktu beberapa detik. `utils.binance` dan `utils.gemini_model` tetap
+# bisa diakses seperti atribut biasa (lewat `__getattr__` modul); di dalam modul ini
+# gunakan `client('binance')`. Nilainya None jika inisialisasi gagal.
+
+def _create_binance():
+    from binance.client import Client as BinanceClient
+    try:
+        binance = BinanceClient(
+            api_key=config.BINANCE_API_KEY,
+            api_secret=config.BINANCE_API_SECRET,
+            requests_params={'timeout': 20}
+        )
+        # Cek koneksi
+        binance.ping()
+        logger.info("Koneksi ke Binance API berhasil.")
+        return binance
+    except Exception as e:
+        logger.error(f"Gagal menginisialisasi atau terhubung ke Binance API: {e}")
+        return None
+
+def _create_gemini_model():
+    # Model Gemini (Opsional)
+    if not config.GEMINI_API_KEY:
+        return None
     try:
+        import google.generativeai as genai
         genai.configure(api_key=config.GEMINI_API_KEY)
-        gemini_model = genai.GenerativeModel("gemini-1.5-flash")
+        model = genai.GenerativeModel("gemini-1.5-flash")
         logger.info("Model Gemini AI berhasil diinisialisasi.")
+        return model
     except Exception as e:
         logger.error(f"Gagal menginisialisasi model Gemini: {e}")
+        return None
+
+_CLIENT_FACTORIES = {'binance': _create_binance, 'gemini_model': _create_gemini_model}
+_client_lock = threading.Lock()
+
+def client(name: str):
+    """Klien eksternal `name` ('binance' / 'gemini_model'), dibuat sekali saat pertama diminta."""
+    if name not in globals():
+        with _client_lock:
+            if name not in globals():
+                with perf.span('client_init', client=name):
+                    globals()[name] = _CLIENT_FACTORIES[name]()
+    return globals()[name]
+
+def __getattr__(name: str):
+    if name in _CLIENT_FACTORIES:
+        return client(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def warm_up_clients():
+    """Menginisialisasi semua klien (dipanggil di thread latar saat bot start)."""
+    for name in _CLIENT_FACTORIES:
+        client(name)
+
+# ==============================================================================
+# PEMBATAS WEIGHT REQUEST BINANCE
+# ==============================================================================
+
+class WeightLimiter:
+    """Token bucket sederhana agar total weight request tidak melewati batas per menit."""
+
+    def __init__(self, weight_per_minute: int):
+        self.capacity = weight_per_minute
+        self.tokens = float(weight_per_minute)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self, weight: int) -> float:
+        """
+        Mencoba memakai `weight` tanpa menunggu. Mengembalikan 0 jika berhasil,
+        atau lama waktu tunggu (detik) sebelum boleh mencoba lagi.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.capacity / 60)
+            self.updated = now
+            if self.tokens >= weight:
+                self.tokens -= weight
+                return 0.0
+            return (weight - self.tokens) * 60 / self.capacity
+
+    def acquire(self, weight: int):
+        """Menunggu (blocking) sampai `weight` tersedia, lalu memakainya."""
+        while (wait := self.reserve(weight)) > 0:
+            time.sleep(wait)
+
+    def observe_used(self, used_weight: int, server_limit: int = 2400):
+        """
+        Menyelaraskan bucket dengan header X-MBX-USED-WEIGHT-1M dari Binance, agar
+        pemakaian dari proses lain (atau klien lain) ikut diperhitungkan.
+        """
+        with self.lock:
+            self.tokens = min(self.tokens, max(server_limit - used_weight, 0))
+
+rest_limiter = WeightLimiter(config.BINANCE_WEIGHT_PER_MINUTE)
+
+def klines_weight(limit: int) -> int:
+    """Weight endpoint futures klines sesuai dokumentasi Binance."""
+    if limit < 100: return 1
+    if limit < 500: return 2
+    if limit <= 1000: return 5
+    return 10
+
+def _futures_klines(**params) -> list:
+    """Wrapper futures_klines yang menghormati batas weight."""
+    rest_limiter.acquire(klines_weight(params.get('limit', 500)))
+    return client('binance').futures_klines(**params)
 
 # ==============================================================================
 # FUNGSI-FUNGSI UTILITAS PENGAMBILAN DATA
 # ==============================================================================
 
-def fetch_klines(symbol: str, interval: str, limit: int = 500) -> pd.DataFrame:
-    """Mengambil data kline (OHLCV) dari Binance Futures."""
-    if not binance:
+KLINE_COLUMNS = [
+    'open_time', 'open', 'high', 'low', 'close', 'volume', 'close_time',
+    'quote_vol', 'trades', 'taker_buy_base', 'taker_buy_quote', 'ignore'
+]
+
+# Jumlah candle maksimum per request futures_klines
+KLINES_PAGE_SIZE = 1500
+
+def interval_to_ms(interval: str) -> int:
+    """Mengubah interval Binance (misal '15m', '1h', '1d') menjadi milidetik."""
+    units = {'m': 60_000, 'h': 3_600_000, 'd': 86_400_000, 'w': 604_800_000}
+    return int(interval[:-1]) * units[interval[-1]]
+
+def _klines_to_records(data: list) -> np.ndarray:
+    """Mengubah respons mentah futures_klines menjadi record array `candle_store.CANDLE_DTYPE`."""
+    return Candles.from_klines(data).to_records()
+
+def _records_to_frame(records: np.ndarray) -> pd.DataFrame:
+    """Mengubah record array menjadi DataFrame dengan format yang sama seperti fetch_klines."""
+    return Candles.from_records(records).to_pandas()
+
+def _frame_to_records(df: pd.DataFrame, interval: str) -> np.ndarray:
+    """Kebalikan `_records_to_frame`: DataFrame klines menjadi record array `candle_store.CANDLE_DTYPE`."""
+    records = np.empty(len(df), dtype=candle_store.CANDLE_DTYPE)
+    if df.empty:
+        return records
+    records['open_time'] = df['open_time'].to_numpy().astype('datetime64[ms]').astype(np.int64)
+    for name in ('open', 'high', 'low', 'close', 'volume'):
+        records[name] = df[name].to_numpy(dtype=float)
+    records['close_time'] = records['open_time'] + interval_to_ms(interval) - 1
+    return records
+
+def _plan_kline_request(stored: np.ndarray, interval: str, limit: int, now_ms: int) -> dict:
+    """
+    Menentukan parameter request klines agar candle store kembali lengkap: jika data
+    tersimpan cukup, hanya candle setelah close_time terakhir yang diminta.
+    """
+    if len(stored):
+        next_open = int(stored['close_time'][-1]) + 1
+        missing = max((now_ms - next_open) // interval_to_ms(interval) + 1, 1)
+        if len(stored) + missing >= limit and missing <= KLINES_PAGE_SIZE:
+            return {'startTime': next_open, 'limit': missing}
+    return {'limit': limit}
+
+def _store_klines(symbol: str, interval: str, limit: int, data: list, now_ms: int) -> np.ndarray:
+    """
+    Menyimpan candle yang sudah ditutup dari respons `data` ke candle store, lalu
+    mengembalikan `limit` candle terakhir (candle yang sedang berjalan ikut disertakan).
+    Pemanggil harus memegang `candle_store.store.lock(symbol, interval)`.
+    """
+    store = candle_store.store
+    stored = store.read(symbol, interval)
+    fresh = _klines_to_records(data)
+    closed, forming = fresh[fresh['close_time'] < now_ms], fresh[fresh['close_time'] >= now_ms]
+    if len(closed):
+        is_contiguous = not len(stored) or closed['open_time'][0] <= int(stored['close_time'][-1]) + 1
+        if not is_contiguous:
+            # Ada celah antara data lama dan data baru: data lama dibuang agar tetap kontinu
+            stored = store.replace(symbol, interval, closed)
+        elif len(stored) and closed['open_time'][0] > stored['open_time'][-1]:
+            store.append(symbol, interval, closed)
+            stored = store.read(symbol, interval)
+        else:
+            stored = store.merge(symbol, interval, closed)
+
+    return np.concatenate([np.asarray(stored[-limit:]), forming])[-limit:]
+
+def _sync_klines(symbol: str, interval: str, limit: int) -> np.ndarray:
+    """
+    Sinkronisasi inkremental candle store untuk (symbol, interval), lalu mengembalikan
+    `limit` candle terakhir (candle yang sedang berjalan ikut disertakan, tapi tidak disimpan).
+    """
+    store = candle_store.store
+    with store.lock(symbol, interval):
+        stored = store.read(symbol, interval)
+        if config.CANDLE_STORE_OFFLINE:
+            return np.array(stored[-limit:])
+        if not client('binance'):
+            raise RuntimeError("Klien Binance tidak terinisialisasi.")
+
+        now_ms = int(time.time() * 1000)
+        params = _plan_kline_request(stored, interval, limit, now_ms)
+        data = _futures_klines(symbol=symbol, interval=interval, **params)
+        return _store_klines(symbol, interval, limit, data, now_ms)
+
+# Sumber klines in-memory (misal buffer WebSocket dari streaming.py) yang dicek
+# sebelum REST. Setiap sumber punya metode `read(symbol, interval, limit)` yang
+# mengembalikan record array, atau None jika datanya belum lengkap / tidak aktual.
+_kline_sources = []
+
+def register_kline_source(source):
+    """Mendaftarkan sumber klines in-memory untuk fetch_klines."""
+    if source not in _kline_sources:
+        _kline_sources.append(source)
+
+def unregister_kline_source(source):
+    if source in _kline_sources:
+        _kline_sources.remove(source)
+
+def fetch_candles(symbol: str, interval: str, limit: int = 500) -> Candles:
+    """
+    Mengambil data kline (OHLCV) dari Binance Futures sebagai `Candles` kolumnar
+    (tanpa DataFrame). Jika ada sumber in-memory terdaftar (stream WebSocket) yang
+    datanya aktual, data diambil dari sana tanpa request. Jika `config.CANDLE_STORE_ENABLED`,
+    candle lama dibaca dari disk dan hanya candle baru yang diambil dari API.
+    Mengembalikan Candles kosong jika gagal.
+    """
+    with perf.span('fetch_klines', symbol=symbol, interval=interval):
+        return _fetch_candles(symbol, interval, limit)
+
+def _fetch_candles(symbol: str, interval: str, limit: int) -> Candles:
+    for source in _kline_sources:
+        records = source.read(symbol, interval, limit)
+        if records is not None:
+            return Candles.from_records(records)
+
+    if config.CANDLE_STORE_ENABLED:
+        try:
+            return Candles.from_records(_sync_klines(symbol, interval, limit))
+        except Exception as e:
+            logger.error(f"Fetch klines (candle store) gagal untuk {symbol} ({interval}): {e}")
+            return Candles.empty()
+
+    if not client('binance'):
         logger.error("Klien Binance tidak terinisialisasi.")
-        return pd.DataFrame()
+        return Candles.empty()
     try:
-        data = binance.futures_klines(symbol=symbol, interval=interval, limit=limit)
-        if not data:
-            return pd.DataFrame()
-        
-        df = pd.DataFrame(data, columns=[
-            'open_time', 'open', 'high', 'low', 'close', 'volume', 'close_time',
-            'quote_vol', 'trades', 'taker_buy_base', 'taker_buy_quote', 'ignore'
-        ])
-        df['open_time'] = pd.to_datetime(df['open_time'], unit='ms')
-        df[['open', 'high', 'low', 'close', 'volume']] = df[['open', 'high', 'low', 'close', 'volume']].astype(float)
-        
-        return df[['open_time', 'open', 'high', 'low', 'close', 'volume']]
+        return Candles.from_klines(_futures_klines(symbol=symbol, interval=interval, limit=limit))
     except Exception as e:
         logger.error(f"Fetch klines gagal untuk {symbol} ({interval}): {e}")
+        return Candles.empty()
+
+def fetch_klines(symbol: str, interval: str, limit: int = 500) -> pd.DataFrame:
+    """
+    Seperti `fetch_candles`, tetapi sebagai DataFrame [open_time, open, high, low, close, volume].
+    Frame ditandai (symbol, interval) agar indikatornya bisa di-cache (indicators.py).
+    """
+    candles = fetch_candles(symbol, interval, limit)
+    if not len(candles):
         return pd.DataFrame()
+    return indicators.tag(candles.to_pandas(), symbol, interval)
 
-def get_top_symbols(context) -> list:
+def _fetch_klines_range(symbol: str, interval: str, start_ms: int, end_ms: int) -> np.ndarray:
     """
-    Mendapatkan daftar simbol teratas berdasarkan volume dan volatilitas.
-    Fungsi ini sekarang fleksibel dan bisa menerima context asli atau dict.
-    """
-    # --- PERUBAHAN DIMULAI DI SINI ---
-    bot_data = {}
-    # Cek apakah context adalah objek asli dari handler (memiliki .bot_data)
-    if hasattr(context, 'bot_data'):
-        bot_data = context.bot_data
-    # Cek apakah context adalah dict dummy dari backtester (memiliki key 'bot_data')
-    elif isinstance(context, dict) and 'bot_data' in context:
-        bot_data = context['bot_data']
-    
-    # Sekarang, gunakan variabel `bot_data` yang sudah pasti benar
-    cache = bot_data.get('top_symbols_cache', {})
-    if cache and (datetime.now() - cache.get('timestamp', datetime.min) < timedelta(hours=1)):
-        return cache.get('symbols', [])
-    # --- PERUBAHAN SELESAI DI SINI ---
-
-    if not binance:
-        logger.error("Klien Binance tidak terinisialisasi.")
-        return []
-        
+    Mengambil candle dengan open_time di [start_ms, end_ms] lewat beberapa halaman
+    (startTime/endTime) yang disusun mundur dari end_ms dan diambil secara paralel.
+    Hasilnya digabung, diurutkan, dan diduplikasi berdasarkan open_time.
+    """
+    interval_ms = interval_to_ms(interval)
+    page_ms = KLINES_PAGE_SIZE * interval_ms
+    pages = []
+    page_end = end_ms
+    while page_end >= start_ms:
+        page_start = max(start_ms, page_end - page_ms + 1)
+        pages.append((page_start, page_end))
+        page_end = page_start - 1
+
+    def fetch_page(page):
+        # Limit secukupnya agar weight request sekecil mungkin
+        limit = min((page[1] - page[0]) // interval_ms + 1, KLINES_PAGE_SIZE)
+        return _klines_to_records(_futures_klines(
+            symbol=symbol, interval=interval, startTime=page[0], endTime=page[1], limit=limit
+        ))
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=config.HISTORY_FETCH_WORKERS) as executor:
+        chunks = list(executor.map(fetch_page, pages))
+
+    records = np.concatenate(chunks) if chunks else np.empty(0, dtype=candle_store.CANDLE_DTYPE)
+    _, unique_idx = np.unique(records['open_time'], return_index=True)
+    return records[unique_idx]
+
+def fetch_klines_history(symbol: str, interval: str, start_ms: int, end_ms: int | None = None) -> pd.DataFrame:
+    """
+    Mengambil histori kline panjang (tidak dibatasi 1500 candle) untuk rentang waktu
+    [start_ms, end_ms]. Jika candle store aktif, hanya bagian yang belum tersimpan
+    yang diambil dari API, lalu disimpan ke disk.
+    """
+    now_ms = int(time.time() * 1000)
+    end_ms = min(end_ms or now_ms, now_ms)
     try:
-        logger.info("Memperbarui cache top symbols...")
-        tickers = binance.futures_ticker()
-        df = pd.DataFrame(tickers)
-        
-        df = df[df['symbol'].str.contains('USDT') & ~df['symbol'].str.contains('_')]
-        df['volume'] = df['quoteVolume'].astype(float)
-        df['high'] = df['highPrice'].astype(float)
-        df['low']  = df['lowPrice'].astype(float)
-        df = df[df['low'] > 0]
-        
-        df['volatility'] = (df['high'] - df['low']) / df['low']
-        df = df[df['volatility'] >= config.VOLATILITY_THRESHOLD]
-        
-        symbols = df.sort_values('volume', ascending=False).head(config.TOP_N_SYMBOLS)['symbol'].tolist()
-        
-        # Simpan kembali ke cache menggunakan `bot_data`
-        bot_data['top_symbols_cache'] = {'symbols': symbols, 'timestamp': datetime.now()}
-        return symbols
+        if not config.CANDLE_STORE_ENABLED:
+            if not client('binance'):
+                raise RuntimeError("Klien Binance tidak terinisialisasi.")
+            return _records_to_frame(_fetch_klines_range(symbol, interval, start_ms, end_ms))
+
+        store = candle_store.store
+        forming = np.empty(0, dtype=candle_store.CANDLE_DTYPE)
+        with store.lock(symbol, interval):
+            stored = store.read(symbol, interval)
+            if not config.CANDLE_STORE_OFFLINE:
+                if not client('binance'):
+                    raise RuntimeError("Klien Binance tidak terinisialisasi.")
+                # Hanya rentang sebelum dan sesudah data tersimpan yang perlu diambil.
+                # Jika rentang baru tidak menyambung dengan data tersimpan, data lama diganti.
+                is_contiguous = len(stored) > 0 and start_ms <= int(stored['close_time'][-1]) + 1
+                ranges = [(start_ms, end_ms)]
+                if is_contiguous:
+                    ranges = []
+                    if stored['open_time'][0] - start_ms >= interval_to_ms(interval):
+                        ranges.append((start_ms, int(stored['open_time'][0]) - 1))
+                    if end_ms > stored['close_time'][-1]:
+                        ranges.append((int(stored['close_time'][-1]) + 1, end_ms))
+                fetched = [_fetch_klines_range(symbol, interval, s, e) for s, e in ranges]
+                if fetched:
+                    fresh = np.concatenate(fetched)
+                    closed, forming = fresh[fresh['close_time'] < now_ms], fresh[fresh['close_time'] >= now_ms]
+                    if len(closed):
+                        stored = store.merge(symbol, interval, closed) if is_contiguous or not len(stored) else store.replace(symbol, interval, closed)
+
+            in_range = (stored['open_time'] >= start_ms) & (stored['open_time'] <= end_ms)
+            records = np.concatenate([np.asarray(stored)[in_range], forming])
+        return _records_to_frame(records)
     except Exception as e:
-        logger.error(f"Gagal mendapatkan top symbols: {e}")
-        return []
+        logger.error(f"Fetch histori klines gagal untuk {symbol} ({interval}): {e}")
+        return pd.DataFrame()
+
+def get_top_symbols(context=None) -> list:
+    """
+    Mendapatkan daftar simbol teratas berdasarkan volume dan volatilitas.
+    Diambil dari snapshot universe bersama (universe.py) yang diperbarui di latar;
+    `context` tidak lagi dipakai dan hanya dipertahankan untuk kompatibilitas pemanggil.
+    """
+    import universe # Import di sini: universe.py mengimpor utils
+    return universe.service.symbols()
+
 # ==============================================================================
 # FUNGSI-FUNGSI UNTUK FITUR ANALISA
 # ==============================================================================
 
-def get_technical_analysis(symbol: str, timeframe: str) -> dict:
-    """Menganalisa satu simbol pada satu timeframe untuk fitur /analyze."""
+def get_technical_analysis(symbol: str, timeframe: str, df: pd.DataFrame | None = None) -> dict:
+    """
+    Menganalisa satu simbol pada satu timeframe untuk fitur /analyze.
+    `df` boleh diisi klines yang sudah diambil (misal lewat market_data), jika tidak akan di-fetch.
+    """
     try:
-        df = fetch_klines(symbol, timeframe, limit=250)
+        if df is None:
+            df = fetch_klines(symbol, timeframe, limit=250)
         if df.empty or len(df) < 200:
             return {'error': 'Data tidak cukup'}
 
@@ -138,10 +389,10 @@ def get_technical_analysis(symbol: str, timeframe: str) -> dict:
         ema_fast_len = 50
         ema_slow_len = 200
         
-        df.ta.ema(length=ema_fast_len, append=True)
-        df.ta.ema(length=ema_slow_len, append=True)
-        df.ta.rsi(length=rsi_len_analyze, append=True)
-        df.ta.adx(length=adx_len_analyze, append=True)
+        indicators.append(df, 'ema', length=ema_fast_len)
+        indicators.append(df, 'ema', length=ema_slow_len)
+        indicators.append(df, 'rsi', length=rsi_len_analyze)
+        indicators.append(df, 'adx', length=adx_len_analyze)
         
         last = df.iloc[-1]
         
@@ -184,6 +435,7 @@ def get_technical_analysis(symbol: str, timeframe: str) -> dict:
 
 async def get_gemini_summary(analysis_text: str, symbol: str) -> str:
     """Meminta ringkasan dari Gemini AI berdasarkan hasil analisa teknikal."""
+    gemini_model = client('gemini_model')
     if not gemini_model:
         return "Model AI tidak diaktifkan. Silakan periksa GEMINI_API_KEY Anda."
     try: